@@ -4,35 +4,41 @@ Authentication API endpoints
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
-import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.security import (
-    verify_password, get_password_hash, create_access_token, 
+    password_hasher, create_access_token, 
     create_refresh_token, verify_token, is_refresh_token
 )
 from app.core.config import settings
-from app.db.database import get_db
+from app.core.user_cache import user_cache
+from app.db.database import get_async_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, Token, TokenData, GoogleAuthRequest, AppleAuthRequest
 from app.core.deps import get_current_user
+from app.services.oauth_service import InvalidIDToken, SigningKeysUnavailable, verify_apple_id_token, verify_google_id_token
+from app.tasks.payments import provision_stripe_customer
 
 router = APIRouter()
 security = HTTPBearer()
 
 
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await db.scalar(select(User).filter(User.email == user_data.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
+    # Give the connection back to the pool while bcrypt runs
+    await db.commit()
+    
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     db_user = User(
         email=user_data.email,
         full_name=user_data.full_name,
@@ -43,11 +49,12 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    await provision_stripe_customer(db_user)
     
     # Generate tokens
-    access_token = create_access_token(subject=user_data.email)
+    access_token = create_access_token(subject=db_user.email, user_id=db_user.id, role=db_user.role)
     refresh_token = create_refresh_token(subject=user_data.email)
     
     return {
@@ -58,18 +65,22 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login user and return tokens"""
     # Find user by email
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+    user = await db.scalar(select(User).filter(User.email == user_credentials.email))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
+    # Give the connection back to the pool while bcrypt runs
+    await db.commit()
+    
     # Verify password
-    if not verify_password(user_credentials.password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify(user_credentials.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -82,8 +93,14 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
             detail="Inactive user account"
         )
     
+    # Store the hash at the current cost now that the password is at hand
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+        await user_cache.invalidate(user.id)
+    
     # Generate tokens
-    access_token = create_access_token(subject=user.email)
+    access_token = create_access_token(subject=user.email, user_id=user.id, role=user.role)
     refresh_token = create_refresh_token(subject=user.email)
     
     return {
@@ -96,7 +113,7 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
 @router.post("/refresh", response_model=Token)
 async def refresh_token(
     refresh_token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Refresh access token using refresh token"""
     # Verify refresh token
@@ -114,7 +131,7 @@ async def refresh_token(
         )
     
     # Check if user exists and is active
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).filter(User.email == email))
     if not user or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -122,7 +139,7 @@ async def refresh_token(
         )
     
     # Generate new tokens
-    new_access_token = create_access_token(subject=email)
+    new_access_token = create_access_token(subject=email, user_id=user.id, role=user.role)
     new_refresh_token = create_refresh_token(subject=email)
     
     return {
@@ -160,11 +177,11 @@ async def get_current_user_info(
 
 
 @router.post("/demo", response_model=Token)
-async def demo_login(db: Session = Depends(get_db)):
+async def demo_login(db: AsyncSession = Depends(get_async_db)):
     """Demo login for testing purposes"""
     # Check if demo user exists
     demo_email = "demo@xfood.com"
-    user = db.query(User).filter(User.email == demo_email).first()
+    user = await db.scalar(select(User).filter(User.email == demo_email))
     
     if not user:
         # Create demo user
@@ -181,11 +198,11 @@ async def demo_login(db: Session = Depends(get_db)):
             role="user"
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     
     # Generate tokens
-    access_token = create_access_token(subject=user.email)
+    access_token = create_access_token(subject=user.email, user_id=user.id, role=user.role)
     refresh_token = create_refresh_token(subject=user.email)
     
     return {
@@ -196,138 +213,115 @@ async def demo_login(db: Session = Depends(get_db)):
 
 
 @router.post("/apple", response_model=Token)
-async def apple_auth(request: AppleAuthRequest, db: Session = Depends(get_db)):
+async def apple_auth(request: AppleAuthRequest, db: AsyncSession = Depends(get_async_db)):
     """Authenticate with Apple Sign-In"""
     try:
-        # For now, we'll create a simplified Apple auth that works with the JWT token
-        # In production, you would validate the Apple ID token with Apple's servers
-        
-        # This is a simplified implementation - in production you should:
-        # 1. Validate the Apple ID token with Apple's public keys
-        # 2. Extract user information from the verified token
-        # 3. Handle user creation/update properly
-        
-        # For demo purposes, we'll create a user based on the token
-        import jwt
-        import json
-        
-        try:
-            # Decode without verification for demo (DO NOT do this in production!)
-            decoded = jwt.decode(request.id_token, options={"verify_signature": False})
-            email = decoded.get('email', f'apple_user_{decoded.get("sub", "unknown")}@appleid.com')
-            name = decoded.get('name', 'Apple User')
-        except:
-            # If JWT decode fails, create a generic Apple user
-            email = "apple_user@appleid.com"
-            name = "Apple User"
-        
-        # Check if user already exists
-        user = db.query(User).filter(User.email == email).first()
-        
-        if not user:
-            # Create new Apple user
-            user = User(
-                email=email,
-                full_name=name,
-                hashed_password="",  # No password for Apple users
-                avatar_url="https://api.dicebear.com/7.x/avataaars/svg?seed=apple",
-                location="Unknown",
-                bio="User authenticated via Apple Sign-In",
-                dietary_preferences=[],
-                is_active=True,
-                is_verified=True,  # Apple users are pre-verified
-                role="user"
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-        
-        # Generate tokens
-        access_token = create_access_token(subject=user.email)
-        refresh_token = create_refresh_token(subject=user.email)
-        
-        return {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "bearer"
-        }
-        
-    except Exception as e:
+        claims = await verify_apple_id_token(request.id_token)
+    except InvalidIDToken as e:
         print(f"Apple auth error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid Apple token"
+        )
+    except SigningKeysUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Unable to verify Apple token"
+        )
+    
+    # Apple only shares the email on the first sign-in, and the name never appears in the token
+    email = claims.get("email") or f"apple_user_{claims['sub']}@appleid.com"
+    
+    # Check if user already exists
+    user = await db.scalar(select(User).filter(User.email == email))
+    
+    if not user:
+        # Create new Apple user
+        user = User(
+            email=email,
+            full_name="Apple User",
+            hashed_password="",  # No password for Apple users
+            avatar_url="https://api.dicebear.com/7.x/avataaars/svg?seed=apple",
+            location="Unknown",
+            bio="User authenticated via Apple Sign-In",
+            dietary_preferences=[],
+            is_active=True,
+            is_verified=True,  # Apple users are pre-verified
+            role="user"
+        )
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+        await provision_stripe_customer(user)
+    elif not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Apple authentication failed"
+            detail="User account is inactive"
         )
+    
+    # Generate tokens
+    access_token = create_access_token(subject=user.email, user_id=user.id, role=user.role)
+    refresh_token = create_refresh_token(subject=user.email)
+    
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
 
 
 @router.post("/google", response_model=Token)
-async def google_auth(request: GoogleAuthRequest, db: Session = Depends(get_db)):
+async def google_auth(request: GoogleAuthRequest, db: AsyncSession = Depends(get_async_db)):
     """Authenticate user with Google OAuth"""
+    # Verify the Google ID token against Google's cached signing keys
     try:
-        # Verify the Google ID token
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"https://oauth2.googleapis.com/tokeninfo?id_token={request.id_token}"
-            )
-            
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid Google token"
-            )
-        
-        token_info = response.json()
-        google_email = token_info.get("email")
-        
-        if not google_email:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email not found in Google token"
-            )
-        
-        # Check if user exists
-        user = db.query(User).filter(User.email == google_email).first()
-        
-        if not user:
-            # Create new user from Google data
-            user = User(
-                email=google_email,
-                full_name=token_info.get("name", "Google User"),
-                hashed_password="",  # No password for Google OAuth users
-                avatar_url=token_info.get("picture"),
-                location="",
-                bio="",
-                dietary_preferences=[],
-                is_active=True,
-                is_verified=True,
-                role="user"
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-        elif not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="User account is inactive"
-            )
-        
-        # Generate tokens
-        access_token = create_access_token(subject=user.email)
-        refresh_token = create_refresh_token(subject=user.email)
-        
-        return {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "bearer"
-        }
-        
-    except httpx.RequestError:
+        token_info = await verify_google_id_token(request.id_token)
+    except InvalidIDToken:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid Google token"
+        )
+    except SigningKeysUnavailable:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Unable to verify Google token"
         )
-    except Exception as e:
+    
+    google_email = token_info["email"]
+    
+    # Check if user exists
+    user = await db.scalar(select(User).filter(User.email == google_email))
+    
+    if not user:
+        # Create new user from Google data
+        user = User(
+            email=google_email,
+            full_name=token_info.get("name", "Google User"),
+            hashed_password="",  # No password for Google OAuth users
+            avatar_url=token_info.get("picture"),
+            location="",
+            bio="",
+            dietary_preferences=[],
+            is_active=True,
+            is_verified=True,
+            role="user"
+        )
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+        await provision_stripe_customer(user)
+    elif not user.is_active:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Authentication failed: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User account is inactive"
         )
+    
+    # Generate tokens
+    access_token = create_access_token(subject=user.email, user_id=user.id, role=user.role)
+    refresh_token = create_refresh_token(subject=user.email)
+    
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
@@ -2,23 +2,34 @@
 Bakes API endpoints for xFood platform
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import CachedRoute, cache_response, response_cache
 from app.core.deps import get_current_user
-from app.db.database import get_db
+from app.core.pagination import paginate_keyset, set_next_cursor
+from app.db.database import get_async_db, get_read_db
+from app.db.search import apply_search
 from app.models.user import User
 from app.models.bake import Bake
-from app.schemas.bake import BakeCreate, BakeUpdate, Bake as BakeResponse, BakeList
+from app.schemas.bake import BakeCreate, BakeUpdate, Bake as BakeResponse, BakeList, BakeSearchResults
+from app.schemas.tag import TagCount
+from app.services.counter_service import adjust_counter, count_view, counter_buffer
+from app.services.image_service import variants_for_url
+from app.services.tag_service import (
+    apply_tag_filter, get_popular_tags, get_tag_facets, index_item_tags, unindex_item_tags
+)
+from app.services.trending_service import calculate_trending_score
 from app.core.security import verify_user_permission
 
-router = APIRouter()
+router = APIRouter(route_class=CachedRoute)
 
 
 @router.post("/", response_model=BakeResponse, status_code=status.HTTP_201_CREATED)
 async def create_bake(
     bake_data: BakeCreate,
     # current_user: User = Depends(get_current_user),  # Commented out for now - anyone can post
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new bake post"""
     try:
@@ -38,69 +49,150 @@ async def create_bake(
             full_address=bake_data.full_address,
             phone_number=bake_data.phone_number,
             circle_id=bake_data.circle_id,
+            trending_score=calculate_trending_score(),
             created_by=1  # Default user ID for anonymous posts
         )
         
         db.add(db_bake)
-        db.commit()
-        db.refresh(db_bake)
+        await db.flush()
+        await index_item_tags(db, "bake", db_bake.id, db_bake.tags, db_bake.allergens)
+        await db.commit()
+        await db.refresh(db_bake)
+        await response_cache.invalidate("bakes:list")
         
         return db_bake
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to create bake: {str(e)}"
         )
 
 
+def _filter_bakes(
+    category: Optional[str] = None,
+    creator_id: Optional[int] = None,
+    tags: Optional[str] = None
+):
+    """Build the bake query shared by the list and search endpoints"""
+    query = select(Bake)
+    
+    if category:
+        query = query.filter(Bake.category == category)
+    
+    if creator_id:
+        query = query.filter(Bake.created_by == creator_id)
+    
+    if tags:
+        query = apply_tag_filter(query, Bake, "bake", tags)
+    
+    return query
+
+
 @router.get("/", response_model=List[BakeList])
+@cache_response(tags=["bakes:list"])
 async def list_bakes(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     search: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     difficulty: Optional[str] = Query(None),
     creator_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    tags: Optional[str] = Query(None),  # e.g. "gluten-free AND NOT allergen:nuts"
+    cursor: Optional[str] = Query(None),  # X-Next-Cursor of the previous page; overrides skip
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """List all bakes with optional filtering"""
-    query = db.query(Bake)
+    """List all bakes with optional filtering and cursor pagination"""
+    query = _filter_bakes(category, creator_id, tags)
     
     if search:
-        query = query.filter(Bake.title.ilike(f"%{search}%"))
+        # Ranked by relevance, so paged with skip rather than a cursor
+        query = apply_search(query, Bake, search, db.bind.dialect.name).offset(skip)
+        bakes = (await db.scalars(query.limit(limit))).all()
+        await counter_buffer.overlay("bake", bakes)
+        return bakes
     
-    if category:
-        query = query.filter(Bake.category == category)
+    # Order by creation date (newest first)
+    query = paginate_keyset(query, Bake, cursor)
+    if not cursor:
+        query = query.offset(skip)
     
-    if creator_id:
-        query = query.filter(Bake.created_by == creator_id)
+    bakes = (await db.scalars(query.limit(limit))).all()
+    set_next_cursor(response, bakes, limit)
+    await counter_buffer.overlay("bake", bakes)
+    return bakes
+
+
+@router.get("/search", response_model=BakeSearchResults)
+async def search_bakes(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    search: Optional[str] = Query(None),
+    category: Optional[str] = Query(None),
+    creator_id: Optional[int] = Query(None),
+    tags: Optional[str] = Query(None),  # e.g. "gluten-free AND NOT allergen:nuts"
+    facet_limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Search bakes and count tags and allergens across all matches"""
+    query = _filter_bakes(category, creator_id, tags)
+    if search:
+        query = apply_search(query, Bake, search, db.bind.dialect.name)
+    else:
+        query = query.order_by(Bake.created_at.desc(), Bake.id.desc())
     
-    # Order by creation date (newest first)
-    query = query.order_by(Bake.created_at.desc())
+    facets = await get_tag_facets(db, query, Bake, "bake", facet_limit)
+    
+    bakes = (await db.scalars(query.offset(skip).limit(limit))).all()
+    return {"items": bakes, "facets": facets}
+
+
+@router.get("/tags/popular", response_model=List[TagCount])
+async def get_popular_bake_tags(
+    kind: str = Query("tag", pattern="^(tag|allergen)$"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get the most used bake tags or allergens"""
+    return await get_popular_tags(db, "bake", kind, limit)
+
+
+@router.get("/trending", response_model=List[BakeList])
+@cache_response(tags=["bakes:list"])
+async def get_trending_bakes(
+    limit: int = Query(20, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get trending bakes ranked by their time-decayed engagement score"""
+    # trending_score is maintained as likes and comments are counted, so this is a walk down idx_bakes_trending
+    bakes = (await db.scalars(
+        select(Bake).order_by(Bake.trending_score.desc(), Bake.id.desc()).limit(limit)
+    )).all()
+    await counter_buffer.overlay("bake", bakes)
     
-    bakes = query.offset(skip).limit(limit).all()
     return bakes
 
 
 @router.get("/my-bakes", response_model=List[BakeResponse])
 async def get_my_bakes(
     # current_user: User = Depends(get_current_user),  # Commented out for now
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get bakes created by the current user"""
     # For now, return all bakes since we don't have user authentication
-    bakes = db.query(Bake).order_by(Bake.created_at.desc()).all()
+    bakes = (await db.scalars(select(Bake).order_by(Bake.created_at.desc()))).all()
     return bakes
 
 
 @router.get("/{bake_id}", response_model=BakeResponse)
+@cache_response(tags=["bake:{bake_id}"], on_success=count_view("bake", "bake_id"))
 async def get_bake(
     bake_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get a specific bake by ID"""
-    bake = db.query(Bake).filter(Bake.id == bake_id).first()
+    bake = await db.scalar(select(Bake).filter(Bake.id == bake_id))
     
     if not bake:
         raise HTTPException(
@@ -108,6 +200,7 @@ async def get_bake(
             detail="Bake not found"
         )
     
+    await counter_buffer.overlay("bake", [bake])
     return bake
 
 
@@ -116,10 +209,10 @@ async def update_bake(
     bake_id: int,
     bake_data: BakeUpdate,
     # current_user: User = Depends(get_current_user),  # Commented out for now
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a bake"""
-    bake = db.query(Bake).filter(Bake.id == bake_id).first()
+    bake = await db.scalar(select(Bake).filter(Bake.id == bake_id))
     
     if not bake:
         raise HTTPException(
@@ -135,15 +228,24 @@ async def update_bake(
     #     )
     
     # Update bake fields
-    for field, value in bake_data.dict(exclude_unset=True).items():
+    update_data = bake_data.dict(exclude_unset=True)
+    for field, value in update_data.items():
         if field == 'price' and value is not None:
             # Convert price to cents
             setattr(bake, 'price_cents', int(float(value) * 100))
         else:
             setattr(bake, field, value)
     
-    db.commit()
-    db.refresh(bake)
+    if "image_url" in update_data:
+        bake.image_variants = variants_for_url(bake.image_url)
+    
+    if "tags" in update_data or "allergens" in update_data:
+        await index_item_tags(db, "bake", bake.id, bake.tags, bake.allergens)
+    
+    await db.commit()
+    await db.refresh(bake)
+    await response_cache.invalidate(f"bake:{bake_id}", "bakes:list")
+    await counter_buffer.overlay("bake", [bake])
     
     return bake
 
@@ -152,10 +254,10 @@ async def update_bake(
 async def delete_bake(
     bake_id: int,
     # current_user: User = Depends(get_current_user),  # Commented out for now
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a bake"""
-    bake = db.query(Bake).filter(Bake.id == bake_id).first()
+    bake = await db.scalar(select(Bake).filter(Bake.id == bake_id))
     
     if not bake:
         raise HTTPException(
@@ -170,8 +272,10 @@ async def delete_bake(
     #         detail="Only the creator can delete this bake"
     #         )
     
-    db.delete(bake)
-    db.commit()
+    await unindex_item_tags(db, "bake", bake.id)
+    await db.delete(bake)
+    await db.commit()
+    await response_cache.invalidate(f"bake:{bake_id}", "bakes:list")
     
     return None
 
@@ -180,17 +284,9 @@ async def delete_bake(
 async def like_bake(
     bake_id: int,
     # current_user: User = Depends(get_current_user),  # Commented out for now
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Like a bake"""
-    bake = db.query(Bake).filter(Bake.id == bake_id).first()
-    
-    if not bake:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Bake not found"
-        )
-    
     # Commented out self-like check for now
     # if bake.creator_id == current_user.id:
     #     raise HTTPException(
@@ -201,12 +297,18 @@ async def like_bake(
     # Check if already liked
     # This would depend on your likes implementation
     
-    # Increment like count
-    bake.like_count += 1
+    # Increment like count, which also checks the bake exists
+    if await adjust_counter(db, "bake", bake_id, "like_count", 1) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Bake not found"
+        )
     
-    db.commit()
-    db.refresh(bake)
+    await db.commit()
+    await response_cache.invalidate(f"bake:{bake_id}", "bakes:list")
     
+    bake = await db.scalar(select(Bake).filter(Bake.id == bake_id))
+    await counter_buffer.overlay("bake", [bake])
     return bake
 
 
@@ -214,10 +316,17 @@ async def like_bake(
 async def unlike_bake(
     bake_id: int,
     # current_user: User = Depends(get_current_user),  # Commented out for now
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Unlike a bake"""
-    bake = db.query(Bake).filter(Bake.id == bake_id).first()
+    # Check if already liked
+    # This would depend on your likes implementation
+    
+    # Decrement like count
+    await adjust_counter(db, "bake", bake_id, "like_count", -1)
+    await db.commit()
+    
+    bake = await db.scalar(select(Bake).filter(Bake.id == bake_id))
     
     if not bake:
         raise HTTPException(
@@ -225,28 +334,7 @@ async def unlike_bake(
             detail="Bake not found"
         )
     
-    # Check if already liked
-    # This would depend on your likes implementation
-    
-    # Decrement like count
-    if bake.like_count > 0:
-        bake.like_count -= 1
-    
-    db.commit()
-    db.refresh(bake)
+    await response_cache.invalidate(f"bake:{bake_id}", "bakes:list")
+    await counter_buffer.overlay("bake", [bake])
     
     return bake
-
-
-@router.get("/trending", response_model=List[BakeList])
-async def get_trending_bakes(
-    limit: int = Query(20, ge=1, le=50),
-    db: Session = Depends(get_db)
-):
-    """Get trending bakes based on likes and comments"""
-    # Simple trending algorithm: order by likes + comments
-    bakes = db.query(Bake).order_by(
-        (Bake.like_count + Bake.comment_count).desc()
-    ).limit(limit).all()
-    
-    return bakes
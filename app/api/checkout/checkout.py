@@ -1,15 +1,17 @@
 """
 Checkout API endpoints for xFood platform monetization
 """
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any
-from app.db.database import get_db
+from app.db.database import get_async_db
 from app.core.deps import get_current_user
 from app.models.user import User
 from app.models.recipe import Recipe
 from app.models.bake import Bake
-from app.services.stripe_service import StripeService
+from app.services.stripe_service import StripeService, ensure_stripe_customer
 from app.core.config import settings
 from app.schemas.checkout import CheckoutItemRequest, CheckoutSubscriptionRequest
 
@@ -19,13 +21,13 @@ router = APIRouter()
 async def create_item_checkout(
     request: CheckoutItemRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a checkout session for purchasing an item"""
     
     # Get the item details
     if request.item_type == "recipe":
-        item = db.query(Recipe).filter(Recipe.id == request.item_id).first()
+        item = await db.scalar(select(Recipe).filter(Recipe.id == request.item_id))
         if not item:
             raise HTTPException(status_code=404, detail="Recipe not found")
         if not item.is_premium or not item.price_cents:
@@ -33,7 +35,7 @@ async def create_item_checkout(
         seller_id = item.created_by
         amount_cents = item.price_cents
     elif request.item_type == "bake":
-        item = db.query(Bake).filter(Bake.id == request.item_id).first()
+        item = await db.scalar(select(Bake).filter(Bake.id == request.item_id))
         if not item:
             raise HTTPException(status_code=404, detail="Bake not found")
         if not item.available_for_order:
@@ -47,14 +49,8 @@ async def create_item_checkout(
     if seller_id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot purchase your own item")
     
-    # Get or create Stripe customer
-    if not current_user.stripe_customer_id:
-        stripe_customer = StripeService.create_customer(
-            email=current_user.email,
-            name=current_user.full_name
-        )
-        current_user.stripe_customer_id = stripe_customer.id
-        db.commit()
+    # Get or create Stripe customer (normally created in the background at sign-up)
+    customer_id = await ensure_stripe_customer(db, current_user)
     
     # Create payment intent
     metadata = {
@@ -65,9 +61,10 @@ async def create_item_checkout(
         "platform": "xfood"
     }
     
-    payment_intent = StripeService.create_payment_intent(
+    payment_intent = await asyncio.to_thread(
+        StripeService.create_payment_intent,
         amount_cents=amount_cents,
-        customer_id=current_user.stripe_customer_id,
+        customer_id=customer_id,
         metadata=metadata
     )
     
@@ -82,22 +79,17 @@ async def create_item_checkout(
 async def create_subscription_checkout(
     request: CheckoutSubscriptionRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a checkout session for subscription"""
     
-    # Get or create Stripe customer
-    if not current_user.stripe_customer_id:
-        stripe_customer = StripeService.create_customer(
-            email=current_user.email,
-            name=current_user.full_name
-        )
-        current_user.stripe_customer_id = stripe_customer.id
-        db.commit()
+    # Get or create Stripe customer (normally created in the background at sign-up)
+    customer_id = await ensure_stripe_customer(db, current_user)
     
     # Create checkout session
-    checkout_session = StripeService.create_subscription_checkout_session(
-        customer_id=current_user.stripe_customer_id,
+    checkout_session = await asyncio.to_thread(
+        StripeService.create_subscription_checkout_session,
+        customer_id=customer_id,
         price_id=settings.STRIPE_SUBSCRIPTION_PRICE_ID,
         success_url=f"{settings.FRONTEND_URL}/subscription/success",
         cancel_url=f"{settings.FRONTEND_URL}/subscription/cancel"
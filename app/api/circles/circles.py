@@ -3,29 +3,31 @@ Circles API endpoints for xFood platform
 """
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import CachedRoute, cache_response, response_cache
 from app.core.deps import get_current_user
-from app.db.database import get_db
+from app.db.database import get_async_db, get_read_db
 from app.models.user import User
 from app.models.circle import Circle
 from app.schemas.circle import CircleCreate, CircleUpdate, Circle as CircleSchema, CircleList
 from app.core.security import verify_user_permission
 
-router = APIRouter()
+router = APIRouter(route_class=CachedRoute)
 
 
 @router.post("/", response_model=CircleSchema, status_code=status.HTTP_201_CREATED)
 async def create_circle(
     circle_data: CircleCreate,
     # current_user: User = Depends(get_current_user),  # Commented out for now - anyone can post
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new baking circle"""
     # Commented out duplicate check for now
-    # existing_circle = db.query(Circle).filter(
+    # existing_circle = await db.scalar(select(Circle).filter(
     #     Circle.name == circle_data.name,
     #     Circle.creator_id == current_user.id
-    # ).first()
+    # ))
     
     # if existing_circle:
     #     raise HTTPException(
@@ -40,23 +42,25 @@ async def create_circle(
     )
     
     db.add(db_circle)
-    db.commit()
-    db.refresh(db_circle)
+    await db.commit()
+    await db.refresh(db_circle)
+    await response_cache.invalidate("circles:list")
     
     return db_circle
 
 
 @router.get("/", response_model=List[CircleList])
+@cache_response(tags=["circles:list"])
 async def list_circles(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     search: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     location: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List all public circles with optional filtering"""
-    query = db.query(Circle).filter(Circle.is_public == True)
+    query = select(Circle).filter(Circle.is_public == True)
     
     if search:
         query = query.filter(Circle.name.ilike(f"%{search}%"))
@@ -67,28 +71,29 @@ async def list_circles(
     if location:
         query = query.filter(Circle.location.ilike(f"%{location}%"))
     
-    circles = query.offset(skip).limit(limit).all()
+    circles = (await db.scalars(query.offset(skip).limit(limit))).all()
     return circles
 
 
 @router.get("/my-circles", response_model=List[CircleSchema])
 async def get_my_circles(
     # current_user: User = Depends(get_current_user),  # Commented out for now
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get circles created by the current user"""
     # For now, return all circles since we don't have user authentication
-    circles = db.query(Circle).all()
+    circles = (await db.scalars(select(Circle))).all()
     return circles
 
 
 @router.get("/{circle_id}", response_model=CircleSchema)
+@cache_response(tags=["circle:{circle_id}"])
 async def get_circle(
     circle_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get a specific circle by ID"""
-    circle = db.query(Circle).filter(Circle.id == circle_id).first()
+    circle = await db.scalar(select(Circle).filter(Circle.id == circle_id))
     
     if not circle:
         raise HTTPException(
@@ -110,10 +115,10 @@ async def update_circle(
     circle_id: int,
     circle_data: CircleUpdate,
     # current_user: User = Depends(get_current_user),  # Commented out for now
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a circle"""
-    circle = db.query(Circle).filter(Circle.id == circle_id).first()
+    circle = await db.scalar(select(Circle).filter(Circle.id == circle_id))
     
     if not circle:
         raise HTTPException(
@@ -132,8 +137,9 @@ async def update_circle(
     for field, value in circle_data.dict(exclude_unset=True).items():
         setattr(circle, field, value)
     
-    db.commit()
-    db.refresh(circle)
+    await db.commit()
+    await db.refresh(circle)
+    await response_cache.invalidate(f"circle:{circle_id}", "circles:list")
     
     return circle
 
@@ -142,10 +148,10 @@ async def update_circle(
 async def delete_circle(
     circle_id: int,
     # current_user: User = Depends(get_current_user),  # Commented out for now
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a circle"""
-    circle = db.query(Circle).filter(Circle.id == circle_id).first()
+    circle = await db.scalar(select(Circle).filter(Circle.id == circle_id))
     
     if not circle:
         raise HTTPException(
@@ -160,8 +166,9 @@ async def delete_circle(
     #         detail="Only the creator can delete this circle"
     #         )
     
-    db.delete(circle)
-    db.commit()
+    await db.delete(circle)
+    await db.commit()
+    await response_cache.invalidate(f"circle:{circle_id}", "circles:list")
     
     return None
 
@@ -170,10 +177,10 @@ async def delete_circle(
 async def join_circle(
     circle_id: int,
     # current_user: User = Depends(get_current_user),  # Commented out for now
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Join a circle"""
-    circle = db.query(Circle).filter(Circle.id == circle_id).first()
+    circle = await db.scalar(select(Circle).filter(Circle.id == circle_id))
     
     if not circle:
         raise HTTPException(
@@ -204,10 +211,10 @@ async def join_circle(
 async def leave_circle(
     circle_id: int,
     # current_user: User = Depends(get_current_user),  # Commented out for now
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Leave a circle"""
-    circle = db.query(Circle).filter(Circle.id == circle_id).first()
+    circle = await db.scalar(select(Circle).filter(Circle.id == circle_id))
     
     if not circle:
         raise HTTPException(
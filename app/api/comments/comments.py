@@ -2,15 +2,20 @@
 Comments API endpoints for xFood platform
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import item_tags, response_cache
+from sqlalchemy.orm import selectinload
 from app.core.deps import get_current_user
-from app.db.database import get_db
+from app.core.pagination import paginate_keyset, set_next_cursor
+from app.db.database import get_async_db, get_read_db
 from app.models.user import User
 from app.models.comment import Comment
 from app.models.bake import Bake
 from app.models.recipe import Recipe
 from app.schemas.comment import CommentCreate, CommentUpdate, Comment as CommentSchema
+from app.services.counter_service import adjust_counter
 from app.core.security import verify_user_permission
 
 router = APIRouter()
@@ -21,12 +26,11 @@ async def create_bake_comment(
     bake_id: int,
     comment_data: CommentCreate,
     # current_user: User = Depends(get_current_user),  # Commented out for now - anyone can post
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a comment on a bake"""
-    # Check if bake exists
-    bake = db.query(Bake).filter(Bake.id == bake_id).first()
-    if not bake:
+    # Update bake comment count, which also checks the bake exists
+    if await adjust_counter(db, "bake", bake_id, "comment_count", 1) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Bake not found"
@@ -42,11 +46,9 @@ async def create_bake_comment(
     
     db.add(db_comment)
     
-    # Update bake comment count
-    bake.comment_count += 1
-    
-    db.commit()
-    db.refresh(db_comment)
+    await db.commit()
+    await db.refresh(db_comment)
+    await response_cache.invalidate(*item_tags("bake", bake_id))
     
     return db_comment
 
@@ -56,12 +58,11 @@ async def create_recipe_comment(
     recipe_id: int,
     comment_data: CommentCreate,
     # current_user: User = Depends(get_current_user),  # Commented out for now - anyone can post
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a comment on a recipe"""
-    # Check if recipe exists
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
-    if not recipe:
+    # Update recipe comment count, which also checks the recipe exists
+    if await adjust_counter(db, "recipe", recipe_id, "comment_count", 1) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Recipe not found"
@@ -77,11 +78,9 @@ async def create_recipe_comment(
     
     db.add(db_comment)
     
-    # Update recipe comment count
-    recipe.comment_count += 1
-    
-    db.commit()
-    db.refresh(db_comment)
+    await db.commit()
+    await db.refresh(db_comment)
+    await response_cache.invalidate(*item_tags("recipe", recipe_id))
     
     return db_comment
 
@@ -89,46 +88,54 @@ async def create_recipe_comment(
 @router.get("/bake/{bake_id}", response_model=List[CommentSchema])
 async def get_bake_comments(
     bake_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),  # X-Next-Cursor of the previous page; overrides skip
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get comments for a specific bake"""
     # Check if bake exists
-    bake = db.query(Bake).filter(Bake.id == bake_id).first()
+    bake = await db.scalar(select(Bake).filter(Bake.id == bake_id))
     if not bake:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Bake not found"
         )
     
-    comments = db.query(Comment).filter(
-        Comment.bake_id == bake_id
-    ).order_by(Comment.created_at.desc()).offset(skip).limit(limit).all()
+    query = paginate_keyset(select(Comment).filter(Comment.bake_id == bake_id), Comment, cursor)
+    if not cursor:
+        query = query.offset(skip)
     
+    comments = (await db.scalars(query.limit(limit))).all()
+    set_next_cursor(response, comments, limit)
     return comments
 
 
 @router.get("/recipe/{recipe_id}", response_model=List[CommentSchema])
 async def get_recipe_comments(
     recipe_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),  # X-Next-Cursor of the previous page; overrides skip
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get comments for a specific recipe"""
     # Check if recipe exists
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.scalar(select(Recipe).filter(Recipe.id == recipe_id))
     if not recipe:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Recipe not found"
         )
     
-    comments = db.query(Comment).filter(
-        Comment.recipe_id == recipe_id
-    ).order_by(Comment.created_at.desc()).offset(skip).limit(limit).all()
+    query = paginate_keyset(select(Comment).filter(Comment.recipe_id == recipe_id), Comment, cursor)
+    if not cursor:
+        query = query.offset(skip)
     
+    comments = (await db.scalars(query.limit(limit))).all()
+    set_next_cursor(response, comments, limit)
     return comments
 
 
@@ -137,10 +144,10 @@ async def update_comment(
     comment_id: int,
     comment_data: CommentUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a comment"""
-    comment = db.query(Comment).filter(Comment.id == comment_id).first()
+    comment = await db.scalar(select(Comment).filter(Comment.id == comment_id))
     
     if not comment:
         raise HTTPException(
@@ -156,8 +163,8 @@ async def update_comment(
     
     # Update comment
     comment.content = comment_data.content
-    db.commit()
-    db.refresh(comment)
+    await db.commit()
+    await db.refresh(comment)
     
     return comment
 
@@ -166,10 +173,10 @@ async def update_comment(
 async def delete_comment(
     comment_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a comment"""
-    comment = db.query(Comment).filter(Comment.id == comment_id).first()
+    comment = await db.scalar(select(Comment).filter(Comment.id == comment_id))
     
     if not comment:
         raise HTTPException(
@@ -185,16 +192,14 @@ async def delete_comment(
     
     # Update parent comment count
     if comment.bake_id:
-        bake = db.query(Bake).filter(Bake.id == comment.bake_id).first()
-        if bake and bake.comment_count > 0:
-            bake.comment_count -= 1
+        await adjust_counter(db, "bake", comment.bake_id, "comment_count", -1)
     elif comment.recipe_id:
-        recipe = db.query(Recipe).filter(Recipe.id == comment.recipe_id).first()
-        if recipe and recipe.comment_count > 0:
-            recipe.comment_count -= 1
+        await adjust_counter(db, "recipe", comment.recipe_id, "comment_count", -1)
     
-    db.delete(comment)
-    db.commit()
+    tags = item_tags("bake", comment.bake_id) if comment.bake_id else item_tags("recipe", comment.recipe_id)
+    await db.delete(comment)
+    await db.commit()
+    await response_cache.invalidate(*tags)
     
     return None
 
@@ -202,12 +207,12 @@ async def delete_comment(
 @router.get("/my-comments", response_model=List[CommentSchema])
 async def get_my_comments(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get comments created by the current user"""
-    comments = db.query(Comment).filter(
+    comments = (await db.scalars(select(Comment).filter(
         Comment.user_id == current_user.id
-    ).order_by(Comment.created_at.desc()).all()
+    ).order_by(Comment.created_at.desc()))).all()
     
     return comments
 
@@ -220,10 +225,10 @@ async def get_comments(
     order_by: str = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get comments with optional filters"""
-    query = db.query(Comment)
+    query = select(Comment).options(selectinload(Comment.user))
     
     if bake_id:
         query = query.filter(Comment.bake_id == bake_id)
@@ -238,7 +243,7 @@ async def get_comments(
     else:
         query = query.order_by(Comment.created_at.desc())
     
-    comments = query.offset(skip).limit(limit).all()
+    comments = (await db.scalars(query.offset(skip).limit(limit))).all()
     
     # Add author_name and created_date for frontend compatibility
     result = []
@@ -264,7 +269,7 @@ async def get_comments(
 async def create_comment(
     comment_data: dict,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a comment"""
     bake_id = comment_data.get("bake_id")
@@ -285,17 +290,15 @@ async def create_comment(
             detail="Either bake_id or recipe_id must be provided"
         )
     
-    # Check if target exists
+    # Update comment count, which also checks the target exists
     if bake_id:
-        target = db.query(Bake).filter(Bake.id == bake_id).first()
-        if not target:
+        if await adjust_counter(db, "bake", bake_id, "comment_count", 1) is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Bake not found"
             )
     elif recipe_id:
-        target = db.query(Recipe).filter(Recipe.id == recipe_id).first()
-        if not target:
+        if await adjust_counter(db, "recipe", recipe_id, "comment_count", 1) is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Recipe not found"
@@ -312,14 +315,9 @@ async def create_comment(
     
     db.add(db_comment)
     
-    # Update comment count
-    if bake_id:
-        target.comment_count += 1
-    elif recipe_id:
-        target.comment_count += 1
-    
-    db.commit()
-    db.refresh(db_comment)
+    await db.commit()
+    await db.refresh(db_comment)
+    await response_cache.invalidate(*(item_tags("bake", bake_id) if bake_id else item_tags("recipe", recipe_id)))
     
     # Return with author_name for frontend compatibility
     result = {
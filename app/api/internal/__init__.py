@@ -0,0 +1,6 @@
+"""
+Internal API module for xFood platform
+"""
+from .internal import router
+
+__all__ = ["router"]
@@ -0,0 +1,136 @@
+"""
+Internal operational endpoints for xFood platform
+"""
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import response_cache
+from app.core.deps import get_current_admin
+from app.core.security import password_hasher
+from app.core.user_cache import user_cache
+from app.db.database import get_read_db, pool_metrics
+from app.models.user import User
+from app.services.blob_service import dedupe_metrics, get_blob_stats
+from app.services.counter_service import counter_buffer
+from app.services.image_service import image_pipeline
+
+router = APIRouter()
+
+
+@router.get("/db-pool")
+async def get_db_pool_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Get live database connection pool statistics (admin only)"""
+    return pool_metrics.snapshot()
+
+
+@router.post("/db-pool/reset")
+async def reset_db_pool_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Reset database connection pool counters (admin only)"""
+    pool_metrics.reset()
+    return {"message": "Pool metrics reset"}
+
+
+@router.get("/response-cache")
+async def get_response_cache_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Get response cache hit ratio by tier, bypasses and invalidations (admin only)"""
+    return response_cache.snapshot()
+
+
+@router.post("/response-cache/reset")
+async def reset_response_cache_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Reset response cache counters (admin only)"""
+    response_cache.reset()
+    return {"message": "Response cache metrics reset"}
+
+
+@router.get("/user-cache")
+async def get_user_cache_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Get authenticated user cache hit ratio and invalidations (admin only)"""
+    return user_cache.snapshot()
+
+
+@router.post("/user-cache/reset")
+async def reset_user_cache_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Reset authenticated user cache counters (admin only)"""
+    user_cache.reset()
+    return {"message": "User cache metrics reset"}
+
+
+@router.get("/counters")
+async def get_counter_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Get write-behind counter flush statistics and buffered items (admin only)"""
+    return counter_buffer.snapshot()
+
+
+@router.post("/counters/reset")
+async def reset_counter_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Reset write-behind counter statistics (admin only)"""
+    counter_buffer.reset()
+    return {"message": "Counter metrics reset"}
+
+
+@router.get("/password-hasher")
+async def get_password_hasher_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Get password hashing queue depth, timings and rehashes (admin only)"""
+    return password_hasher.snapshot()
+
+
+@router.post("/password-hasher/reset")
+async def reset_password_hasher_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Reset password hashing counters (admin only)"""
+    password_hasher.reset()
+    return {"message": "Password hasher metrics reset"}
+
+
+@router.get("/image-pipeline")
+async def get_image_pipeline_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Get image processing queue depth and timings (admin only)"""
+    return image_pipeline.snapshot()
+
+
+@router.post("/image-pipeline/reset")
+async def reset_image_pipeline_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Reset image processing counters (admin only)"""
+    image_pipeline.reset()
+    return {"message": "Image pipeline metrics reset"}
+
+
+@router.get("/image-store")
+async def get_image_store_stats(
+    current_user: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get image deduplication ratio, CPU saved and stored versus referenced bytes (admin only)"""
+    return await get_blob_stats(db)
+
+
+@router.post("/image-store/reset")
+async def reset_image_store_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Reset upload deduplication counters (admin only)"""
+    dedupe_metrics.reset()
+    return {"message": "Image store metrics reset"}
@@ -1,60 +1,43 @@
 """
 Likes API endpoints for xFood platform
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import item_tags, response_cache
 from app.core.deps import get_current_user
-from app.db.database import get_db
+from app.core.pagination import paginate_keyset, set_next_cursor
+from app.db.database import get_async_db, get_read_db
 from app.models.user import User
 from app.models.like import Like
-from app.models.bake import Bake
-from app.models.recipe import Recipe
-from app.schemas.like import Like as LikeSchema
+from app.schemas.like import Like as LikeSchema, LikeCheck
+from app.services.like_service import delete_like as remove_like, like_item, unlike_item
 
 router = APIRouter()
 
+# Most bake and recipe ids one /likes/check request may ask about
+MAX_LIKE_CHECK_IDS = 500
+
 
 @router.post("/bake/{bake_id}", response_model=LikeSchema, status_code=status.HTTP_201_CREATED)
 async def like_bake(
     bake_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Like a bake"""
-    # Check if bake exists
-    bake = db.query(Bake).filter(Bake.id == bake_id).first()
-    if not bake:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Bake not found"
-        )
-    
-    # Check if already liked
-    existing_like = db.query(Like).filter(
-        Like.user_id == current_user.id,
-        Like.bake_id == bake_id
-    ).first()
+    # One insert against the unique (user_id, bake_id) index; 404 if the bake does not exist
+    db_like = await like_item(db, current_user.id, "bake", bake_id)
     
-    if existing_like:
+    if db_like is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You have already liked this bake"
         )
     
-    # Create like
-    db_like = Like(
-        user_id=current_user.id,
-        bake_id=bake_id
-    )
-    
-    db.add(db_like)
-    
-    # Update bake like count
-    bake.like_count += 1
-    
-    db.commit()
-    db.refresh(db_like)
+    await db.commit()
+    await response_cache.invalidate(*item_tags("bake", bake_id))
     
     return db_like
 
@@ -63,42 +46,20 @@ async def like_bake(
 async def like_recipe(
     recipe_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Like a recipe"""
-    # Check if recipe exists
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
-    if not recipe:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Recipe not found"
-        )
-    
-    # Check if already liked
-    existing_like = db.query(Like).filter(
-        Like.user_id == current_user.id,
-        Like.recipe_id == recipe_id
-    ).first()
+    # One insert against the unique (user_id, recipe_id) index; 404 if the recipe does not exist
+    db_like = await like_item(db, current_user.id, "recipe", recipe_id)
     
-    if existing_like:
+    if db_like is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You have already liked this recipe"
         )
     
-    # Create like
-    db_like = Like(
-        user_id=current_user.id,
-        recipe_id=recipe_id
-    )
-    
-    db.add(db_like)
-    
-    # Update recipe like count
-    recipe.like_count += 1
-    
-    db.commit()
-    db.refresh(db_like)
+    await db.commit()
+    await response_cache.invalidate(*item_tags("recipe", recipe_id))
     
     return db_like
 
@@ -107,30 +68,17 @@ async def like_recipe(
 async def unlike_bake(
     bake_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Unlike a bake"""
-    # Find existing like
-    like = db.query(Like).filter(
-        Like.user_id == current_user.id,
-        Like.bake_id == bake_id
-    ).first()
-    
-    if not like:
+    if not await unlike_item(db, current_user.id, "bake", bake_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Like not found"
         )
     
-    # Delete like
-    db.delete(like)
-    
-    # Update bake like count
-    bake = db.query(Bake).filter(Bake.id == bake_id).first()
-    if bake and bake.like_count > 0:
-        bake.like_count -= 1
-    
-    db.commit()
+    await db.commit()
+    await response_cache.invalidate(*item_tags("bake", bake_id))
     
     return None
 
@@ -139,30 +87,17 @@ async def unlike_bake(
 async def unlike_recipe(
     recipe_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Unlike a recipe"""
-    # Find existing like
-    like = db.query(Like).filter(
-        Like.user_id == current_user.id,
-        Like.recipe_id == recipe_id
-    ).first()
-    
-    if not like:
+    if not await unlike_item(db, current_user.id, "recipe", recipe_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Like not found"
         )
     
-    # Delete like
-    db.delete(like)
-    
-    # Update recipe like count
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
-    if recipe and recipe.like_count > 0:
-        recipe.like_count -= 1
-    
-    db.commit()
+    await db.commit()
+    await response_cache.invalidate(*item_tags("recipe", recipe_id))
     
     return None
 
@@ -171,13 +106,13 @@ async def unlike_recipe(
 async def check_bake_like(
     bake_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Check if current user has liked a bake"""
-    like = db.query(Like).filter(
+    like = await db.scalar(select(Like).filter(
         Like.user_id == current_user.id,
         Like.bake_id == bake_id
-    ).first()
+    ))
     
     return {"liked": like is not None}
 
@@ -186,39 +121,78 @@ async def check_bake_like(
 async def check_recipe_like(
     recipe_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Check if current user has liked a recipe"""
-    like = db.query(Like).filter(
+    like = await db.scalar(select(Like).filter(
         Like.user_id == current_user.id,
         Like.recipe_id == recipe_id
-    ).first()
+    ))
     
     return {"liked": like is not None}
 
 
+@router.get("/check", response_model=LikeCheck)
+async def check_likes(
+    bake_ids: List[int] = Query([]),
+    recipe_ids: List[int] = Query([]),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Check which of a page of bakes and recipes the current user has liked"""
+    if len(bake_ids) + len(recipe_ids) > MAX_LIKE_CHECK_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_LIKE_CHECK_IDS} ids can be checked at once"
+        )
+    
+    # One round trip; each branch is an IN probe of a covering (user_id, item_id) index
+    queries = []
+    if bake_ids:
+        queries.append(select(literal("bake"), Like.bake_id).filter(
+            Like.user_id == current_user.id,
+            Like.bake_id.in_(set(bake_ids))
+        ))
+    if recipe_ids:
+        queries.append(select(literal("recipe"), Like.recipe_id).filter(
+            Like.user_id == current_user.id,
+            Like.recipe_id.in_(set(recipe_ids))
+        ))
+    if not queries:
+        return LikeCheck()
+    
+    liked = {"bake": set(), "recipe": set()}
+    for item_type, item_id in (await db.execute(union_all(*queries))).all():
+        liked[item_type].add(item_id)
+    
+    return LikeCheck(bake_ids=sorted(liked["bake"]), recipe_ids=sorted(liked["recipe"]))
+
+
 @router.get("/my-likes", response_model=List[LikeSchema])
 async def get_my_likes(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get likes created by the current user"""
-    likes = db.query(Like).filter(
+    likes = (await db.scalars(select(Like).filter(
         Like.user_id == current_user.id
-    ).order_by(Like.created_at.desc()).all()
+    ).order_by(Like.created_at.desc()))).all()
     
     return likes
 
 
 @router.get("", response_model=List[LikeSchema])
 async def get_likes(
+    response: Response,
     bake_id: int = None,
     recipe_id: int = None,
     user_email: str = None,
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),  # X-Next-Cursor of the previous page
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get likes with optional filters"""
-    query = db.query(Like)
+    query = select(Like)
     
     if bake_id:
         query = query.filter(Like.bake_id == bake_id)
@@ -226,11 +200,16 @@ async def get_likes(
         query = query.filter(Like.recipe_id == recipe_id)
     if user_email:
         # Find user by email and filter by user_id
-        user = db.query(User).filter(User.email == user_email).first()
+        user = await db.scalar(select(User).filter(User.email == user_email))
         if user:
             query = query.filter(Like.user_id == user.id)
     
-    likes = query.order_by(Like.created_at.desc()).all()
+    query = paginate_keyset(query, Like, cursor)
+    if limit:
+        query = query.limit(limit)
+    
+    likes = (await db.scalars(query)).all()
+    set_next_cursor(response, likes, limit)
     return likes
 
 
@@ -238,7 +217,7 @@ async def get_likes(
 async def create_like(
     like_data: dict,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a like"""
     bake_id = like_data.get("bake_id")
@@ -251,40 +230,17 @@ async def create_like(
             detail="Either bake_id or recipe_id must be provided"
         )
     
-    # Check for existing like
-    existing_like = db.query(Like).filter(
-        Like.user_id == current_user.id,
-        Like.bake_id == bake_id if bake_id else None,
-        Like.recipe_id == recipe_id if recipe_id else None
-    ).first()
+    item_type, item_id = ("bake", bake_id) if bake_id else ("recipe", recipe_id)
+    db_like = await like_item(db, current_user.id, item_type, item_id)
     
-    if existing_like:
+    if db_like is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You have already liked this item"
         )
     
-    # Create like
-    db_like = Like(
-        user_id=current_user.id,
-        bake_id=bake_id,
-        recipe_id=recipe_id
-    )
-    
-    db.add(db_like)
-    
-    # Update like count
-    if bake_id:
-        bake = db.query(Bake).filter(Bake.id == bake_id).first()
-        if bake:
-            bake.like_count += 1
-    elif recipe_id:
-        recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
-        if recipe:
-            recipe.like_count += 1
-    
-    db.commit()
-    db.refresh(db_like)
+    await db.commit()
+    await response_cache.invalidate(*item_tags(item_type, item_id))
     
     return db_like
 
@@ -293,31 +249,18 @@ async def create_like(
 async def delete_like(
     like_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a like by ID"""
-    like = db.query(Like).filter(
-        Like.id == like_id,
-        Like.user_id == current_user.id
-    ).first()
+    item = await remove_like(db, current_user.id, like_id)
     
-    if not like:
+    if item is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Like not found"
         )
     
-    # Update like count
-    if like.bake_id:
-        bake = db.query(Bake).filter(Bake.id == like.bake_id).first()
-        if bake and bake.like_count > 0:
-            bake.like_count -= 1
-    elif like.recipe_id:
-        recipe = db.query(Recipe).filter(Recipe.id == like.recipe_id).first()
-        if recipe and recipe.like_count > 0:
-            recipe.like_count -= 1
-    
-    db.delete(like)
-    db.commit()
+    await db.commit()
+    await response_cache.invalidate(*item_tags(*item))
     
     return None
@@ -2,27 +2,29 @@
 Messages API endpoints for xFood platform
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.deps import get_current_user
-from app.db.database import get_db
+from app.core.pagination import paginate_keyset, set_next_cursor
+from app.db.database import get_async_db, get_read_db
 from app.models.user import User
 from app.models.message import Message
-from app.schemas.message import MessageCreate, Message, MessageList
+from app.schemas.message import MessageCreate, Message as MessageSchema, MessageList
 from app.core.security import verify_user_permission
 
 router = APIRouter()
 
 
-@router.post("/", response_model=Message, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=MessageSchema, status_code=status.HTTP_201_CREATED)
 async def send_message(
     message_data: MessageCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Send a message to another user"""
     # Check if recipient exists
-    recipient = db.query(User).filter(User.id == message_data.receiver_id).first()
+    recipient = await db.scalar(select(User).filter(User.id == message_data.receiver_id))
     if not recipient:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -44,53 +46,63 @@ async def send_message(
     )
     
     db.add(db_message)
-    db.commit()
-    db.refresh(db_message)
+    await db.commit()
+    await db.refresh(db_message)
     
     return db_message
 
 
 @router.get("/inbox", response_model=List[MessageList])
 async def get_inbox(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None),  # X-Next-Cursor of the previous page; overrides skip
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get received messages"""
-    messages = db.query(Message).filter(
-        Message.receiver_id == current_user.id
-    ).order_by(Message.created_at.desc()).offset(skip).limit(limit).all()
+    query = paginate_keyset(select(Message).filter(Message.receiver_id == current_user.id), Message, cursor)
+    if not cursor:
+        query = query.offset(skip)
     
+    messages = (await db.scalars(query.limit(limit))).all()
+    set_next_cursor(response, messages, limit)
     return messages
 
 
 @router.get("/sent", response_model=List[MessageList])
 async def get_sent_messages(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None),  # X-Next-Cursor of the previous page; overrides skip
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get sent messages"""
-    messages = db.query(Message).filter(
-        Message.sender_id == current_user.id
-    ).order_by(Message.created_at.desc()).offset(skip).limit(limit).all()
+    query = paginate_keyset(select(Message).filter(Message.sender_id == current_user.id), Message, cursor)
+    if not cursor:
+        query = query.offset(skip)
     
+    messages = (await db.scalars(query.limit(limit))).all()
+    set_next_cursor(response, messages, limit)
     return messages
 
 
-@router.get("/conversation/{user_id}", response_model=List[Message])
+@router.get("/conversation/{user_id}", response_model=List[MessageSchema])
 async def get_conversation(
     user_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None),  # X-Next-Cursor of the previous page; overrides skip
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get conversation with a specific user"""
     # Check if other user exists
-    other_user = db.query(User).filter(User.id == user_id).first()
+    other_user = await db.scalar(select(User).filter(User.id == user_id))
     if not other_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -98,22 +110,26 @@ async def get_conversation(
         )
     
     # Get messages between current user and other user
-    messages = db.query(Message).filter(
+    query = paginate_keyset(select(Message).filter(
         ((Message.sender_id == current_user.id) & (Message.receiver_id == user_id)) |
         ((Message.sender_id == user_id) & (Message.receiver_id == current_user.id))
-    ).order_by(Message.created_at.desc()).offset(skip).limit(limit).all()
+    ), Message, cursor)
+    if not cursor:
+        query = query.offset(skip)
     
+    messages = (await db.scalars(query.limit(limit))).all()
+    set_next_cursor(response, messages, limit)
     return messages
 
 
-@router.get("/{message_id}", response_model=Message)
+@router.get("/{message_id}", response_model=MessageSchema)
 async def get_message(
     message_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific message"""
-    message = db.query(Message).filter(Message.id == message_id).first()
+    message = await db.scalar(select(Message).filter(Message.id == message_id))
     
     if not message:
         raise HTTPException(
@@ -131,8 +147,8 @@ async def get_message(
     # Mark as read if receiver is viewing
     if message.receiver_id == current_user.id and not message.is_read:
         message.is_read = True
-        db.commit()
-        db.refresh(message)
+        await db.commit()
+        await db.refresh(message)
     
     return message
 
@@ -141,10 +157,10 @@ async def get_message(
 async def delete_message(
     message_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a message"""
-    message = db.query(Message).filter(Message.id == message_id).first()
+    message = await db.scalar(select(Message).filter(Message.id == message_id))
     
     if not message:
         raise HTTPException(
@@ -159,20 +175,20 @@ async def delete_message(
             detail="Only the sender can delete this message"
         )
     
-    db.delete(message)
-    db.commit()
+    await db.delete(message)
+    await db.commit()
     
     return None
 
 
-@router.post("/{message_id}/read", response_model=Message)
+@router.post("/{message_id}/read", response_model=MessageSchema)
 async def mark_as_read(
     message_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mark a message as read"""
-    message = db.query(Message).filter(Message.id == message_id).first()
+    message = await db.scalar(select(Message).filter(Message.id == message_id))
     
     if not message:
         raise HTTPException(
@@ -188,8 +204,8 @@ async def mark_as_read(
         )
     
     message.is_read = True
-    db.commit()
-    db.refresh(message)
+    await db.commit()
+    await db.refresh(message)
     
     return message
 
@@ -197,13 +213,13 @@ async def mark_as_read(
 @router.get("/unread/count")
 async def get_unread_count(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get count of unread messages"""
-    count = db.query(Message).filter(
+    count = await db.scalar(select(func.count()).select_from(Message).filter(
         Message.receiver_id == current_user.id,
         Message.is_read == False
-    ).count()
+    ))
     
     return {"unread_count": count}
 
@@ -211,21 +227,21 @@ async def get_unread_count(
 @router.get("/conversations", response_model=List[dict])
 async def get_conversations(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get list of conversations for current user"""
     # Get unique users with whom current user has conversations
     conversations = []
     
     # Get conversations where current user is sender
-    sent_conversations = db.query(Message.receiver_id).filter(
+    sent_conversations = (await db.execute(select(Message.receiver_id).filter(
         Message.sender_id == current_user.id
-    ).distinct().all()
+    ).distinct())).all()
     
     # Get conversations where current user is receiver
-    received_conversations = db.query(Message.sender_id).filter(
+    received_conversations = (await db.execute(select(Message.sender_id).filter(
         Message.receiver_id == current_user.id
-    ).distinct().all()
+    ).distinct())).all()
     
     # Combine and get unique user IDs
     user_ids = set()
@@ -236,18 +252,18 @@ async def get_conversations(
     
     # Get user details and last message for each conversation
     for user_id in user_ids:
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.scalar(select(User).filter(User.id == user_id))
         if user:
-            last_message = db.query(Message).filter(
+            last_message = await db.scalar(select(Message).filter(
                 ((Message.sender_id == current_user.id) & (Message.receiver_id == user_id)) |
                 ((Message.sender_id == user_id) & (Message.receiver_id == current_user.id))
-            ).order_by(Message.created_at.desc()).first()
+            ).order_by(Message.created_at.desc()).limit(1))
             
-            unread_count = db.query(Message).filter(
+            unread_count = await db.scalar(select(func.count()).select_from(Message).filter(
                 Message.sender_id == user_id,
                 Message.receiver_id == current_user.id,
                 Message.is_read == False
-            ).count()
+            ))
             
             conversations.append({
                 "user_id": user.id,
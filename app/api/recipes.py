@@ -3,13 +3,17 @@ Recipes API endpoints
 """
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 # from app.core.deps import get_current_user, get_current_baker  # Commented out - no auth required
-from app.db.database import get_db
+from app.db.database import get_async_db, get_read_db
+from app.db.search import apply_search
 from app.models.user import User
 from app.models.recipe import Recipe
 from app.schemas.recipe import RecipeCreate, RecipeUpdate, Recipe as RecipeSchema, RecipeList, RecipeSearch
+from app.services.image_service import variants_for_url
+from app.services.ingredient_service import index_recipe_ingredients, unindex_recipe_ingredients
+from app.services.tag_service import apply_tag_filter, get_popular_tags as count_popular_tags, index_item_tags, unindex_item_tags
 
 router = APIRouter()
 
@@ -17,7 +21,7 @@ router = APIRouter()
 @router.post("/", response_model=RecipeSchema, status_code=status.HTTP_201_CREATED)
 async def create_recipe(
     recipe_data: RecipeCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     # current_user: User = Depends(get_current_user)  # Commented out for now - anyone can post
 ):
     """Create a new recipe"""
@@ -27,8 +31,11 @@ async def create_recipe(
     )
     
     db.add(db_recipe)
-    db.commit()
-    db.refresh(db_recipe)
+    await db.flush()
+    await index_recipe_ingredients(db, db_recipe)
+    await index_item_tags(db, "recipe", db_recipe.id, db_recipe.tags)
+    await db.commit()
+    await db.refresh(db_recipe)
     return db_recipe
 
 
@@ -43,20 +50,11 @@ async def get_recipes(
     min_rating: Optional[float] = None,
     max_prep_time: Optional[int] = None,
     max_cook_time: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     # current_user: Optional[User] = Depends(get_optional_user)  # Commented out - no auth required
 ):
     """Get recipes with filtering and search"""
-    query = db.query(Recipe)
-    
-    # Search by title or description
-    if search:
-        query = query.filter(
-            or_(
-                Recipe.title.ilike(f"%{search}%"),
-                Recipe.description.ilike(f"%{search}%")
-            )
-        )
+    query = select(Recipe)
     
     # Filter by category
     if category:
@@ -66,11 +64,9 @@ async def get_recipes(
     if difficulty:
         query = query.filter(Recipe.difficulty == difficulty)
     
-    # Filter by tags
+    # Filter by tags (comma-separated tags must all match; AND/OR/NOT also accepted)
     if tags:
-        tag_list = [tag.strip() for tag in tags.split(",")]
-        for tag in tag_list:
-            query = query.filter(Recipe.tags.contains([tag]))
+        query = apply_tag_filter(query, Recipe, "recipe", tags)
     
     # Filter by minimum rating
     if min_rating is not None:
@@ -84,21 +80,24 @@ async def get_recipes(
     if max_cook_time is not None:
         query = query.filter(Recipe.cook_time <= max_cook_time)
     
-    # Order by creation date (newest first)
-    query = query.order_by(Recipe.created_at.desc())
+    # Full-text search ranks by relevance; otherwise newest first
+    if search:
+        query = apply_search(query, Recipe, search, db.bind.dialect.name)
+    else:
+        query = query.order_by(Recipe.created_at.desc())
     
-    recipes = query.offset(skip).limit(limit).all()
+    recipes = (await db.scalars(query.offset(skip).limit(limit))).all()
     return recipes
 
 
 @router.get("/{recipe_id}", response_model=RecipeSchema)
 async def get_recipe(
     recipe_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     # current_user: Optional[User] = Depends(get_optional_user)  # Commented out - no auth required
 ):
     """Get recipe by ID"""
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.scalar(select(Recipe).filter(Recipe.id == recipe_id))
     if not recipe:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -112,11 +111,11 @@ async def get_recipe(
 async def update_recipe(
     recipe_id: int,
     recipe_update: RecipeUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     # current_user: User = Depends(get_current_user)  # Commented out for now
 ):
     """Update recipe"""
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.scalar(select(Recipe).filter(Recipe.id == recipe_id))
     if not recipe:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -135,19 +134,28 @@ async def update_recipe(
     for field, value in update_data.items():
         setattr(recipe, field, value)
     
-    db.commit()
-    db.refresh(recipe)
+    if "ingredients" in update_data:
+        await index_recipe_ingredients(db, recipe)
+    
+    if "image_url" in update_data:
+        recipe.image_variants = variants_for_url(recipe.image_url)
+    
+    if "tags" in update_data:
+        await index_item_tags(db, "recipe", recipe.id, recipe.tags)
+    
+    await db.commit()
+    await db.refresh(recipe)
     return recipe
 
 
 @router.delete("/{recipe_id}")
 async def delete_recipe(
     recipe_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     # current_user: User = Depends(get_current_user)  # Commented out for now
 ):
     """Delete recipe"""
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.scalar(select(Recipe).filter(Recipe.id == recipe_id))
     if not recipe:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -161,8 +169,10 @@ async def delete_recipe(
     #         detail="Not enough permissions"
     #         )
     
-    db.delete(recipe)
-    db.commit()
+    await unindex_recipe_ingredients(db, recipe.id)
+    await unindex_item_tags(db, "recipe", recipe.id)
+    await db.delete(recipe)
+    await db.commit()
     return {"message": "Recipe deleted successfully"}
 
 
@@ -171,13 +181,13 @@ async def get_user_recipes(
     user_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     # current_user: Optional[User] = Depends(get_optional_user)  # Commented out - no auth required
 ):
     """Get recipes by user ID"""
-    recipes = db.query(Recipe).filter(
+    recipes = (await db.scalars(select(Recipe).filter(
         Recipe.created_by == user_id
-    ).order_by(Recipe.created_at.desc()).offset(skip).limit(limit).all()
+    ).order_by(Recipe.created_at.desc()).offset(skip).limit(limit))).all()
     
     return recipes
 
@@ -202,14 +212,8 @@ async def get_recipe_difficulties():
 @router.get("/tags/popular")
 async def get_popular_tags(
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get popular recipe tags"""
-    # This is a simplified version - in production you might want to count tag usage
-    popular_tags = [
-        "vegan", "gluten-free", "dairy-free", "sugar-free", 
-        "keto", "organic", "quick", "healthy", "seasonal",
-        "holiday", "birthday", "wedding", "party", "comfort",
-        "gourmet", "traditional", "modern", "fusion"
-    ]
-    return {"tags": popular_tags[:limit]}
+    popular_tags = await count_popular_tags(db, "recipe", "tag", limit)
+    return {"tags": [tag["value"] for tag in popular_tags]}
@@ -2,23 +2,36 @@
 Recipes API endpoints for xFood platform
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import CachedRoute, cache_response, response_cache
 from app.core.deps import get_current_user
-from app.db.database import get_db
+from app.core.pagination import paginate_keyset, set_next_cursor
+from app.db.database import get_async_db, get_read_db
+from app.db.search import apply_search
 from app.models.user import User
-from app.models.recipe import Recipe
-from app.schemas.recipe import RecipeCreate, RecipeUpdate, Recipe as RecipeSchema, RecipeList
+from app.models.recipe import Recipe, RecipeIngredient
+from app.schemas.recipe import RecipeCreate, RecipeUpdate, Recipe as RecipeSchema, RecipeList, PantryMatch, RecipeSearchResults
+from app.schemas.tag import TagCount
+from app.services.counter_service import adjust_counter, count_view, counter_buffer
+from app.services.image_service import variants_for_url
+from app.services.ingredient_service import (
+    index_recipe_ingredients, indexed_ingredients, unindex_recipe_ingredients
+)
+from app.services.tag_service import (
+    apply_tag_filter, get_popular_tags, get_tag_facets, index_item_tags, unindex_item_tags
+)
 from app.core.security import verify_user_permission
 
-router = APIRouter()
+router = APIRouter(route_class=CachedRoute)
 
 
 @router.post("/", response_model=RecipeSchema, status_code=status.HTTP_201_CREATED)
 async def create_recipe(
     recipe_data: RecipeCreate,
     # current_user: User = Depends(get_current_user),  # Commented out for now - anyone can post
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new recipe"""
     # Create new recipe with default creator ID
@@ -28,14 +41,48 @@ async def create_recipe(
     )
     
     db.add(db_recipe)
-    db.commit()
-    db.refresh(db_recipe)
+    await db.flush()
+    await index_recipe_ingredients(db, db_recipe)
+    await index_item_tags(db, "recipe", db_recipe.id, db_recipe.tags)
+    await db.commit()
+    await db.refresh(db_recipe)
+    await response_cache.invalidate("recipes:list")
     
     return db_recipe
 
 
+def _filter_recipes(
+    category: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    cooking_time: Optional[int] = None,
+    creator_id: Optional[int] = None,
+    tags: Optional[str] = None
+):
+    """Build the recipe query shared by the list and search endpoints"""
+    query = select(Recipe)
+    
+    if category:
+        query = query.filter(Recipe.category == category)
+    
+    if difficulty:
+        query = query.filter(Recipe.difficulty == difficulty)
+    
+    if cooking_time:
+        query = query.filter(Recipe.cook_time <= cooking_time)
+    
+    if creator_id:
+        query = query.filter(Recipe.created_by == creator_id)
+    
+    if tags:
+        query = apply_tag_filter(query, Recipe, "recipe", tags)
+    
+    return query
+
+
 @router.get("/", response_model=List[RecipeList])
+@cache_response(tags=["recipes:list"])
 async def list_recipes(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     search: Optional[str] = Query(None),
@@ -43,50 +90,170 @@ async def list_recipes(
     difficulty: Optional[str] = Query(None),
     cooking_time: Optional[int] = Query(None),
     creator_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    tags: Optional[str] = Query(None),  # e.g. "vegan OR vegetarian"
+    cursor: Optional[str] = Query(None),  # X-Next-Cursor of the previous page; overrides skip
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """List all recipes with optional filtering"""
-    query = db.query(Recipe)
+    """List all recipes with optional filtering and cursor pagination"""
+    query = _filter_recipes(category, difficulty, cooking_time, creator_id, tags)
     
     if search:
-        query = query.filter(Recipe.title.ilike(f"%{search}%"))
+        # Ranked by relevance, so paged with skip rather than a cursor
+        query = apply_search(query, Recipe, search, db.bind.dialect.name).offset(skip)
+        return (await db.scalars(query.limit(limit))).all()
     
-    if category:
-        query = query.filter(Recipe.category == category)
+    # Order by creation date (newest first)
+    query = paginate_keyset(query, Recipe, cursor)
+    if not cursor:
+        query = query.offset(skip)
     
-    if difficulty:
-        query = query.filter(Recipe.difficulty == difficulty)
+    recipes = (await db.scalars(query.limit(limit))).all()
+    set_next_cursor(response, recipes, limit)
+    return recipes
+
+
+@router.get("/search", response_model=RecipeSearchResults)
+async def search_recipes(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    search: Optional[str] = Query(None),
+    category: Optional[str] = Query(None),
+    difficulty: Optional[str] = Query(None),
+    cooking_time: Optional[int] = Query(None),
+    creator_id: Optional[int] = Query(None),
+    tags: Optional[str] = Query(None),  # e.g. "vegan OR vegetarian"
+    facet_limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Search recipes and count tags across all matches"""
+    query = _filter_recipes(category, difficulty, cooking_time, creator_id, tags)
+    if search:
+        query = apply_search(query, Recipe, search, db.bind.dialect.name)
+    else:
+        query = query.order_by(Recipe.created_at.desc(), Recipe.id.desc())
     
-    if cooking_time:
-        query = query.filter(Recipe.cook_time <= cooking_time)
+    facets = await get_tag_facets(db, query, Recipe, "recipe", facet_limit)
     
-    if creator_id:
-        query = query.filter(Recipe.created_by == creator_id)
+    recipes = (await db.scalars(query.offset(skip).limit(limit))).all()
+    return {"items": recipes, "facets": facets}
+
+
+@router.get("/tags/popular", response_model=List[TagCount])
+async def get_popular_recipe_tags(
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get the most used recipe tags"""
+    return await get_popular_tags(db, "recipe", "tag", limit)
+
+
+@router.get("/pantry", response_model=List[PantryMatch])
+async def match_pantry(
+    ingredients: str = Query(..., min_length=1),  # comma-separated, free text ("2 eggs, flour")
+    max_missing: Optional[int] = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Find recipes that can be made from a pantry, ranked by ingredient coverage"""
+    # Staples are not indexed, so they neither match nor count as missing
+    pantry = indexed_ingredients(ingredients.split(","))
+    if not pantry:
+        return []
+    
+    # Union of the pantry's posting lists, counted per recipe
+    matched = (
+        select(RecipeIngredient.recipe_id, func.count().label("matched_count"))
+        .filter(RecipeIngredient.ingredient.in_(pantry))
+        .group_by(RecipeIngredient.recipe_id)
+        .subquery()
+    )
+    coverage = matched.c.matched_count * 1.0 / Recipe.ingredient_count
+    query = (
+        select(Recipe, matched.c.matched_count)
+        .join(matched, matched.c.recipe_id == Recipe.id)
+        .filter(Recipe.ingredient_count > 0)
+        .order_by(coverage.desc(), matched.c.matched_count.desc(), Recipe.id.desc())
+        .limit(limit)
+    )
+    if max_missing is not None:
+        query = query.filter(Recipe.ingredient_count - matched.c.matched_count <= max_missing)
+    
+    rows = (await db.execute(query)).all()
+    if not rows:
+        return []
+    
+    # Missing ingredients for the returned page only
+    missing = {}
+    missing_rows = await db.execute(
+        select(RecipeIngredient.recipe_id, RecipeIngredient.ingredient)
+        .filter(
+            RecipeIngredient.recipe_id.in_([recipe.id for recipe, _ in rows]),
+            RecipeIngredient.ingredient.not_in(pantry)
+        )
+        .order_by(RecipeIngredient.recipe_id, RecipeIngredient.ingredient)
+    )
+    for recipe_id, ingredient in missing_rows:
+        missing.setdefault(recipe_id, []).append(ingredient)
+    
+    return [
+        PantryMatch(
+            recipe=RecipeList.model_validate(recipe),
+            matched_count=matched_count,
+            ingredient_count=recipe.ingredient_count,
+            coverage=matched_count / recipe.ingredient_count,
+            missing_ingredients=missing.get(recipe.id, [])
+        )
+        for recipe, matched_count in rows
+    ]
+
+
+@router.get("/popular", response_model=List[RecipeList])
+@cache_response(tags=["recipes:list"])
+async def get_popular_recipes(
+    limit: int = Query(20, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get popular recipes based on favorites and views"""
+    recipes = (await db.scalars(select(Recipe).order_by(
+        (Recipe.favorite_count + Recipe.view_count).desc()
+    ).limit(limit))).all()
     
-    # Order by creation date (newest first)
-    query = query.order_by(Recipe.created_at.desc())
+    return recipes
+
+
+@router.get("/quick", response_model=List[RecipeList])
+@cache_response(tags=["recipes:list"])
+async def get_quick_recipes(
+    max_time: int = Query(30, ge=1, le=180),
+    limit: int = Query(20, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get quick recipes under specified time"""
+    recipes = (await db.scalars(select(Recipe).filter(
+        Recipe.cook_time <= max_time
+    ).order_by(Recipe.cook_time.asc()).limit(limit))).all()
     
-    recipes = query.offset(skip).limit(limit).all()
     return recipes
 
 
 @router.get("/my-recipes", response_model=List[RecipeSchema])
 async def get_my_recipes(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get recipes created by the current user"""
-    recipes = db.query(Recipe).filter(Recipe.created_by == current_user.id).order_by(Recipe.created_at.desc()).all()
+    recipes = (await db.scalars(select(Recipe).filter(Recipe.created_by == current_user.id).order_by(Recipe.created_at.desc()))).all()
     return recipes
 
 
 @router.get("/{recipe_id}", response_model=RecipeSchema)
+@cache_response(tags=["recipe:{recipe_id}"], on_success=count_view("recipe", "recipe_id"))
 async def get_recipe(
     recipe_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get a specific recipe by ID"""
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.scalar(select(Recipe).filter(Recipe.id == recipe_id))
     
     if not recipe:
         raise HTTPException(
@@ -94,6 +261,7 @@ async def get_recipe(
             detail="Recipe not found"
         )
     
+    await counter_buffer.overlay("recipe", [recipe])
     return recipe
 
 
@@ -102,10 +270,10 @@ async def update_recipe(
     recipe_id: int,
     recipe_data: RecipeUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a recipe"""
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.scalar(select(Recipe).filter(Recipe.id == recipe_id))
     
     if not recipe:
         raise HTTPException(
@@ -120,11 +288,23 @@ async def update_recipe(
         )
     
     # Update recipe fields
-    for field, value in recipe_data.dict(exclude_unset=True).items():
+    update_data = recipe_data.dict(exclude_unset=True)
+    for field, value in update_data.items():
         setattr(recipe, field, value)
     
-    db.commit()
-    db.refresh(recipe)
+    if "ingredients" in update_data:
+        await index_recipe_ingredients(db, recipe)
+    
+    if "image_url" in update_data:
+        recipe.image_variants = variants_for_url(recipe.image_url)
+    
+    if "tags" in update_data:
+        await index_item_tags(db, "recipe", recipe.id, recipe.tags)
+    
+    await db.commit()
+    await db.refresh(recipe)
+    await response_cache.invalidate(f"recipe:{recipe_id}", "recipes:list")
+    await counter_buffer.overlay("recipe", [recipe])
     
     return recipe
 
@@ -133,10 +313,10 @@ async def update_recipe(
 async def delete_recipe(
     recipe_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a recipe"""
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.scalar(select(Recipe).filter(Recipe.id == recipe_id))
     
     if not recipe:
         raise HTTPException(
@@ -150,8 +330,11 @@ async def delete_recipe(
             detail="Only the creator can delete this recipe"
         )
     
-    db.delete(recipe)
-    db.commit()
+    await unindex_recipe_ingredients(db, recipe.id)
+    await unindex_item_tags(db, "recipe", recipe.id)
+    await db.delete(recipe)
+    await db.commit()
+    await response_cache.invalidate(f"recipe:{recipe_id}", "recipes:list")
     
     return None
 
@@ -160,10 +343,10 @@ async def delete_recipe(
 async def favorite_recipe(
     recipe_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add recipe to favorites"""
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.scalar(select(Recipe).filter(Recipe.id == recipe_id))
     
     if not recipe:
         raise HTTPException(
@@ -181,10 +364,12 @@ async def favorite_recipe(
     # This would depend on your favorites implementation
     
     # Increment favorite count
-    recipe.favorite_count += 1
+    await adjust_counter(db, "recipe", recipe_id, "favorite_count", 1)
     
-    db.commit()
-    db.refresh(recipe)
+    await db.commit()
+    await db.refresh(recipe)
+    await response_cache.invalidate(f"recipe:{recipe_id}", "recipes:list")
+    await counter_buffer.overlay("recipe", [recipe])
     
     return recipe
 
@@ -193,10 +378,10 @@ async def favorite_recipe(
 async def unfavorite_recipe(
     recipe_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Remove recipe from favorites"""
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.scalar(select(Recipe).filter(Recipe.id == recipe_id))
     
     if not recipe:
         raise HTTPException(
@@ -208,37 +393,11 @@ async def unfavorite_recipe(
     # This would depend on your favorites implementation
     
     # Decrement favorite count
-    if recipe.favorite_count > 0:
-        recipe.favorite_count -= 1
+    await adjust_counter(db, "recipe", recipe_id, "favorite_count", -1)
     
-    db.commit()
-    db.refresh(recipe)
+    await db.commit()
+    await db.refresh(recipe)
+    await response_cache.invalidate(f"recipe:{recipe_id}", "recipes:list")
+    await counter_buffer.overlay("recipe", [recipe])
     
     return recipe
-
-
-@router.get("/popular", response_model=List[RecipeList])
-async def get_popular_recipes(
-    limit: int = Query(20, ge=1, le=50),
-    db: Session = Depends(get_db)
-):
-    """Get popular recipes based on favorites and views"""
-    recipes = db.query(Recipe).order_by(
-        (Recipe.favorite_count + Recipe.view_count).desc()
-    ).limit(limit).all()
-    
-    return recipes
-
-
-@router.get("/quick", response_model=List[RecipeList])
-async def get_quick_recipes(
-    max_time: int = Query(30, ge=1, le=180),
-    limit: int = Query(20, ge=1, le=50),
-    db: Session = Depends(get_db)
-):
-    """Get quick recipes under specified time"""
-    recipes = db.query(Recipe).filter(
-        Recipe.cook_time <= max_time
-    ).order_by(Recipe.cook_time.asc()).limit(limit).all()
-    
-    return recipes
@@ -3,39 +3,35 @@ Reviews API endpoints for xFood platform
 """
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import item_tags, response_cache
 from app.core.deps import get_current_user
-from app.db.database import get_db
+from app.db.database import get_async_db, get_read_db
 from app.models.user import User
 from app.models.review import Review
 from app.models.recipe import Recipe
-from app.schemas.review import ReviewCreate, ReviewUpdate, Review, ReviewList
+from app.schemas.review import ReviewCreate, ReviewUpdate, Review as ReviewSchema, ReviewList
 from app.core.security import verify_user_permission
+from app.services.rating_service import adjust_rating
 
 router = APIRouter()
 
 
-@router.post("/recipe/{recipe_id}", response_model=Review, status_code=status.HTTP_201_CREATED)
+@router.post("/recipe/{recipe_id}", response_model=ReviewSchema, status_code=status.HTTP_201_CREATED)
 async def create_review(
     recipe_id: int,
     review_data: ReviewCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a review for a recipe"""
-    # Check if recipe exists
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
-    if not recipe:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Recipe not found"
-        )
-    
     # Check if user already reviewed this recipe
-    existing_review = db.query(Review).filter(
+    existing_review = await db.scalar(select(Review.id).filter(
         Review.user_id == current_user.id,
-        Review.recipe_id == recipe_id
-    ).first()
+        Review.item_type == "recipe",
+        Review.item_id == recipe_id
+    ))
     
     if existing_review:
         raise HTTPException(
@@ -43,26 +39,26 @@ async def create_review(
             detail="You have already reviewed this recipe"
         )
     
+    # Add the rating to the recipe's aggregates, which also checks the recipe exists
+    if not await adjust_rating(db, "recipe", recipe_id, added=review_data.rating):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recipe not found"
+        )
+    
     # Create review
     db_review = Review(
         rating=review_data.rating,
         comment=review_data.comment,
         user_id=current_user.id,
-        recipe_id=recipe_id
+        item_type="recipe",
+        item_id=recipe_id
     )
     
     db.add(db_review)
-    
-    # Update recipe review count and rating
-    recipe.review_count += 1
-    
-    # Recalculate average rating
-    all_reviews = db.query(Review).filter(Review.recipe_id == recipe_id).all()
-    total_rating = sum(review.rating for review in all_reviews) + review_data.rating
-    recipe.rating = total_rating / (recipe.review_count)
-    
-    db.commit()
-    db.refresh(db_review)
+    await db.commit()
+    await db.refresh(db_review)
+    await response_cache.invalidate(*item_tags("recipe", recipe_id))
     
     return db_review
 
@@ -72,31 +68,32 @@ async def get_recipe_reviews(
     recipe_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get reviews for a specific recipe"""
     # Check if recipe exists
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.scalar(select(Recipe).filter(Recipe.id == recipe_id))
     if not recipe:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Recipe not found"
         )
     
-    reviews = db.query(Review).filter(
-        Review.recipe_id == recipe_id
-    ).order_by(Review.created_at.desc()).offset(skip).limit(limit).all()
+    reviews = (await db.scalars(select(Review).filter(
+        Review.item_type == "recipe",
+        Review.item_id == recipe_id
+    ).order_by(Review.created_at.desc()).offset(skip).limit(limit))).all()
     
     return reviews
 
 
-@router.get("/{review_id}", response_model=Review)
+@router.get("/{review_id}", response_model=ReviewSchema)
 async def get_review(
     review_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get a specific review by ID"""
-    review = db.query(Review).filter(Review.id == review_id).first()
+    review = await db.scalar(select(Review).filter(Review.id == review_id))
     
     if not review:
         raise HTTPException(
@@ -107,15 +104,15 @@ async def get_review(
     return review
 
 
-@router.put("/{review_id}", response_model=Review)
+@router.put("/{review_id}", response_model=ReviewSchema)
 async def update_review(
     review_id: int,
     review_data: ReviewUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a review"""
-    review = db.query(Review).filter(Review.id == review_id).first()
+    review = await db.scalar(select(Review).filter(Review.id == review_id))
     
     if not review:
         raise HTTPException(
@@ -129,22 +126,30 @@ async def update_review(
             detail="Only the review author can update this review"
         )
     
-    # Store old rating for recalculation
     old_rating = review.rating
+    new_rating = review_data.rating if review_data.rating is not None else old_rating
+    
+    if new_rating != old_rating:
+        # Only if the rating is still the one read above, so the aggregates move by the right delta
+        result = await db.execute(update(Review).where(
+            Review.id == review_id,
+            Review.rating == old_rating
+        ).values(rating=new_rating))
+        
+        if result.rowcount == 0:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The review was changed by another request, please try again"
+            )
+        
+        await adjust_rating(db, review.item_type, review.item_id, added=new_rating, removed=old_rating)
     
     # Update review
-    review.rating = review_data.rating
     review.comment = review_data.comment
     
-    # Recalculate recipe rating
-    recipe = db.query(Recipe).filter(Recipe.id == review.recipe_id).first()
-    if recipe:
-        all_reviews = db.query(Review).filter(Review.recipe_id == review.recipe_id).all()
-        total_rating = sum(review.rating for review in all_reviews)
-        recipe.rating = total_rating / len(all_reviews) if all_reviews else 0
-    
-    db.commit()
-    db.refresh(review)
+    await db.commit()
+    await db.refresh(review)
+    await response_cache.invalidate(*item_tags(review.item_type, review.item_id))
     
     return review
 
@@ -153,10 +158,10 @@ async def update_review(
 async def delete_review(
     review_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a review"""
-    review = db.query(Review).filter(Review.id == review_id).first()
+    review = await db.scalar(select(Review).filter(Review.id == review_id))
     
     if not review:
         raise HTTPException(
@@ -170,38 +175,33 @@ async def delete_review(
             detail="Only the review author can delete this review"
         )
     
-    # Update recipe review count and rating
-    recipe = db.query(Recipe).filter(Recipe.id == review.recipe_id).first()
-    if recipe:
-        recipe.review_count -= 1
-        
-        # Recalculate average rating
-        remaining_reviews = db.query(Review).filter(
-            Review.recipe_id == review.recipe_id,
-            Review.id != review_id
-        ).all()
-        
-        if remaining_reviews:
-            total_rating = sum(r.rating for r in remaining_reviews)
-            recipe.rating = total_rating / len(remaining_reviews)
-        else:
-            recipe.rating = 0.0
+    # Delete review; a concurrent delete of the same review returns no row here
+    rating = await db.scalar(delete(Review).where(Review.id == review_id).returning(Review.rating))
+    
+    if rating is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Review not found"
+        )
+    
+    # Take the rating off the item's aggregates
+    await adjust_rating(db, review.item_type, review.item_id, removed=rating)
     
-    db.delete(review)
-    db.commit()
+    await db.commit()
+    await response_cache.invalidate(*item_tags(review.item_type, review.item_id))
     
     return None
 
 
-@router.get("/my-reviews", response_model=List[Review])
+@router.get("/my-reviews", response_model=List[ReviewSchema])
 async def get_my_reviews(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get reviews created by the current user"""
-    reviews = db.query(Review).filter(
+    reviews = (await db.scalars(select(Review).filter(
         Review.user_id == current_user.id
-    ).order_by(Review.created_at.desc()).all()
+    ).order_by(Review.created_at.desc()))).all()
     
     return reviews
 
@@ -210,13 +210,14 @@ async def get_my_reviews(
 async def get_my_recipe_review(
     recipe_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get current user's review for a specific recipe"""
-    review = db.query(Review).filter(
+    review = await db.scalar(select(Review).filter(
         Review.user_id == current_user.id,
-        Review.recipe_id == recipe_id
-    ).first()
+        Review.item_type == "recipe",
+        Review.item_id == recipe_id
+    ))
     
     if not review:
         return {"review": None}
@@ -1,40 +1,50 @@
 """
 File Upload API endpoints for xFood platform
 """
+import asyncio
+import hashlib
+import mimetypes
 import os
 import uuid
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from email.utils import formatdate
+from typing import Iterator
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.deps import get_current_user
-from app.db.database import get_db
+from app.db.database import get_async_db
+from app.models.upload import DirectUpload
 from app.models.user import User
 from app.core.config import settings
-from app.core.security import verify_file_type, verify_file_size
-import boto3
-from PIL import Image
-import io
+from app.core.http_cache import IMMUTABLE_CACHE_CONTROL, etag_matches, parse_byte_range
+from app.core.security import verify_file_type, verify_file_size, verify_user_permission
+from app.core.user_cache import user_cache
+from app.schemas.upload import DirectUploadCreate, DirectUploadTicket, DirectUpload as DirectUploadSchema
+from app.services.direct_upload_service import ATTACHABLE_MODELS, image_upload_result, max_upload_size
+from app.services.image_service import (
+    AVATAR_MAX_FILE_SIZE, CONTENT_TYPES, avatar_filename, content_hash_for_filename, image_variants,
+    square_image, spool_upload, remove_file, variant_filenames
+)
+from app.services.storage_service import (
+    delete_files, presigned_put_url, release_image, s3_client, set_user_avatar, store_image
+)
+from app.tasks import enqueue
+from app.tasks.images import process_direct_upload
+from botocore.exceptions import ClientError
 
 router = APIRouter()
 
-# Initialize S3 client if AWS credentials are provided
-s3_client = None
-if settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY:
-    s3_client = boto3.client(
-        's3',
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=settings.AWS_REGION,
-        endpoint_url=settings.AWS_S3_ENDPOINT_URL
-    )
+# Chunk size when relaying stored files to clients
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
 @router.post("/image", status_code=status.HTTP_201_CREATED)
 async def upload_image(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Upload an image file"""
     # Verify file type
@@ -44,63 +54,28 @@ async def upload_image(
             detail="Invalid file type. Only images are allowed."
         )
     
-    # Verify file size
-    if not verify_file_size(file.size, settings.MAX_FILE_SIZE):
+    # Verify file size when the client declared it; spool_upload enforces it either way
+    if file.size is not None and not verify_file_size(file.size, settings.MAX_FILE_SIZE):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File too large. Maximum size is {settings.MAX_FILE_SIZE // 1024 // 1024}MB"
         )
     
-    # Generate unique filename
-    file_extension = os.path.splitext(file.filename)[1]
-    filename = f"{uuid.uuid4()}{file_extension}"
-    
     try:
-        # Process image (resize if needed, optimize)
-        image = Image.open(io.BytesIO(await file.read()))
-        
-        # Resize if too large (max 1920x1080)
-        max_size = (1920, 1080)
-        if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
-            image.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        # Convert to RGB if necessary
-        if image.mode in ('RGBA', 'P'):
-            image = image.convert('RGB')
-        
-        # Save optimized image
-        output = io.BytesIO()
-        image.save(output, format='JPEG', quality=85, optimize=True)
-        output.seek(0)
-        
-        if s3_client:
-            # Upload to S3
-            s3_client.upload_fileobj(
-                output,
-                settings.AWS_S3_BUCKET,
-                f"images/{filename}",
-                ExtraArgs={'ContentType': 'image/jpeg'}
-            )
-            file_url = f"https://{settings.AWS_S3_BUCKET}.s3.{settings.AWS_REGION}.amazonaws.com/images/{filename}"
-        else:
-            # Save locally
-            upload_dir = "uploads/images"
-            os.makedirs(upload_dir, exist_ok=True)
-            file_path = os.path.join(upload_dir, filename)
-            
-            with open(file_path, "wb") as f:
-                f.write(output.getvalue())
-            
-            file_url = f"/uploads/images/{filename}"
+        # Spool to disk, then generate the size and format variants in a worker process
+        source_path, source_hash = await spool_upload(file, settings.MAX_FILE_SIZE)
+        try:
+            content_hash, size = await store_image(db, image_variants, source_path, source_hash, "images", current_user.id)
+        finally:
+            remove_file(source_path)
+        await db.commit()
         
-        return {
-            "filename": filename,
-            "url": file_url,
-            "size": len(output.getvalue()),
-            "content_type": "image/jpeg"
-        }
+        return image_upload_result(content_hash, size)
         
+    except HTTPException:
+        raise
     except Exception as e:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing image: {str(e)}"
@@ -111,7 +86,7 @@ async def upload_image(
 async def upload_avatar(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Upload user avatar image"""
     # Verify file type
@@ -122,154 +97,315 @@ async def upload_avatar(
         )
     
     # Verify file size (smaller limit for avatars)
-    max_avatar_size = 5 * 1024 * 1024  # 5MB
-    if not verify_file_size(file.size, max_avatar_size):
+    if file.size is not None and not verify_file_size(file.size, AVATAR_MAX_FILE_SIZE):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="File too large. Maximum size is 5MB"
         )
     
-    # Generate unique filename
-    file_extension = os.path.splitext(file.filename)[1]
-    filename = f"avatar_{current_user.id}_{uuid.uuid4()}{file_extension}"
-    
     try:
-        # Process image (resize to square, optimize)
-        image = Image.open(io.BytesIO(await file.read()))
-        
-        # Resize to square (400x400)
-        target_size = (400, 400)
-        image = image.resize(target_size, Image.Resampling.LANCZOS)
-        
-        # Convert to RGB if necessary
-        if image.mode in ('RGBA', 'P'):
-            image = image.convert('RGB')
-        
-        # Save optimized image
-        output = io.BytesIO()
-        image.save(output, format='JPEG', quality=85, optimize=True)
-        output.seek(0)
-        
-        if s3_client:
-            # Upload to S3
-            s3_client.upload_fileobj(
-                output,
-                settings.AWS_S3_BUCKET,
-                f"avatars/{filename}",
-                ExtraArgs={'ContentType': 'image/jpeg'}
-            )
-            file_url = f"https://{settings.AWS_S3_BUCKET}.s3.{settings.AWS_REGION}.amazonaws.com/avatars/{filename}"
-        else:
-            # Save locally
-            upload_dir = "uploads/avatars"
-            os.makedirs(upload_dir, exist_ok=True)
-            file_path = os.path.join(upload_dir, filename)
-            
-            with open(file_path, "wb") as f:
-                f.write(output.getvalue())
-            
-            file_url = f"/uploads/avatars/{filename}"
+        # Spool to disk, then resize to a 400x400 square in a worker process
+        source_path, source_hash = await spool_upload(file, AVATAR_MAX_FILE_SIZE)
+        try:
+            content_hash, size = await store_image(db, square_image, source_path, source_hash, "avatars", current_user.id)
+        finally:
+            remove_file(source_path)
         
-        # Update user avatar URL in database
-        current_user.avatar_url = file_url
-        db.commit()
+        # Update user avatar URL in database, releasing the stored avatar this one replaces
+        file_url = await set_user_avatar(db, current_user, content_hash)
+        await db.commit()
+        await user_cache.invalidate(current_user.id)
         
         return {
-            "filename": filename,
+            "filename": avatar_filename(content_hash),
             "url": file_url,
-            "size": len(output.getvalue()),
+            "size": size,
             "content_type": "image/jpeg"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing avatar: {str(e)}"
         )
 
 
-@router.get("/images/{filename}")
-async def get_image(filename: str):
-    """Get uploaded image file"""
-    if s3_client:
-        # Get from S3
-        try:
-            response = s3_client.get_object(
-                Bucket=settings.AWS_S3_BUCKET,
-                Key=f"images/{filename}"
-            )
-            return FileResponse(
-                io.BytesIO(response['Body'].read()),
-                media_type=response['ContentType']
-            )
-        except Exception as e:
+
+async def _get_direct_upload(db: AsyncSession, upload_id: str, user: User) -> DirectUpload:
+    """Fetch one of the user's direct uploads or 404"""
+    upload = await db.get(DirectUpload, upload_id)
+    if not upload or upload.user_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    return upload
+
+
+@router.post("/direct", response_model=DirectUploadTicket, status_code=status.HTTP_201_CREATED)
+async def create_direct_upload(
+    upload_data: DirectUploadCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a presigned URL to upload an image straight to storage"""
+    if not s3_client:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Direct uploads require S3 storage"
+        )
+    
+    if not verify_file_type(upload_data.content_type, settings.ALLOWED_IMAGE_TYPES):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid file type. Only images are allowed."
+        )
+    
+    max_size = max_upload_size(upload_data.target)
+    if upload_data.size is not None and not verify_file_size(upload_data.size, max_size):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File too large. Maximum size is {max_size // 1024 // 1024}MB"
+        )
+    
+    # Only the creator can replace a bake's or recipe's image
+    model = ATTACHABLE_MODELS.get(upload_data.target)
+    if model is not None:
+        item = await db.scalar(select(model).where(model.id == upload_data.target_id)) if upload_data.target_id else None
+        if not item:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail="Image not found"
+                detail=f"{upload_data.target.capitalize()} not found"
             )
-    else:
-        # Get from local storage
-        file_path = f"uploads/images/{filename}"
-        if not os.path.exists(file_path):
+        if item.created_by != current_user.id:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Image not found"
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Only the creator can change this {upload_data.target}'s image"
             )
-        return FileResponse(file_path)
+    
+    upload_id = str(uuid.uuid4())
+    upload = DirectUpload(
+        id=upload_id,
+        user_id=current_user.id,
+        target=upload_data.target,
+        target_id=upload_data.target_id if model is not None else None,
+        object_key=f"{settings.DIRECT_UPLOAD_PREFIX}{upload_id}",
+        content_type=upload_data.content_type,
+        status="pending"
+    )
+    db.add(upload)
+    await db.commit()
+    
+    # Content-Type is part of the signature, so the client must send the same one
+    url = presigned_put_url(upload.object_key, upload.content_type, settings.DIRECT_UPLOAD_EXPIRES)
+    return DirectUploadTicket(
+        upload_id=upload_id,
+        url=url,
+        headers={"Content-Type": upload.content_type},
+        expires_in=settings.DIRECT_UPLOAD_EXPIRES
+    )
 
 
-@router.get("/avatars/{filename}")
-async def get_avatar(filename: str):
-    """Get uploaded avatar file"""
+@router.post("/direct/{upload_id}/complete", response_model=DirectUploadSchema, status_code=status.HTTP_202_ACCEPTED)
+async def complete_direct_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Report a direct upload as finished and queue it for processing"""
+    upload = await _get_direct_upload(db, upload_id, current_user)
+    if upload.status != "pending":
+        # Already queued or done; completing again is harmless
+        return upload
+    
+    # Reject a missing or oversized object now rather than in the job
+    try:
+        head = await asyncio.to_thread(s3_client.head_object, Bucket=settings.AWS_S3_BUCKET, Key=upload.object_key)
+    except ClientError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File has not been uploaded yet"
+        )
+    max_size = max_upload_size(upload.target)
+    if not verify_file_size(head["ContentLength"], max_size):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File too large. Maximum size is {max_size // 1024 // 1024}MB"
+        )
+    
+    await enqueue(process_direct_upload, upload_id)
+    # Eager mode has already processed it
+    await db.refresh(upload)
+    return upload
+
+
+@router.get("/direct/{upload_id}", response_model=DirectUploadSchema)
+async def get_direct_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the processing status of a direct upload"""
+    return await _get_direct_upload(db, upload_id, current_user)
+
+def _read_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    """Read bytes start..end (inclusive) of a file in chunks"""
+    remaining = end - start + 1
+    with open(path, "rb") as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def _serve_file(request: Request, folder: str, filename: str, not_found: str) -> Response:
+    """Stream a stored file with validators, cache headers and Range support"""
+    if filename != os.path.basename(filename) or filename.startswith("."):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+    
+    if_none_match = request.headers.get("if-none-match")
+    media_type = CONTENT_TYPES.get(filename.rsplit(".", 1)[-1]) or mimetypes.guess_type(filename)[0]
+    etag = None
+    cache_control = f"public, max-age={settings.UPLOAD_CACHE_MAX_AGE}"
+    if content_hash_for_filename(folder, filename):
+        # Content-addressed names never change meaning: the name is a strong
+        # validator and a revalidation needs no storage round trip
+        etag = f'"{filename}"'
+        cache_control = IMMUTABLE_CACHE_CONTROL
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": cache_control})
+    
     if s3_client:
-        # Get from S3
+        params = {"Bucket": settings.AWS_S3_BUCKET, "Key": f"{folder}/{filename}"}
+        if request.headers.get("range"):
+            params["Range"] = request.headers["range"]
+        if if_none_match and etag is None:
+            params["IfNoneMatch"] = if_none_match
         try:
-            response = s3_client.get_object(
-                Bucket=settings.AWS_S3_BUCKET,
-                Key=f"avatars/{filename}"
-            )
-            return FileResponse(
-                io.BytesIO(response['Body'].read()),
-                media_type=response['ContentType']
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Avatar not found"
-            )
-    else:
-        # Get from local storage
-        file_path = f"uploads/avatars/{filename}"
-        if not os.path.exists(file_path):
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Avatar not found"
-            )
-        return FileResponse(file_path)
+            response = await asyncio.to_thread(s3_client.get_object, **params)
+        except ClientError as e:
+            error_status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            if error_status == status.HTTP_304_NOT_MODIFIED:
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": if_none_match, "Cache-Control": cache_control})
+            if error_status == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE:
+                object_size = e.response.get("Error", {}).get("ActualObjectSize", "*")
+                raise HTTPException(
+                    status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                    detail="Requested range not satisfiable",
+                    headers={"Content-Range": f"bytes */{object_size}"}
+                )
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+        
+        headers = {
+            "Accept-Ranges": "bytes",
+            "Cache-Control": cache_control,
+            "Content-Length": str(response["ContentLength"]),
+            "ETag": etag or response["ETag"],
+        }
+        if response.get("LastModified"):
+            headers["Last-Modified"] = formatdate(response["LastModified"].timestamp(), usegmt=True)
+        if response.get("ContentRange"):
+            headers["Content-Range"] = response["ContentRange"]
+        body = response["Body"]
+        # The body is relayed chunk by chunk; it is never read into memory whole
+        return StreamingResponse(
+            body.iter_chunks(STREAM_CHUNK_SIZE),
+            status_code=status.HTTP_206_PARTIAL_CONTENT if "Content-Range" in headers else status.HTTP_200_OK,
+            media_type=media_type or response.get("ContentType"),
+            headers=headers,
+            background=BackgroundTask(body.close)
+        )
+    
+    # Local storage
+    file_path = os.path.join("uploads", folder, filename)
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+    
+    if etag is None:
+        etag = '"' + hashlib.md5(f"{stat_result.st_mtime_ns}-{stat_result.st_size}".encode(), usedforsecurity=False).hexdigest() + '"'
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": cache_control})
+    
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": cache_control,
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+    }
+    if settings.UPLOAD_ACCEL_REDIRECT_PREFIX:
+        # Let the reverse proxy send the file with sendfile(); it also handles Range
+        headers["X-Accel-Redirect"] = f"{settings.UPLOAD_ACCEL_REDIRECT_PREFIX}{folder}/{filename}"
+        return Response(headers=headers, media_type=media_type)
+    
+    byte_range = parse_byte_range(request.headers.get("range"), stat_result.st_size)
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            _read_range(file_path, start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers=headers
+        )
+    return FileResponse(file_path, headers=headers, media_type=media_type, stat_result=stat_result)
+
+
+@router.get("/images/{filename}")
+async def get_image(filename: str, request: Request):
+    """Get uploaded image file"""
+    return await _serve_file(request, "images", filename, "Image not found")
+
+
+@router.get("/avatars/{filename}")
+async def get_avatar(filename: str, request: Request):
+    """Get uploaded avatar file"""
+    return await _serve_file(request, "avatars", filename, "Avatar not found")
 
 
 @router.delete("/images/{filename}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_image(
     filename: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete uploaded image file"""
+    content_hash = content_hash_for_filename("images", filename)
+    if not content_hash and not verify_user_permission(current_user, None, "admin"):
+        # Uploaded before content addressing, with no record of who uploaded it
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only an admin can delete this image"
+        )
+    
     try:
-        if s3_client:
-            # Delete from S3
-            s3_client.delete_object(
-                Bucket=settings.AWS_S3_BUCKET,
-                Key=f"images/{filename}"
-            )
+        if content_hash:
+            # Drops the caller's reference; the files go once nothing references them
+            released = await release_image(db, "images", content_hash, current_user.id)
+            if released is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Image not found"
+                )
+            await db.commit()
         else:
-            # Delete from local storage
-            file_path = f"uploads/images/{filename}"
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            # Deleting any variant removes the whole set
+            await delete_files("images", variant_filenames(filename))
         
         return None
         
+    except HTTPException:
+        raise
     except Exception as e:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error deleting file: {str(e)}"
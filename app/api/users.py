@@ -2,10 +2,13 @@
 Users API endpoints
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.deps import get_current_user, get_current_admin
-from app.db.database import get_db
+from app.core.pagination import paginate_keyset, set_next_cursor
+from app.core.user_cache import user_cache
+from app.db.database import get_async_db, get_read_db
 from app.models.user import User
 from app.schemas.user import UserUpdate, UserProfile
 
@@ -14,15 +17,17 @@ router = APIRouter()
 
 @router.get("/", response_model=List[UserProfile])
 async def get_users(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     search: Optional[str] = None,
     role: Optional[str] = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None),  # X-Next-Cursor of the previous page; overrides skip
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Get all users (admin only)"""
-    query = db.query(User)
+    query = select(User)
     
     if search:
         query = query.filter(
@@ -33,18 +38,23 @@ async def get_users(
     if role:
         query = query.filter(User.role == role)
     
-    users = query.offset(skip).limit(limit).all()
+    query = paginate_keyset(query, User, cursor)
+    if not cursor:
+        query = query.offset(skip)
+    
+    users = (await db.scalars(query.limit(limit))).all()
+    set_next_cursor(response, users, limit)
     return users
 
 
 @router.get("/{user_id}", response_model=UserProfile)
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get user by ID"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).filter(User.id == user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -58,7 +68,7 @@ async def get_user(
 async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Update user profile"""
@@ -69,7 +79,7 @@ async def update_user(
             detail="Not enough permissions"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).filter(User.id == user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -81,19 +91,20 @@ async def update_user(
     for field, value in update_data.items():
         setattr(user, field, value)
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await user_cache.invalidate(user_id)
+    await db.refresh(user)
     return user
 
 
 @router.delete("/{user_id}")
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Delete user (admin only)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).filter(User.id == user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -107,8 +118,9 @@ async def delete_user(
             detail="Cannot delete your own account"
         )
     
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+    await user_cache.invalidate(user_id)
     return {"message": "User deleted successfully"}
 
 
@@ -116,7 +128,7 @@ async def delete_user(
 async def update_user_role(
     user_id: int,
     role: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Update user role (admin only)"""
@@ -126,7 +138,7 @@ async def update_user_role(
             detail="Invalid role. Must be 'user', 'baker', or 'admin'"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).filter(User.id == user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -141,8 +153,9 @@ async def update_user_role(
         )
     
     user.role = role
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await user_cache.invalidate(user_id)
+    await db.refresh(user)
     
     return {"message": f"User role updated to {role}"}
 
@@ -150,11 +163,11 @@ async def update_user_role(
 @router.patch("/{user_id}/verify")
 async def verify_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Verify user account (admin only)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).filter(User.id == user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -162,8 +175,9 @@ async def verify_user(
         )
     
     user.is_verified = True
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await user_cache.invalidate(user_id)
+    await db.refresh(user)
     
     return {"message": "User verified successfully"}
 
@@ -171,11 +185,11 @@ async def verify_user(
 @router.patch("/{user_id}/deactivate")
 async def deactivate_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_admin)
 ):
     """Deactivate user account (admin only)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).filter(User.id == user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -190,7 +204,8 @@ async def deactivate_user(
         )
     
     user.is_active = False
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await user_cache.invalidate(user_id)
+    await db.refresh(user)
     
     return {"message": "User deactivated successfully"}
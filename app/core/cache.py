@@ -0,0 +1,309 @@
+"""
+Response caching with tag-based invalidation for public read endpoints
+"""
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.db.routing import recent_writes
+
+# Response header telling clients (and load tests) which tier answered
+CACHE_STATUS_HEADER = "X-Cache"
+
+# Tag versions must outlive every entry recorded against them
+TAG_VERSION_TTL = 7 * 86400
+
+# Seconds to stop reading from Redis after it fails, so an outage costs one timeout rather than one per request
+REDIS_RETRY_SECONDS = 5
+
+# A cached entry: response headers and body
+CachedResponse = Tuple[List[List[str]], bytes]
+
+# Called after every 200 response of a cached endpoint, whether or not the cache answered it
+ResponseHook = Callable[[Request], Awaitable[None]]
+
+
+def connect_redis(url: str) -> Redis:
+    """Redis client for a cache: short timeouts, since a slow cache is worse than none"""
+    if url.startswith("fakeredis://"):
+        # In-memory Redis for tests and local development
+        from fakeredis import FakeAsyncRedis
+        return FakeAsyncRedis()
+    return Redis.from_url(
+        url,
+        password=settings.REDIS_PASSWORD,
+        socket_timeout=0.25,
+        socket_connect_timeout=0.25
+    )
+
+
+class CachePolicy:
+    """How an endpoint's responses are cached"""
+
+    def __init__(self, ttl: Optional[int], tags: Sequence[str], on_success: Optional[ResponseHook] = None):
+        self.ttl = ttl
+        self.tags = tuple(tags)
+        self.on_success = on_success
+
+    def tags_for(self, request: Request) -> List[str]:
+        """The policy's tags with path parameters filled in, e.g. "bake:{bake_id}" -> "bake:42" """
+        return [tag.format(**request.path_params) for tag in self.tags]
+
+
+def cache_response(ttl: Optional[int] = None, tags: Sequence[str] = (), on_success: Optional[ResponseHook] = None):
+    """Cache an endpoint's successful responses under the given tags
+
+    Takes effect on routers created with route_class=CachedRoute. Tags may
+    name path parameters; a write calls response_cache.invalidate() with a
+    tag to make every response carrying it stale. on_success runs after
+    every 200 response, including those answered from the cache, for side
+    effects such as counting views; errors such as a 404 skip it.
+    """
+    def decorator(endpoint):
+        endpoint.cache_policy = CachePolicy(ttl, tags, on_success)
+        return endpoint
+    return decorator
+
+
+class ResponseCacheMetrics:
+    """Response cache counters for this process"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Reset all counters"""
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.bypasses = 0  # clients inside their read-your-writes window
+        self.errors = 0
+        self.invalidations = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        hits = self.local_hits + self.redis_hits
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "bypasses": self.bypasses,
+            "errors": self.errors,
+            "invalidations": self.invalidations,
+        }
+
+
+def item_tags(item_type: str, item_id: int) -> Tuple[str, str]:
+    """Tags covering a bake, recipe or circle: its own responses and its lists"""
+    return f"{item_type}:{item_id}", f"{item_type}s:list"
+
+
+def _cache_key(request: Request) -> str:
+    query = urlencode(sorted(request.query_params.multi_items()))
+    return f"cache:resp:{request.url.path}?{query}"
+
+
+def _tag_key(tag: str) -> str:
+    return f"cache:tag:{tag}"
+
+
+def _cached_response(cached: CachedResponse, cache_status: str) -> Response:
+    headers, body = cached
+    response = Response(content=body, headers=dict(headers))
+    response.headers[CACHE_STATUS_HEADER] = cache_status
+    return response
+
+
+class ResponseCache:
+    """Serialized responses in Redis, fronted by a small LRU in each process
+
+    Invalidation is by tag. Each tag has a version counter in Redis and an
+    entry records the versions of its tags when it was built, so bumping a
+    version makes every entry carrying the tag stale at once without having
+    to find them. Entries are stored with the versions read before the
+    endpoint ran: a write that lands while a response is being built leaves
+    that response already stale. The local tier is cleared by the process
+    that invalidates; other processes may serve a local entry for up to
+    RESPONSE_CACHE_LOCAL_TTL seconds. Redis failures are counted and
+    the endpoint is called as if the cache were empty.
+    """
+
+    def __init__(self):
+        self.metrics = ResponseCacheMetrics()
+        self._client: Optional[Redis] = None
+        self._redis_retry_at = 0.0
+        self._local: "OrderedDict[str, Tuple[float, Tuple[str, ...], CachedResponse]]" = OrderedDict()
+        # Bumped by every invalidation so a response built across one is not kept locally
+        self._invalidation_seq = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.RESPONSE_CACHE_ENABLED
+
+    def _redis(self) -> Redis:
+        if self._client is None:
+            self._client = connect_redis(settings.RESPONSE_CACHE_REDIS_URL or settings.REDIS_URL)
+        return self._client
+
+    def _redis_failed(self, error: RedisError):
+        self.metrics.errors += 1
+        if time.monotonic() >= self._redis_retry_at:
+            print(f"⚠️ Response cache Redis unavailable: {error}")
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def _local_get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, _, cached = entry
+        if expires_at <= time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return cached
+
+    def _local_put(self, key: str, tags: List[str], cached: CachedResponse, ttl: int):
+        if settings.RESPONSE_CACHE_LOCAL_SIZE <= 0:
+            return
+        ttl = min(ttl, settings.RESPONSE_CACHE_LOCAL_TTL)
+        self._local[key] = (time.monotonic() + ttl, tuple(tags), cached)
+        self._local.move_to_end(key)
+        while len(self._local) > settings.RESPONSE_CACHE_LOCAL_SIZE:
+            self._local.popitem(last=False)
+
+    async def _redis_get(self, key: str, tags: List[str]) -> Tuple[Optional[CachedResponse], List[int]]:
+        """Fetch an entry and the current versions of its tags in one round trip"""
+        async with self._redis().pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            if tags:
+                pipe.mget([_tag_key(tag) for tag in tags])
+            results = await pipe.execute()
+
+        versions = [int(version or 0) for version in results[1]] if tags else []
+        if results[0] is None:
+            return None, versions
+        header, _, body = results[0].partition(b"\n")
+        meta = json.loads(header)
+        if meta["versions"] != versions:
+            return None, versions
+        return (meta["headers"], body), versions
+
+    async def serve(
+        self,
+        request: Request,
+        policy: CachePolicy,
+        call_endpoint: Callable[[Request], Coroutine[Any, Any, Response]]
+    ) -> Response:
+        """Answer a request from the cache, or call the endpoint and cache its response"""
+        if not self.enabled:
+            return await call_endpoint(request)
+        if recent_writes.wrote_recently(request):
+            # Clients that just wrote must see their own writes
+            self.metrics.bypasses += 1
+            return await call_endpoint(request)
+
+        key = _cache_key(request)
+        tags = policy.tags_for(request)
+        ttl = policy.ttl or settings.RESPONSE_CACHE_TTL
+        cached = self._local_get(key)
+        if cached is not None:
+            self.metrics.local_hits += 1
+            return _cached_response(cached, "HIT")
+
+        invalidation_seq = self._invalidation_seq
+        versions: Optional[List[int]] = None
+        if time.monotonic() >= self._redis_retry_at:
+            try:
+                cached, versions = await self._redis_get(key, tags)
+            except RedisError as e:
+                self._redis_failed(e)
+            else:
+                if cached is not None:
+                    self.metrics.redis_hits += 1
+                    if self._invalidation_seq == invalidation_seq:
+                        self._local_put(key, tags, cached, ttl)
+                    return _cached_response(cached, "HIT")
+
+        self.metrics.misses += 1
+        response = await call_endpoint(request)
+        if response.status_code != 200 or not hasattr(response, "body") or "set-cookie" in response.headers:
+            return response
+
+        headers = [[name, value] for name, value in response.headers.items() if name != "content-length"]
+        if versions is not None:
+            header = json.dumps({"versions": versions, "headers": headers}).encode()
+            try:
+                await self._redis().set(key, header + b"\n" + response.body, ex=ttl)
+            except RedisError as e:
+                self._redis_failed(e)
+        if self._invalidation_seq == invalidation_seq:
+            self._local_put(key, tags, (headers, response.body), ttl)
+        response.headers[CACHE_STATUS_HEADER] = "MISS"
+        return response
+
+    async def invalidate(self, *tags: str) -> None:
+        """Make every cached response carrying any of these tags stale; call after committing"""
+        if not self.enabled or not tags:
+            return
+        self._invalidation_seq += 1
+        self.metrics.invalidations += len(tags)
+        dropped = set(tags)
+        for key in [key for key, (_, entry_tags, _) in self._local.items() if dropped.intersection(entry_tags)]:
+            del self._local[key]
+
+        # Tried even while reads are skipping Redis: a lost invalidation leaves stale entries for a full TTL
+        try:
+            async with self._redis().pipeline(transaction=False) as pipe:
+                for tag in dropped:
+                    pipe.incr(_tag_key(tag))
+                    pipe.expire(_tag_key(tag), TAG_VERSION_TTL)
+                await pipe.execute()
+        except RedisError as e:
+            self._redis_failed(e)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the cache counters and local tier occupancy"""
+        return {
+            "enabled": self.enabled,
+            "local_entries": len(self._local),
+            **self.metrics.snapshot()
+        }
+
+    def reset(self):
+        """Reset the counters"""
+        self.metrics.reset()
+
+    async def close(self):
+        """Close the Redis connection pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global response cache instance
+response_cache = ResponseCache()
+
+
+class CachedRoute(APIRoute):
+    """Route class that serves endpoints marked with @cache_response through the response cache"""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        policy: Optional[CachePolicy] = getattr(self.endpoint, "cache_policy", None)
+        if policy is None:
+            return handler
+
+        async def cached_handler(request: Request) -> Response:
+            response = await response_cache.serve(request, policy, handler)
+            if policy.on_success is not None and response.status_code == 200:
+                await policy.on_success(request)
+            return response
+
+        return cached_handler
@@ -19,6 +19,17 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
     DATABASE_TEST_URL: Optional[str] = None
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: int = 30  # seconds to wait for a free connection
+    DATABASE_POOL_RECYCLE: int = 300  # seconds before a connection is replaced
+    DATABASE_POOL_PRE_PING: bool = True  # test connections on checkout
+    DATABASE_ECHO: bool = False  # log every SQL statement
+    DATABASE_REPLICA_URLS: List[str] = []  # read-only replicas for safe GET routes
+    READ_YOUR_WRITES_SECONDS: int = 5  # keep readers on the primary after a write
+    
+    # Trending
+    TRENDING_DECAY_SECONDS: int = 45000  # engagement must grow 10x to stay level over this long
     
     # JWT
     SECRET_KEY: str
@@ -26,10 +37,48 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12  # cost factor; hashes at another cost are rehashed on the next login
+    PASSWORD_HASH_WORKERS: int = 2  # threads that run bcrypt off the event loop
+    PASSWORD_HASH_MAX_PENDING: int = 16  # queued hashes per worker before logins are turned away
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = 5.0  # seconds a login waits for a hashing slot before a 503
+    
+    # Authenticated user cache
+    USER_CACHE_TTL: int = 30  # seconds a user row is reused; without Redis, how long other processes may miss a change
+    USER_CACHE_SIZE: int = 10000  # users kept in each process; 0 disables the in-process tier
+    USER_CACHE_REDIS_URL: Optional[str] = None  # share cached users between processes, e.g. REDIS_URL or "fakeredis://"
+    USER_CACHE_LOCAL_TTL: int = 5  # with Redis, seconds a process reuses its own copy
+    
+    # Sign in with Google and Apple
+    GOOGLE_CLIENT_IDS: List[str] = []  # OAuth client ids an ID token's audience must match; Google sign-in is refused when empty
+    APPLE_CLIENT_IDS: List[str] = []  # Services/bundle ids an Apple ID token's audience must match; Apple sign-in is refused when empty
+    
+    # Outbound HTTP
+    HTTP_CLIENT_TIMEOUT: float = 10.0  # seconds for calls to external services
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 20  # pooled connections shared by all requests in a process
+    
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
     REDIS_PASSWORD: Optional[str] = None
     
+    # Background tasks (Celery)
+    CELERY_BROKER_URL: Optional[str] = None  # defaults to REDIS_URL
+    CELERY_RESULT_BACKEND: Optional[str] = None  # task results are not kept unless set
+    CELERY_TASK_ALWAYS_EAGER: bool = False  # run tasks in the API process; no broker or worker needed
+    
+    # Response cache
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_REDIS_URL: Optional[str] = None  # defaults to REDIS_URL; "fakeredis://" keeps it in memory
+    RESPONSE_CACHE_TTL: int = 60  # seconds a cached response lives unless invalidated sooner
+    RESPONSE_CACHE_LOCAL_SIZE: int = 1024  # responses kept in each process in front of Redis; 0 disables
+    RESPONSE_CACHE_LOCAL_TTL: int = 5  # seconds another process's write can go unseen by this one
+    
+    # Write-behind counters
+    COUNTER_WRITE_BEHIND: bool = False  # buffer likes, comments and favorites as well as views, instead of an UPDATE each
+    COUNTER_FLUSH_INTERVAL: float = 2.0  # seconds between writes of buffered counts to the database
+    COUNTER_REDIS_URL: Optional[str] = None  # buffer in Redis, shared by all processes, instead of in each process
+    COUNTER_REDIS_SHARDS: int = 16  # Redis hashes the buffered counts are spread over
+    
     # AWS S3
     AWS_ACCESS_KEY_ID: Optional[str] = None
     AWS_SECRET_ACCESS_KEY: Optional[str] = None
@@ -63,8 +112,16 @@ class Settings(BaseSettings):
     ALLOWED_IMAGE_TYPES: List[str] = [
         "image/jpeg", "image/png", "image/webp", "image/gif"
     ]
+    UPLOAD_TMP_DIR: Optional[str] = None  # where uploads are spooled; defaults to the system temp dir
+    UPLOAD_CACHE_MAX_AGE: int = 86400  # seconds browsers may cache uploads that are not content-addressed
+    UPLOAD_ACCEL_REDIRECT_PREFIX: Optional[str] = None  # e.g. "/protected-uploads/" to serve local files via nginx
+    DIRECT_UPLOAD_PREFIX: str = "incoming/"  # S3 prefix presigned uploads land under; expire it with a lifecycle rule
+    DIRECT_UPLOAD_EXPIRES: int = 900  # seconds a presigned upload URL stays valid
+    IMAGE_WORKERS: int = 2  # processes that decode and resize uploads
+    IMAGE_MAX_PENDING: int = 8  # queued transforms per worker before uploads are turned away
+    IMAGE_QUEUE_TIMEOUT: float = 10.0  # seconds an upload waits for a queue slot before a 503
     
-    @field_validator("CORS_ORIGINS", mode="before")
+    @field_validator("CORS_ORIGINS", "DATABASE_REPLICA_URLS", "GOOGLE_CLIENT_IDS", "APPLE_CLIENT_IDS", mode="before")
     @classmethod
     def assemble_cors_origins(cls, v):
         if isinstance(v, str) and not v.startswith("["):
@@ -1,12 +1,14 @@
 """
 Authentication dependencies for API endpoints
 """
-from typing import Generator, Optional
+from typing import Generator, Optional, Sequence
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.core.security import verify_token
-from app.db.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.security import decode_token
+from app.core.user_cache import user_cache
+from app.db.database import get_async_db
 from app.models.user import User
 from app.schemas.user import TokenData
 
@@ -14,8 +16,27 @@ from app.schemas.user import TokenData
 security = HTTPBearer()
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
+async def _load_token_user(db: AsyncSession, token: str) -> Optional[User]:
+    """Load the user a token was issued to, or None for an invalid token"""
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    
+    email = payload["sub"]
+    user_id = payload.get("uid")
+    if user_id is None:
+        # Issued before tokens carried the user id
+        return await db.scalar(select(User).filter(User.email == email))
+    
+    user = await user_cache.get(db, user_id)
+    # A token issued before an email change no longer names its user
+    if user is None or user.email != email:
+        return None
+    return user
+
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> User:
     """Get current authenticated user"""
@@ -25,12 +46,7 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    token = credentials.credentials
-    email = verify_token(token)
-    if email is None:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.email == email).first()
+    user = await _load_token_user(db, credentials.credentials)
     if user is None:
         raise credentials_exception
     
@@ -55,11 +71,25 @@ def get_current_active_user(
     return current_user
 
 
+def _has_role(user: User, credentials: HTTPAuthorizationCredentials, roles: Sequence[str]) -> bool:
+    """Whether both the token's role claim and the user's stored role are among roles
+
+    The claim is fixed when the token is issued, so a promotion only takes
+    effect with the next token, up to ACCESS_TOKEN_EXPIRE_MINUTES later.
+    The stored role comes through the user cache, which is invalidated on a
+    role change, so a demotion takes effect at once. Tokens issued before
+    they carried a role are judged by the stored role alone.
+    """
+    payload = decode_token(credentials.credentials) or {}
+    return user.role in roles and payload.get("role", user.role) in roles
+
+
 def get_current_baker(
     current_user: User = Depends(get_current_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> User:
     """Get current user with baker role"""
-    if current_user.role not in ["baker", "admin"]:
+    if not _has_role(current_user, credentials, ("baker", "admin")):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions. Baker role required."
@@ -69,9 +99,10 @@ def get_current_baker(
 
 def get_current_admin(
     current_user: User = Depends(get_current_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> User:
     """Get current user with admin role"""
-    if current_user.role != "admin":
+    if not _has_role(current_user, credentials, ("admin",)):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions. Admin role required."
@@ -79,8 +110,8 @@ def get_current_admin(
     return current_user
 
 
-def get_optional_user(
-    db: Session = Depends(get_db),
+async def get_optional_user(
+    db: AsyncSession = Depends(get_async_db),
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
 ) -> Optional[User]:
     """Get current user if authenticated, None otherwise"""
@@ -88,12 +119,7 @@ def get_optional_user(
         return None
     
     try:
-        token = credentials.credentials
-        email = verify_token(token)
-        if email is None:
-            return None
-        
-        user = db.query(User).filter(User.email == email).first()
+        user = await _load_token_user(db, credentials.credentials)
         if user and user.is_active:
             return user
         return None
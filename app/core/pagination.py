@@ -0,0 +1,62 @@
+"""
+Keyset (cursor) pagination utilities
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Select, func, select, tuple_
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: Optional[datetime], item_id: int) -> str:
+    """Encode a (created_at, id) position as an opaque cursor token"""
+    payload = {"c": created_at.isoformat() if created_at else None, "i": item_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Decode a cursor token back into its (created_at, id) position"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        created_at = datetime.fromisoformat(payload["c"]) if payload["c"] else None
+        return created_at, int(payload["i"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def paginate_keyset(query: Select, model: Any, cursor: Optional[str] = None) -> Select:
+    """Order a query newest first and, given a cursor, start after that position
+
+    The cursor row's created_at is read back from the table by id so the
+    comparison uses the database's own stored value; the encoded timestamp is
+    only used if that row has since been deleted.
+    """
+    query = query.order_by(None).order_by(model.created_at.desc(), model.id.desc())
+    if not cursor:
+        return query
+
+    created_at, item_id = decode_cursor(cursor)
+    cursor_created_at = func.coalesce(
+        select(model.created_at).where(model.id == item_id).scalar_subquery(),
+        created_at
+    )
+    # A row-value comparison, unlike the equivalent OR, gives the planner a
+    # range to seek to in the (..., created_at, id) index
+    return query.filter(tuple_(model.created_at, model.id) < tuple_(cursor_created_at, item_id))
+
+
+def set_next_cursor(response: Response, items: Sequence[Any], limit: Optional[int]) -> None:
+    """Advertise the next page's cursor when the current page is full"""
+    if limit and len(items) == limit:
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
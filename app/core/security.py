@@ -1,20 +1,33 @@
 """
 Security utilities for authentication and authorization
 """
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Callable, Dict, Tuple, Union, Optional
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context; hashes at any other cost are flagged for rehashing
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
+)
 
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: Optional[timedelta] = None
+    subject: Union[str, Any],
+    expires_delta: Optional[timedelta] = None,
+    user_id: Optional[int] = None,
+    role: Optional[str] = None
 ) -> str:
-    """Create JWT access token"""
+    """Create JWT access token, carrying the user's id and role when given; see app.core.deps for how the role is used"""
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -23,6 +36,10 @@ def create_access_token(
         )
     
     to_encode = {"exp": expire, "sub": str(subject)}
+    if user_id is not None:
+        to_encode["uid"] = user_id
+    if role is not None:
+        to_encode["role"] = role
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -55,6 +72,17 @@ def verify_token(token: str) -> Optional[str]:
         return None
 
 
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """Verify JWT token and return its claims"""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("sub") is None:
+        return None
+    return payload
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -65,6 +93,126 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasher:
+    """Runs bcrypt on a dedicated thread pool
+
+    A bcrypt hash or check costs a few hundred milliseconds of CPU, which
+    would stall every other request on the event loop. bcrypt releases
+    the GIL, so threads are enough to take it off the loop; a pool of its
+    own keeps a login burst from starving the default executor. At most
+    ``workers * max_pending`` operations are admitted at once, and logins
+    beyond that get a 503 after ``queue_timeout`` seconds.
+    """
+
+    def __init__(self, workers: int, max_pending: int, queue_timeout: float):
+        self.workers = workers
+        self.capacity = workers * max_pending
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = asyncio.Semaphore(self.capacity)
+        self.waiting = 0
+        self.in_flight = 0
+        self.reset()
+
+    def reset(self):
+        """Reset all counters (live queue depth is kept)"""
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.peak_depth = 0
+        self.queue_wait_sum_ms = 0.0
+        self.queue_wait_max_ms = 0.0
+        self.hash_sum_ms = 0.0
+        self.hash_max_ms = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        self.waiting += 1
+        self.peak_depth = max(self.peak_depth, self.waiting + self.in_flight)
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await self._slots.acquire()
+        except TimeoutError:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-ins at once, please retry shortly",
+                headers={"Retry-After": "2"}
+            )
+        finally:
+            self.waiting -= 1
+
+        admitted = time.perf_counter()
+        wait_ms = (admitted - started) * 1000
+        self.queue_wait_sum_ms += wait_ms
+        self.queue_wait_max_ms = max(self.queue_wait_max_ms, wait_ms)
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+            hash_ms = (time.perf_counter() - admitted) * 1000
+            self.completed += 1
+            self.hash_sum_ms += hash_ms
+            self.hash_max_ms = max(self.hash_max_ms, hash_ms)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password"""
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password, also returning a new hash when the stored one uses outdated parameters"""
+        valid, new_hash = await self._run(pwd_context.verify_and_update, plain_password, hashed_password)
+        if new_hash:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def shutdown(self):
+        """Stop the worker threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def snapshot(self) -> Dict:
+        """Return the live queue depth together with the collected metrics"""
+        return {
+            "queue": {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "waiting": self.waiting,
+                "in_flight": self.in_flight,
+                "peak_depth": self.peak_depth,
+            },
+            "operations": {
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+            },
+            "queue_wait_ms": {
+                "avg": round(self.queue_wait_sum_ms / self.completed, 3) if self.completed else 0.0,
+                "max": round(self.queue_wait_max_ms, 3),
+            },
+            "hash_ms": {
+                "avg": round(self.hash_sum_ms / self.completed, 3) if self.completed else 0.0,
+                "max": round(self.hash_max_ms, 3),
+            },
+        }
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    queue_timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT
+)
+
+
 def is_refresh_token(token: str) -> bool:
     """Check if token is a refresh token"""
     try:
@@ -0,0 +1,173 @@
+"""
+Short-lived cache of the user rows behind access tokens
+"""
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from app.core.cache import REDIS_RETRY_SECONDS, connect_redis
+from app.core.config import settings
+from app.models.user import User
+
+# Credentials never leave the database; code that needs them loads the user with a query, as login does
+_UNCACHED_COLUMNS = {"hashed_password"}
+_COLUMNS = [column.key for column in User.__table__.columns if column.key not in _UNCACHED_COLUMNS]
+_DATETIME_COLUMNS = [column.key for column in User.__table__.columns if isinstance(column.type, DateTime)]
+
+
+def _dump(user: User) -> str:
+    row = {key: getattr(user, key) for key in _COLUMNS}
+    for key in _DATETIME_COLUMNS:
+        if row[key] is not None:
+            row[key] = row[key].isoformat()
+    return json.dumps(row)
+
+
+def _load(data: str) -> Dict[str, Any]:
+    # Entries written before a column was excluded may still carry it
+    row = {key: value for key, value in json.loads(data).items() if key in _COLUMNS}
+    for key in _DATETIME_COLUMNS:
+        if row[key] is not None:
+            row[key] = datetime.fromisoformat(row[key])
+    return row
+
+
+class UserCache:
+    """User rows by id, kept in process with an optional Redis tier
+
+    A cached row is merged into the request's session without a query, so
+    the user behaves exactly as if loaded, and changes to it are flushed
+    as usual. hashed_password is not cached and stays unloaded on a cached
+    user. Anything that writes a user calls invalidate() after
+    committing. That clears this process and the Redis tier; other
+    processes keep their copy until it expires, which is USER_CACHE_TTL
+    without Redis and USER_CACHE_LOCAL_TTL with it.
+    """
+
+    def __init__(self):
+        self._local: "OrderedDict[int, Tuple[float, str]]" = OrderedDict()
+        self._client: Optional[Redis] = None
+        self._redis_retry_at = 0.0
+        # Bumped by every invalidation so a row read across one is not cached
+        self._invalidation_seq = 0
+        self.reset()
+
+    def reset(self):
+        """Reset all counters"""
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def _redis(self) -> Optional[Redis]:
+        if not settings.USER_CACHE_REDIS_URL or time.monotonic() < self._redis_retry_at:
+            return None
+        if self._client is None:
+            self._client = connect_redis(settings.USER_CACHE_REDIS_URL)
+        return self._client
+
+    def _redis_failed(self, error: RedisError):
+        self.errors += 1
+        if time.monotonic() >= self._redis_retry_at:
+            print(f"⚠️ User cache Redis unavailable: {error}")
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def _local_ttl(self) -> int:
+        if settings.USER_CACHE_REDIS_URL:
+            return min(settings.USER_CACHE_TTL, settings.USER_CACHE_LOCAL_TTL)
+        return settings.USER_CACHE_TTL
+
+    def _local_get(self, user_id: int) -> Optional[str]:
+        entry = self._local.get(user_id)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at <= time.monotonic():
+            del self._local[user_id]
+            return None
+        self._local.move_to_end(user_id)
+        return data
+
+    def _local_put(self, user_id: int, data: str):
+        if settings.USER_CACHE_SIZE <= 0:
+            return
+        self._local[user_id] = (time.monotonic() + self._local_ttl(), data)
+        self._local.move_to_end(user_id)
+        while len(self._local) > settings.USER_CACHE_SIZE:
+            self._local.popitem(last=False)
+
+    async def get(self, db: AsyncSession, user_id: int) -> Optional[User]:
+        """Load a user into db, from the cache when possible"""
+        invalidation_seq = self._invalidation_seq
+        data = self._local_get(user_id)
+        client = self._redis() if data is None else None
+        if client is not None:
+            try:
+                data = await client.get(f"user:{user_id}")
+            except RedisError as e:
+                self._redis_failed(e)
+            if data is not None and self._invalidation_seq == invalidation_seq:
+                self._local_put(user_id, data)
+
+        if data is not None:
+            self.hits += 1
+            user = User(**_load(data))
+            make_transient_to_detached(user)
+            return await db.merge(user, load=False)
+
+        self.misses += 1
+        user = await db.get(User, user_id)
+        if user is None or self._invalidation_seq != invalidation_seq:
+            return user
+        data = _dump(user)
+        self._local_put(user_id, data)
+        if client is not None:
+            try:
+                await client.set(f"user:{user_id}", data, ex=settings.USER_CACHE_TTL)
+            except RedisError as e:
+                self._redis_failed(e)
+        return user
+
+    async def invalidate(self, user_id: int) -> None:
+        """Drop a user's cached row; call after committing a change to it"""
+        self._invalidation_seq += 1
+        self.invalidations += 1
+        self._local.pop(user_id, None)
+        if not settings.USER_CACHE_REDIS_URL:
+            return
+        # Tried even while reads are skipping Redis: a lost invalidation leaves the row cached for a full TTL
+        if self._client is None:
+            self._client = connect_redis(settings.USER_CACHE_REDIS_URL)
+        try:
+            await self._client.delete(f"user:{user_id}")
+        except RedisError as e:
+            self._redis_failed(e)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the cache counters and local tier occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            "redis_tier": bool(settings.USER_CACHE_REDIS_URL),
+            "local_entries": len(self._local),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+    async def close(self):
+        """Close the Redis connection pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global user cache instance
+user_cache = UserCache()
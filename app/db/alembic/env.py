@@ -0,0 +1,75 @@
+"""
+Alembic migration environment for the xFood platform
+"""
+import re
+from logging.config import fileConfig
+from alembic import context
+from app.core.config import settings
+from app.db.database import Base, engine
+from app.models import user, recipe, bake, circle, message, review, comment, like, purchase, subscription, tag, image, upload
+
+config = context.config
+
+# Leave the application's logging alone when migrations run on startup
+if config.config_file_name is not None and "connection" not in config.attributes:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+# Full-text search tables, FTS5 shadow tables and GIN indexes are managed by
+# hand in revision 0003 rather than declared on the models
+SEARCH_OBJECT_NAME = re.compile(r"^\w+_fts(_\w+)?$|^idx_\w+_search$")
+
+
+def include_name(name, type_, parent_names):
+    """Keep hand-managed search objects out of autogenerate comparisons"""
+    if type_ in ("table", "index") and name and SEARCH_OBJECT_NAME.match(name):
+        return False
+    return True
+
+
+def run_migrations_offline():
+    """Emit migration SQL without a database connection"""
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=settings.DATABASE_URL.startswith("sqlite"),
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection):
+    """Run migrations on an open connection"""
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Run migrations against the configured database"""
+    connection = config.attributes.get("connection")
+
+    # app.db.migrate passes in its own connection; the CLI opens one here
+    if connection is not None:
+        do_run_migrations(connection)
+        return
+
+    with engine.connect() as connection:
+        do_run_migrations(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,57 @@
+"""hot query indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 23:20:41.402117
+
+Composite indexes for the keyset-paginated listings and the filters that run
+on every request (like lookups, unread counts, per-author and per-category
+listings, review lookups). Indexes are created with IF NOT EXISTS so that
+databases which already picked some of them up from create_all() upgrade
+cleanly.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # Keyset pagination (created_at DESC, id DESC)
+    ('idx_users_created_at_id', 'users', ['created_at', 'id'], None),
+    ('idx_bakes_created_at_id', 'bakes', ['created_at', 'id'], None),
+    ('idx_recipes_created_at_id', 'recipes', ['created_at', 'id'], None),
+    ('idx_comments_bake_created_at_id', 'comments', ['bake_id', 'created_at', 'id'], None),
+    ('idx_comments_recipe_created_at_id', 'comments', ['recipe_id', 'created_at', 'id'], None),
+    ('idx_likes_bake_created_at_id', 'likes', ['bake_id', 'created_at', 'id'], None),
+    ('idx_likes_recipe_created_at_id', 'likes', ['recipe_id', 'created_at', 'id'], None),
+    ('idx_messages_receiver_created_at_id', 'messages', ['receiver_id', 'created_at', 'id'], None),
+    ('idx_messages_sender_created_at_id', 'messages', ['sender_id', 'created_at', 'id'], None),
+    ('idx_messages_conversation_created_at_id', 'messages', ['sender_id', 'receiver_id', 'created_at', 'id'], None),
+    # Hot filters
+    ('idx_likes_user_bake', 'likes', ['user_id', 'bake_id'], 'bake_id IS NOT NULL'),
+    ('idx_likes_user_recipe', 'likes', ['user_id', 'recipe_id'], 'recipe_id IS NOT NULL'),
+    ('idx_messages_receiver_is_read', 'messages', ['receiver_id', 'is_read'], None),
+    ('idx_bakes_created_by_created_at', 'bakes', ['created_by', 'created_at'], None),
+    ('idx_recipes_category_created_at', 'recipes', ['category', 'created_at'], None),
+    ('idx_reviews_item', 'reviews', ['item_type', 'item_id'], None),
+]
+
+
+def upgrade():
+    for name, table, columns, where in INDEXES:
+        # Partial indexes are supported by PostgreSQL and SQLite; other dialects ignore the clause
+        dialect_kw = {}
+        if where is not None:
+            dialect_kw = {'postgresql_where': sa.text(where), 'sqlite_where': sa.text(where)}
+        op.create_index(name, table, columns, unique=False, if_not_exists=True, **dialect_kw)
+
+
+def downgrade():
+    for name, table, _columns, _where in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
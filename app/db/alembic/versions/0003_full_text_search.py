@@ -0,0 +1,97 @@
+"""full text search
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 09:12:05.771430
+
+Full-text search indexes for bakes and recipes, queried by app.db.search.
+
+SQLite: FTS5 external-content tables (<table>_fts) that share rowids with
+the base table, kept in sync by insert/update/delete triggers and
+backfilled with the FTS5 'rebuild' command.
+
+PostgreSQL: GIN expression indexes (idx_<table>_search) over a weighted
+tsvector. No triggers are needed because the index is maintained by the
+database; the expression must stay identical to app.db.search.TS_DOCUMENTS.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_COLUMNS = {
+    'bakes': ('title', 'description', 'tags'),
+    'recipes': ('title', 'description', 'tags', 'ingredients', 'instructions'),
+}
+
+TS_DOCUMENTS = {
+    'bakes': (
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(tags::text, '')), 'C')"
+    ),
+    'recipes': (
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(tags::text, '')), 'C') || "
+        "setweight(to_tsvector('english', coalesce(ingredients::text, '')), 'C') || "
+        "setweight(to_tsvector('english', coalesce(instructions::text, '')), 'D')"
+    ),
+}
+
+
+def upgrade_sqlite(table, columns):
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    new_values = ', '.join(f'new.{name}' for name in columns)
+    old_values = ', '.join(f'old.{name}' for name in columns)
+
+    op.execute(
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', content_rowid='id', "
+        f"tokenize='porter unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); END"
+    )
+    # Only reindex when a searchable column changes, not on counter updates
+    op.execute(
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END"
+    )
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade_sqlite(table):
+    fts = f'{table}_fts'
+    for suffix in ('ai', 'ad', 'au'):
+        op.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+    op.execute(f'DROP TABLE IF EXISTS {fts}')
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for table, columns in SEARCH_COLUMNS.items():
+        if dialect == 'sqlite':
+            upgrade_sqlite(table, columns)
+        elif dialect == 'postgresql':
+            op.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_search ON {table} USING GIN (({TS_DOCUMENTS[table]}))')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in SEARCH_COLUMNS:
+        if dialect == 'sqlite':
+            downgrade_sqlite(table)
+        elif dialect == 'postgresql':
+            op.execute(f'DROP INDEX IF EXISTS idx_{table}_search')
@@ -0,0 +1,93 @@
+"""tag index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 14:05:37.906512
+
+Inverted index of normalized bake/recipe tags and bake allergens
+(item_tags) and incrementally maintained usage counts (tag_counts).
+Existing rows are backfilled with a copy of
+app.services.tag_service.normalize_tag, frozen as of this revision.
+"""
+import json
+import re
+from collections import Counter
+from typing import Optional
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+# Longest normalized tag stored in the index
+MAX_TAG_LENGTH = 100
+
+
+def normalize_tag(tag: str) -> Optional[str]:
+    """Frozen copy of app.services.tag_service.normalize_tag: "Gluten Free" -> "gluten-free" """
+    tag = re.sub(r"[\s_]+", "-", tag.strip().lower()).strip("-")
+    return tag[:MAX_TAG_LENGTH] or None
+
+
+def upgrade():
+    op.create_table('item_tags',
+    sa.Column('item_type', sa.String(length=50), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('tag', sa.String(length=100), nullable=False),
+    sa.PrimaryKeyConstraint('item_type', 'item_id', 'kind', 'tag')
+    )
+    op.create_index('idx_item_tags_posting', 'item_tags', ['item_type', 'tag', 'kind', 'item_id'], unique=False)
+    op.create_table('tag_counts',
+    sa.Column('item_type', sa.String(length=50), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('tag', sa.String(length=100), nullable=False),
+    sa.Column('usage_count', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('item_type', 'kind', 'tag')
+    )
+    op.create_index('idx_tag_counts_popular', 'tag_counts', ['item_type', 'kind', 'usage_count'], unique=False)
+
+    if op.get_context().as_sql:
+        # An offline (--sql) script cannot read the rows the backfill normalizes
+        op.execute("-- 0005 skipped its backfill in --sql mode; existing bakes and recipes are missing from item_tags and tag_counts until they are next saved")
+        return
+
+    connection = op.get_bind()
+    item_tags = sa.table('item_tags', sa.column('item_type'), sa.column('item_id'), sa.column('kind'), sa.column('tag'))
+    tag_counts = sa.table('tag_counts', sa.column('item_type'), sa.column('kind'), sa.column('tag'), sa.column('usage_count'))
+    sources = [
+        ('bake', sa.table('bakes', sa.column('id'), sa.column('tags', sa.JSON), sa.column('allergens', sa.JSON)), ('tags', 'allergens')),
+        ('recipe', sa.table('recipes', sa.column('id'), sa.column('tags', sa.JSON)), ('tags',)),
+    ]
+    for item_type, source, columns in sources:
+        counts = Counter()
+        for row in connection.execute(sa.select(source)).mappings():
+            pairs = set()
+            for column in columns:
+                values = row[column]
+                if isinstance(values, str):
+                    values = json.loads(values)
+                kind = 'tag' if column == 'tags' else 'allergen'
+                pairs.update((kind, normalize_tag(value)) for value in values or [] if isinstance(value, str))
+            pairs = {pair for pair in pairs if pair[1]}
+            if pairs:
+                connection.execute(item_tags.insert(), [
+                    {'item_type': item_type, 'item_id': row['id'], 'kind': kind, 'tag': tag} for kind, tag in pairs
+                ])
+            counts.update(pairs)
+        if counts:
+            connection.execute(tag_counts.insert(), [
+                {'item_type': item_type, 'kind': kind, 'tag': tag, 'usage_count': count}
+                for (kind, tag), count in counts.items()
+            ])
+
+
+def downgrade():
+    op.drop_index('idx_tag_counts_popular', table_name='tag_counts')
+    op.drop_table('tag_counts')
+    op.drop_index('idx_item_tags_posting', table_name='item_tags')
+    op.drop_table('item_tags')
@@ -0,0 +1,82 @@
+"""bake trending score
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 16:22:48.140377
+
+Time-decayed trending score stored on bakes and indexed so /bakes/trending
+is served from idx_bakes_trending. Existing bakes are backfilled with a
+copy of app.services.trending_service.calculate_trending_score, frozen as
+of this revision.
+"""
+import math
+from datetime import datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+# Fixed reference point for the time term of the trending score
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def trending_score(like_count, comment_count, review_count, created_at):
+    """Frozen copy of app.services.trending_service.calculate_trending_score; the decay is still read from settings"""
+    engagement = 1.0 * (like_count or 0) + 2.0 * (comment_count or 0) + 3.0 * (review_count or 0)
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    if created_at is None:
+        created_at = datetime.now(timezone.utc)
+    elif created_at.tzinfo is None:
+        # SQLite hands back naive datetimes; they are stored in UTC
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    age_term = (created_at - TRENDING_EPOCH).total_seconds() / settings.TRENDING_DECAY_SECONDS
+    return round(math.log10(max(engagement, 1.0)) + age_term, 6)
+
+
+def _backfill_trending_scores(connection):
+    """Score every existing bake"""
+    bakes = sa.table(
+        'bakes', sa.column('id', sa.Integer), sa.column('like_count', sa.Integer), sa.column('comment_count', sa.Integer),
+        sa.column('review_count', sa.Integer), sa.column('created_at', sa.DateTime), sa.column('trending_score', sa.Float)
+    )
+    rows = connection.execute(sa.select(
+        bakes.c.id, bakes.c.like_count, bakes.c.comment_count, bakes.c.review_count, bakes.c.created_at
+    )).all()
+    scores = []
+    for bake_id, like_count, comment_count, review_count, created_at in rows:
+        scores.append({
+            'bake_id': bake_id,
+            'score': trending_score(like_count, comment_count, review_count, created_at)
+        })
+    if scores:
+        connection.execute(
+            bakes.update().where(bakes.c.id == sa.bindparam('bake_id')).values(trending_score=sa.bindparam('score')),
+            scores
+        )
+
+
+def upgrade():
+    # Plain ADD COLUMN (no batch table rebuild) keeps the FTS triggers on bakes intact
+    op.add_column('bakes', sa.Column('trending_score', sa.Float(), server_default='0', nullable=True))
+
+    if op.get_context().as_sql:
+        # An offline (--sql) script cannot read the rows the backfill scores
+        op.execute("-- 0006 skipped its backfill in --sql mode; existing bakes keep trending_score 0 until their next like, comment or review")
+    else:
+        _backfill_trending_scores(op.get_bind())
+
+    # Built after the backfill so the index is not maintained row by row
+    op.create_index('idx_bakes_trending', 'bakes', ['trending_score', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_bakes_trending', table_name='bakes')
+    # Native DROP COLUMN (SQLite 3.35+) rather than a batch rebuild, as in upgrade()
+    op.drop_column('bakes', 'trending_score')
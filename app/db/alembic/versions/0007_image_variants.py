@@ -0,0 +1,31 @@
+"""image variants
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 10:03:26.582914
+
+Structured URLs of the thumb/card/full JPEG and WebP variants generated by
+/upload/image. Images uploaded before this revision have no variants; list
+endpoints fall back to image_url for them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ADD COLUMN (no batch table rebuild) keeps the FTS triggers intact
+    op.add_column('bakes', sa.Column('image_variants', sa.JSON(), nullable=True))
+    op.add_column('recipes', sa.Column('image_variants', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    # Native DROP COLUMN (SQLite 3.35+) rather than a batch rebuild, as in upgrade()
+    op.drop_column('recipes', 'image_variants')
+    op.drop_column('bakes', 'image_variants')
@@ -0,0 +1,45 @@
+"""content addressed images
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 13:47:11.209635
+
+Reference-counted image blobs keyed by the SHA-256 of their normalized
+output (image_blobs), and the raw upload hashes already processed into
+each blob (image_sources). Files uploaded before this revision keep their
+uuid names and are not tracked.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('image_blobs',
+    sa.Column('folder', sa.String(length=50), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('size_bytes', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('cpu_ms', sa.Float(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('folder', 'content_hash')
+    )
+    op.create_table('image_sources',
+    sa.Column('folder', sa.String(length=50), nullable=False),
+    sa.Column('source_hash', sa.String(length=64), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.PrimaryKeyConstraint('folder', 'source_hash')
+    )
+    op.create_index('idx_image_sources_blob', 'image_sources', ['folder', 'content_hash'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_image_sources_blob', table_name='image_sources')
+    op.drop_table('image_sources')
+    op.drop_table('image_blobs')
@@ -0,0 +1,42 @@
+"""direct uploads
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 18:05:37.412908
+
+Uploads clients send straight to S3 through a presigned URL, tracked until
+the processing job has stored the image and attached it to its target.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('direct_uploads',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('target', sa.String(length=20), nullable=False),
+    sa.Column('target_id', sa.Integer(), nullable=True),
+    sa.Column('object_key', sa.String(length=255), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_direct_uploads_user_id'), 'direct_uploads', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_direct_uploads_user_id'), table_name='direct_uploads')
+    op.drop_table('direct_uploads')
@@ -0,0 +1,42 @@
+"""recipe counters
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 09:12:04.518237
+
+Like, comment and favorite counters on recipes, which the likes, comments
+and favorite endpoints update atomically through
+app.services.counter_service. Likes and comments are backfilled from their
+tables; favorites are not recorded anywhere, so they start at zero.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ADD COLUMN (no batch table rebuild) keeps the FTS triggers on recipes intact
+    op.add_column('recipes', sa.Column('like_count', sa.Integer(), server_default='0', nullable=True))
+    op.add_column('recipes', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=True))
+    op.add_column('recipes', sa.Column('favorite_count', sa.Integer(), server_default='0', nullable=True))
+
+    recipes = sa.table('recipes', sa.column('id', sa.Integer), sa.column('like_count', sa.Integer), sa.column('comment_count', sa.Integer))
+    likes = sa.table('likes', sa.column('recipe_id', sa.Integer))
+    comments = sa.table('comments', sa.column('recipe_id', sa.Integer))
+    op.execute(recipes.update().values(
+        like_count=sa.select(sa.func.count()).where(likes.c.recipe_id == recipes.c.id).scalar_subquery(),
+        comment_count=sa.select(sa.func.count()).where(comments.c.recipe_id == recipes.c.id).scalar_subquery()
+    ))
+
+
+def downgrade():
+    # Native DROP COLUMN (SQLite 3.35+) rather than a batch rebuild, as in upgrade()
+    op.drop_column('recipes', 'favorite_count')
+    op.drop_column('recipes', 'comment_count')
+    op.drop_column('recipes', 'like_count')
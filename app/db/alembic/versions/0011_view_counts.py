@@ -0,0 +1,31 @@
+"""view counts
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 14:36:52.907415
+
+View counters on bakes and recipes, written in batches by
+app.services.counter_service.CounterBuffer. Views were never recorded, so
+they start at zero.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ADD COLUMN (no batch table rebuild) keeps the FTS triggers intact
+    op.add_column('bakes', sa.Column('view_count', sa.Integer(), server_default='0', nullable=True))
+    op.add_column('recipes', sa.Column('view_count', sa.Integer(), server_default='0', nullable=True))
+
+
+def downgrade():
+    # Native DROP COLUMN (SQLite 3.35+) rather than a batch rebuild, as in upgrade()
+    op.drop_column('recipes', 'view_count')
+    op.drop_column('bakes', 'view_count')
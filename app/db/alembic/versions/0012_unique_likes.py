@@ -0,0 +1,96 @@
+"""unique likes
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 17:48:21.336019
+
+A user can like a bake or recipe once. The (user_id, bake_id) and
+(user_id, recipe_id) indexes become unique, so app.services.like_service
+can insert with ON CONFLICT DO NOTHING instead of checking first.
+Duplicates left by the old check-then-insert race are deleted, keeping
+the earliest, and taken off their item's like_count.
+"""
+import math
+from datetime import datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+LIKE_TARGETS = (('bake_id', 'bakes', 'idx_likes_user_bake'), ('recipe_id', 'recipes', 'idx_likes_user_recipe'))
+
+# Fixed reference point for the time term of the trending score
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def trending_score(like_count, comment_count, review_count, created_at):
+    """Frozen copy of app.services.trending_service.calculate_trending_score; the decay is still read from settings"""
+    engagement = 1.0 * (like_count or 0) + 2.0 * (comment_count or 0) + 3.0 * (review_count or 0)
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    if created_at is None:
+        created_at = datetime.now(timezone.utc)
+    elif created_at.tzinfo is None:
+        # SQLite hands back naive datetimes; they are stored in UTC
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    age_term = (created_at - TRENDING_EPOCH).total_seconds() / settings.TRENDING_DECAY_SECONDS
+    return round(math.log10(max(engagement, 1.0)) + age_term, 6)
+
+
+def upgrade():
+    offline = op.get_context().as_sql
+    likes = sa.table('likes', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer), sa.column('bake_id', sa.Integer), sa.column('recipe_id', sa.Integer))
+    # A second copy of the table for the subqueries, so they never correlate with the outer statement
+    earlier = likes.alias('earlier')
+    for column_name, table_name, index_name in LIKE_TARGETS:
+        column = likes.c[column_name]
+        first_likes = sa.select(sa.func.min(earlier.c.id)).where(earlier.c[column_name].isnot(None)).group_by(earlier.c.user_id, earlier.c[column_name])
+        duplicate = sa.and_(column.isnot(None), likes.c.id.notin_(first_likes))
+        items = sa.table(
+            table_name, sa.column('id', sa.Integer), sa.column('like_count', sa.Integer), sa.column('comment_count', sa.Integer),
+            sa.column('review_count', sa.Integer), sa.column('created_at', sa.DateTime), sa.column('trending_score', sa.Float)
+        )
+
+        # Plain SQL, so an offline (--sql) script dedupes too before the unique index is built
+        rescored = []
+        if table_name == 'bakes' and not offline:
+            rescored = [item_id for item_id, in op.get_bind().execute(sa.select(column).where(duplicate).distinct()).all()]
+        removed = sa.select(sa.func.count()).select_from(likes).where(column == items.c.id, duplicate).scalar_subquery()
+        op.execute(items.update().where(items.c.id.in_(sa.select(column).where(duplicate))).values(
+            like_count=sa.case((items.c.like_count > removed, items.c.like_count - removed), else_=0)
+        ))
+        op.execute(likes.delete().where(duplicate))
+
+        if table_name == 'bakes' and offline:
+            op.execute("-- 0012 did not rescore bakes that lost duplicate likes in --sql mode; their trending_score catches up on their next like, comment or review")
+        connection = op.get_bind()
+        for item_id in rescored:
+            like_count, comment_count, review_count, created_at = connection.execute(sa.select(
+                items.c.like_count, items.c.comment_count, items.c.review_count, items.c.created_at
+            ).where(items.c.id == item_id)).one()
+            connection.execute(items.update().where(items.c.id == item_id).values(
+                trending_score=trending_score(like_count, comment_count, review_count, created_at)
+            ))
+
+        op.drop_index(index_name, table_name='likes')
+        op.create_index(
+            index_name, 'likes', ['user_id', column_name], unique=True,
+            postgresql_where=sa.text(f'{column_name} IS NOT NULL'),
+            sqlite_where=sa.text(f'{column_name} IS NOT NULL')
+        )
+
+
+def downgrade():
+    for column_name, _, index_name in LIKE_TARGETS:
+        op.drop_index(index_name, table_name='likes')
+        op.create_index(
+            index_name, 'likes', ['user_id', column_name], unique=False,
+            postgresql_where=sa.text(f'{column_name} IS NOT NULL'),
+            sqlite_where=sa.text(f'{column_name} IS NOT NULL')
+        )
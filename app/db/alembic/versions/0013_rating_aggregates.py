@@ -0,0 +1,94 @@
+"""rating aggregates
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-20 10:27:43.871652
+
+Rating sum and per-star review counts on recipes and bakes, which
+app.services.rating_service keeps up to date with deltas as reviews are
+written. All rating aggregates, including rating and review_count, are
+backfilled from the reviews table, and bakes with reviews are rescored
+for trending with a copy of the trending score frozen as of this revision.
+"""
+import math
+from datetime import datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+STARS = (1, 2, 3, 4, 5)
+RATED_TABLES = (('recipes', 'recipe'), ('bakes', 'bake'))
+
+# Fixed reference point for the time term of the trending score
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def trending_score(like_count, comment_count, review_count, created_at):
+    """Frozen copy of app.services.trending_service.calculate_trending_score; the decay is still read from settings"""
+    engagement = 1.0 * (like_count or 0) + 2.0 * (comment_count or 0) + 3.0 * (review_count or 0)
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    if created_at is None:
+        created_at = datetime.now(timezone.utc)
+    elif created_at.tzinfo is None:
+        # SQLite hands back naive datetimes; they are stored in UTC
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    age_term = (created_at - TRENDING_EPOCH).total_seconds() / settings.TRENDING_DECAY_SECONDS
+    return round(math.log10(max(engagement, 1.0)) + age_term, 6)
+
+
+def upgrade():
+    # Plain ADD COLUMN (no batch table rebuild) keeps the FTS triggers intact
+    for table_name, _ in RATED_TABLES:
+        op.add_column(table_name, sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=True))
+        for stars in STARS:
+            op.add_column(table_name, sa.Column(f'rating_{stars}_count', sa.Integer(), server_default='0', nullable=True))
+
+    # Plain SQL, so an offline (--sql) script backfills the aggregates too
+    reviews = sa.table('reviews', sa.column('item_id', sa.Integer), sa.column('item_type', sa.String), sa.column('rating', sa.Integer))
+    for table_name, item_type in RATED_TABLES:
+        items = sa.table(
+            table_name, sa.column('id', sa.Integer), sa.column('rating', sa.Float), sa.column('review_count', sa.Integer),
+            sa.column('rating_sum', sa.Integer), *[sa.column(f'rating_{stars}_count', sa.Integer) for stars in STARS]
+        )
+        item_reviews = sa.and_(reviews.c.item_type == item_type, reviews.c.item_id == items.c.id)
+
+        def aggregate(expression, *criteria):
+            return sa.select(expression).where(item_reviews, *criteria).scalar_subquery()
+
+        op.execute(items.update().values(
+            rating=aggregate(sa.func.coalesce(sa.func.avg(reviews.c.rating), 0.0)),
+            review_count=aggregate(sa.func.count()),
+            rating_sum=aggregate(sa.func.coalesce(sa.func.sum(reviews.c.rating), 0)),
+            **{f'rating_{stars}_count': aggregate(sa.func.count(), reviews.c.rating == stars) for stars in STARS}
+        ))
+
+    if op.get_context().as_sql:
+        op.execute("-- 0013 did not rescore reviewed bakes in --sql mode; their trending_score catches up on their next like, comment or review")
+        return
+
+    connection = op.get_bind()
+    bakes = sa.table(
+        'bakes', sa.column('id', sa.Integer), sa.column('like_count', sa.Integer), sa.column('comment_count', sa.Integer),
+        sa.column('review_count', sa.Integer), sa.column('created_at', sa.DateTime), sa.column('trending_score', sa.Float)
+    )
+    reviewed_bakes = sa.select(reviews.c.item_id).where(reviews.c.item_type == 'bake')
+    for bake in connection.execute(sa.select(bakes).where(bakes.c.id.in_(reviewed_bakes))).all():
+        connection.execute(bakes.update().where(bakes.c.id == bake.id).values(
+            trending_score=trending_score(bake.like_count, bake.comment_count, bake.review_count, bake.created_at)
+        ))
+
+
+def downgrade():
+    # Native DROP COLUMN (SQLite 3.35+) rather than a batch rebuild, as in upgrade()
+    for table_name, _ in reversed(RATED_TABLES):
+        for stars in reversed(STARS):
+            op.drop_column(table_name, f'rating_{stars}_count')
+        op.drop_column(table_name, 'rating_sum')
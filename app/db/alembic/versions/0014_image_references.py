@@ -0,0 +1,70 @@
+"""image references
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-21 09:14:37.502118
+
+Who holds each reference on an image blob, so a user can only release
+their own and releasing twice is a no-op. Avatars are attributed to the
+users whose avatar_url points at them. Other references taken before this
+revision have no recorded holder: they stay in ref_count, keeping their
+files, but cannot be released through the API.
+"""
+import re
+from typing import Optional
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+_CONTENT_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+
+def avatar_content_hash(filename: str) -> Optional[str]:
+    """Content hash of a stored avatar's file name, or None for one that predates content addressing
+
+    Frozen copy of app.services.image_service.content_hash_for_filename for
+    the avatars folder.
+    """
+    stem = filename[:-len(".jpg")] if filename.endswith(".jpg") else ""
+    return stem if _CONTENT_HASH.match(stem) else None
+
+
+def upgrade():
+    op.create_table('image_references',
+    sa.Column('folder', sa.String(length=50), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('folder', 'content_hash', 'user_id')
+    )
+
+    if op.get_context().as_sql:
+        # An offline (--sql) script cannot read the avatar URLs the backfill parses
+        op.execute("-- 0014 skipped its backfill in --sql mode; avatars set before this revision have no recorded holder and cannot be released through the API")
+        return
+
+    connection = op.get_bind()
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('avatar_url', sa.String))
+    blobs = sa.table('image_blobs', sa.column('folder', sa.String), sa.column('content_hash', sa.String), sa.column('ref_count', sa.Integer))
+    references = sa.table('image_references', sa.column('folder', sa.String), sa.column('content_hash', sa.String), sa.column('user_id', sa.Integer))
+    stored = dict(connection.execute(sa.select(blobs.c.content_hash, blobs.c.ref_count).where(blobs.c.folder == 'avatars')).all())
+    attributed = []
+    for user_id, avatar_url in connection.execute(sa.select(users.c.id, users.c.avatar_url).where(users.c.avatar_url.isnot(None))).all():
+        content_hash = avatar_content_hash(avatar_url.rsplit('/', 1)[-1])
+        # No more holders than the blob has references
+        if content_hash and stored.get(content_hash, 0) > 0:
+            stored[content_hash] -= 1
+            attributed.append({'folder': 'avatars', 'content_hash': content_hash, 'user_id': user_id})
+    if attributed:
+        op.bulk_insert(references, attributed)
+
+
+def downgrade():
+    op.drop_table('image_references')
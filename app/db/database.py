@@ -1,21 +1,84 @@
 """
 Database connection and session management
 """
+import itertools
+import time
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.pool_metrics import PoolMetrics
+from app.db.routing import recent_writes
 
-# Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=settings.DEBUG
+
+def get_async_database_url(database_url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite/asyncpg)"""
+    if database_url.startswith("sqlite:"):
+        return database_url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if database_url.startswith("postgres://"):
+        return database_url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if database_url.startswith("postgresql://") or database_url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + database_url.split("://", 1)[1]
+    return database_url
+
+
+def get_engine_options(database_url: str) -> dict:
+    """Build engine keyword arguments from the pool settings"""
+    options = {
+        "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+        "pool_recycle": settings.DATABASE_POOL_RECYCLE,
+        "echo": settings.DATABASE_ECHO,
+    }
+    # SQLite engines pick their own pool class, which takes no sizing options
+    if not database_url.startswith("sqlite"):
+        options.update(
+            pool_size=settings.DATABASE_POOL_SIZE,
+            max_overflow=settings.DATABASE_MAX_OVERFLOW,
+            pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        )
+    return options
+
+
+# Create database engine (used by scripts and migrations)
+engine = create_engine(settings.DATABASE_URL, **get_engine_options(settings.DATABASE_URL))
+
+# Create async database engine (used by the API)
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    **get_engine_options(settings.DATABASE_URL)
 )
 
-# Create session factory
+# Create async engines for read replicas (optional)
+replica_engines = [
+    create_async_engine(get_async_database_url(url), **get_engine_options(url))
+    for url in settings.DATABASE_REPLICA_URLS
+]
+
+# Collect pool statistics for the API engine
+pool_metrics = PoolMetrics()
+pool_metrics.attach(async_engine.sync_engine.pool)
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+ReplicaSessionLocals = [
+    async_sessionmaker(
+        bind=replica_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+    for replica_engine in replica_engines
+]
+_replica_cycle = itertools.cycle(ReplicaSessionLocals) if ReplicaSessionLocals else None
 
 # Create base class for models
 Base = declarative_base()
@@ -30,19 +93,45 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency to get async database session"""
+    async with AsyncSessionLocal() as db:
+        # Acquire the connection up front so pool wait time is measured per request
+        started = time.perf_counter()
+        try:
+            await db.connection()
+        except PoolTimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        pool_metrics.record_wait((time.perf_counter() - started) * 1000)
+        yield db
+
+
+async def get_read_db(request: Request):
+    """Dependency to get a read-only session, round-robined across replicas
+
+    Falls back to the primary when no replicas are configured or when the
+    client wrote within the last READ_YOUR_WRITES_SECONDS.
+    """
+    if _replica_cycle is None or recent_writes.wrote_recently(request):
+        async for db in get_async_db():
+            yield db
+        return
+
+    async with next(_replica_cycle)() as db:
+        yield db
+
+
 def get_test_db():
     """Dependency to get test database session"""
     if not settings.DATABASE_TEST_URL:
         raise ValueError("Test database URL not configured")
-    
+
     test_engine = create_engine(settings.DATABASE_TEST_URL)
     TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
-    
+
     db = TestSessionLocal()
     try:
         yield db
     finally:
         db.close()
-        db.close()
-
-
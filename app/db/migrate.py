@@ -0,0 +1,30 @@
+"""
+Apply Alembic migrations on startup
+"""
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from app.db.database import engine
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def get_alembic_config() -> Config:
+    """Build the Alembic config independently of the working directory"""
+    config = Config(str(PROJECT_ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(PROJECT_ROOT / "app" / "db" / "alembic"))
+    return config
+
+
+def run_migrations():
+    """Upgrade the database to the latest revision
+
+    Databases built before Alembic was introduced, by
+    Base.metadata.create_all() or by hand, run the baseline revision too:
+    it only creates the tables and indexes they are missing.
+    """
+    config = get_alembic_config()
+
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
@@ -223,6 +223,25 @@ def migrate():
         conn.execute(text("CREATE INDEX IF NOT EXISTS idx_purchases_seller_id ON purchases(seller_id)"))
         conn.execute(text("CREATE INDEX IF NOT EXISTS idx_purchases_item ON purchases(item_type, item_id)"))
         
+        # Composite indexes backing keyset (created_at, id) pagination
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_bakes_created_at_id ON bakes(created_at, id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_recipes_created_at_id ON recipes(created_at, id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_users_created_at_id ON users(created_at, id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_comments_bake_created_at_id ON comments(bake_id, created_at, id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_comments_recipe_created_at_id ON comments(recipe_id, created_at, id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_likes_bake_created_at_id ON likes(bake_id, created_at, id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_likes_recipe_created_at_id ON likes(recipe_id, created_at, id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_messages_receiver_created_at_id ON messages(receiver_id, created_at, id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_messages_sender_created_at_id ON messages(sender_id, created_at, id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_messages_conversation_created_at_id ON messages(sender_id, receiver_id, created_at, id)"))
+        
+        # Composite indexes for hot filters (kept in sync with Alembic revision 0002)
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_likes_user_bake ON likes(user_id, bake_id) WHERE bake_id IS NOT NULL"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_likes_user_recipe ON likes(user_id, recipe_id) WHERE recipe_id IS NOT NULL"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_messages_receiver_is_read ON messages(receiver_id, is_read)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_bakes_created_by_created_at ON bakes(created_by, created_at)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_recipes_category_created_at ON recipes(category, created_at)"))
+        
         conn.commit()
     
     print("✅ All tables created successfully!")
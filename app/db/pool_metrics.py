@@ -0,0 +1,120 @@
+"""
+Connection pool metrics for sizing the database pool from live data
+"""
+import threading
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+# Upper bounds (in milliseconds) of the connection wait time histogram buckets
+WAIT_TIME_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class PoolMetrics:
+    """Thread-safe counters and wait time histogram for a connection pool"""
+
+    def __init__(self, buckets_ms: Optional[List[float]] = None):
+        self.buckets_ms = buckets_ms or WAIT_TIME_BUCKETS_MS
+        self._pool: Optional[Pool] = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset all counters"""
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.peak_checked_out = 0
+            self.peak_overflow = 0
+            self.wait_count = 0
+            self.wait_sum_ms = 0.0
+            self.wait_max_ms = 0.0
+            self.wait_histogram = [0] * (len(self.buckets_ms) + 1)
+
+    def record_wait(self, wait_ms: float):
+        """Record how long a request waited to obtain a connection"""
+        with self._lock:
+            self.wait_count += 1
+            self.wait_sum_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            for index, bound in enumerate(self.buckets_ms):
+                if wait_ms <= bound:
+                    self.wait_histogram[index] += 1
+                    break
+            else:
+                self.wait_histogram[-1] += 1
+
+    def record_timeout(self):
+        """Record a request that gave up waiting for a connection"""
+        with self._lock:
+            self.timeouts += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        pool = self._pool
+        with self._lock:
+            self.checkouts += 1
+            if hasattr(pool, "checkedout"):
+                self.peak_checked_out = max(self.peak_checked_out, pool.checkedout())
+            if hasattr(pool, "overflow"):
+                self.peak_overflow = max(self.peak_overflow, pool.overflow())
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def attach(self, pool: Pool):
+        """Register pool event listeners that feed these metrics"""
+        self._pool = pool
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def snapshot(self) -> Dict:
+        """Return live pool state together with the collected metrics"""
+        pool = self._pool
+        live = {"status": pool.status()}
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            if hasattr(pool, name):
+                live[name] = getattr(pool, name)()
+
+        with self._lock:
+            labels = [f"le_{bound}ms" for bound in self.buckets_ms] + ["le_inf"]
+            cumulative = 0
+            histogram = {}
+            for label, count in zip(labels, self.wait_histogram):
+                cumulative += count
+                histogram[label] = cumulative
+
+            return {
+                "pool": live,
+                "events": {
+                    "connects": self.connects,
+                    "checkouts": self.checkouts,
+                    "checkins": self.checkins,
+                    "invalidations": self.invalidations,
+                    "timeouts": self.timeouts,
+                },
+                "peaks": {
+                    "checked_out": self.peak_checked_out,
+                    "overflow": self.peak_overflow,
+                },
+                "wait_time_ms": {
+                    "count": self.wait_count,
+                    "sum": round(self.wait_sum_ms, 3),
+                    "avg": round(self.wait_sum_ms / self.wait_count, 3) if self.wait_count else 0.0,
+                    "max": round(self.wait_max_ms, 3),
+                    "histogram": histogram,
+                },
+            }
@@ -0,0 +1,89 @@
+"""
+Read/write routing helpers for primary and replica databases
+"""
+import hashlib
+import hmac
+import threading
+import time
+from typing import Dict, Optional
+from fastapi import Request
+from app.core.config import settings
+
+# Cookie carrying the epoch until which the client must read from the primary, signed
+PRIMARY_UNTIL_COOKIE = "xfood_primary_until"
+
+# Seconds a signed cookie may run past one window, for clock skew between processes
+COOKIE_CLOCK_SKEW = 1
+
+# HTTP methods that never write
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def get_client_key(request: Request) -> str:
+    """Identify the client behind a request (bearer token, else remote address)"""
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return "token:" + hashlib.sha256(authorization.encode()).hexdigest()
+    host = request.client.host if request.client else "unknown"
+    return f"host:{host}"
+
+
+class ReadYourWritesTracker:
+    """Remember which clients wrote recently so their reads stay on the primary
+
+    The window is also handed to the client as a cookie, for the processes
+    that did not see the write. The cookie is signed with the secret key and
+    can never reach further ahead than one window, so a client cannot pin
+    itself to the primary, and past the response cache, by forging it.
+    """
+
+    def __init__(self, window_seconds: int, secret_key: str):
+        self.window_seconds = window_seconds
+        self._secret_key = secret_key.encode()
+        self._lock = threading.Lock()
+        self._writes: Dict[str, float] = {}
+
+    def record_write(self, request: Request) -> float:
+        """Record a write by the request's client and return when the window ends"""
+        now = time.time()
+        until = now + self.window_seconds
+        with self._lock:
+            self._writes[get_client_key(request)] = until
+            # Drop expired entries so the map stays bounded by active writers
+            if len(self._writes) > 10000:
+                self._writes = {k: v for k, v in self._writes.items() if v > now}
+        return until
+
+    def _signature(self, until: str) -> str:
+        return hmac.new(self._secret_key, f"{PRIMARY_UNTIL_COOKIE}:{until}".encode(), hashlib.sha256).hexdigest()
+
+    def cookie_value(self, until: float) -> str:
+        """Signed PRIMARY_UNTIL_COOKIE value for a window ending at until"""
+        value = f"{until:.3f}"
+        return f"{value}:{self._signature(value)}"
+
+    def _cookie_until(self, cookie: str) -> Optional[float]:
+        """When a cookie's window ends, or None if it is not one we signed"""
+        value, _, signature = cookie.partition(":")
+        if not hmac.compare_digest(signature.encode(), self._signature(value).encode()):
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+    def wrote_recently(self, request: Request) -> bool:
+        """Check whether the request's client is inside its read-your-writes window"""
+        now = time.time()
+        cookie = request.cookies.get(PRIMARY_UNTIL_COOKIE)
+        if cookie:
+            until = self._cookie_until(cookie)
+            if until is not None and now < until <= now + self.window_seconds + COOKIE_CLOCK_SKEW:
+                return True
+        with self._lock:
+            until = self._writes.get(get_client_key(request))
+        return until is not None and until > now
+
+
+# Global tracker instance
+recent_writes = ReadYourWritesTracker(settings.READ_YOUR_WRITES_SECONDS, settings.SECRET_KEY)
@@ -0,0 +1,106 @@
+"""
+Full-text search over bakes and recipes
+
+SQLite uses FTS5 external-content tables (``bakes_fts``, ``recipes_fts``)
+that triggers keep in sync with their base tables. PostgreSQL uses GIN
+expression indexes over the tsvector documents defined here. Both are
+created by Alembic revision 0003. Any other dialect falls back to ILIKE.
+"""
+import re
+from typing import Any, List
+from sqlalchemy import Select, Text, cast, column, func, literal_column, or_, select, table
+
+# Text search configuration used for stemming on PostgreSQL
+TS_CONFIG = "english"
+
+# Longest search input considered; extra terms are ignored
+MAX_SEARCH_TERMS = 16
+
+# Indexed columns per table, highest weight first
+SEARCH_COLUMNS = {
+    "bakes": ("title", "description", "tags"),
+    "recipes": ("title", "description", "tags", "ingredients", "instructions"),
+}
+
+# bm25() column weights for SQLite, in SEARCH_COLUMNS order
+BM25_WEIGHTS = {
+    "bakes": (10.0, 4.0, 2.0),
+    "recipes": (10.0, 4.0, 2.0, 2.0, 1.0),
+}
+
+# PostgreSQL tsvector documents. Each must match the expression of its
+# idx_<table>_search index exactly, otherwise the planner cannot use it.
+TS_DOCUMENTS = {
+    "bakes": (
+        "setweight(to_tsvector('english', coalesce(bakes.title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(bakes.description, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(bakes.tags::text, '')), 'C')"
+    ),
+    "recipes": (
+        "setweight(to_tsvector('english', coalesce(recipes.title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(recipes.description, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(recipes.tags::text, '')), 'C') || "
+        "setweight(to_tsvector('english', coalesce(recipes.ingredients::text, '')), 'C') || "
+        "setweight(to_tsvector('english', coalesce(recipes.instructions::text, '')), 'D')"
+    ),
+}
+
+
+def parse_search_terms(search: str) -> List[str]:
+    """Split raw user input into lowercase word terms"""
+    return re.findall(r"\w+", search.lower())[:MAX_SEARCH_TERMS]
+
+
+def build_fts5_query(terms: List[str]) -> str:
+    """Build an FTS5 MATCH expression requiring every term, each as a prefix"""
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def build_tsquery(terms: List[str]) -> str:
+    """Build a to_tsquery() expression requiring every term, each as a prefix"""
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def apply_search(query: Select, model: Any, search: str, dialect_name: str) -> Select:
+    """Filter a query to rows matching ``search``, ordered by relevance
+
+    Every term must match, and terms match as word prefixes ("choc"
+    matches "chocolate"). Any existing ORDER BY is replaced.
+    """
+    terms = parse_search_terms(search)
+    tablename = model.__tablename__
+    query = query.order_by(None)
+
+    if not terms:
+        # Nothing searchable (e.g. only punctuation): leave the query unfiltered
+        return query.order_by(model.created_at.desc(), model.id.desc())
+
+    if dialect_name == "sqlite":
+        fts = table(f"{tablename}_fts", column("rowid"))
+        fts_column = literal_column(f"{tablename}_fts")
+        ranked = (
+            select(
+                fts.c.rowid.label("id"),
+                func.bm25(fts_column, *BM25_WEIGHTS[tablename]).label("rank")
+            )
+            .where(fts_column.op("MATCH")(build_fts5_query(terms)))
+            .subquery()
+        )
+        # bm25() is lower-is-better
+        return query.join(ranked, ranked.c.id == model.id).order_by(ranked.c.rank, model.id.desc())
+
+    if dialect_name == "postgresql":
+        document = literal_column(f"({TS_DOCUMENTS[tablename]})")
+        ts_query = func.to_tsquery(literal_column(f"'{TS_CONFIG}'"), build_tsquery(terms))
+        return query.filter(document.op("@@")(ts_query)).order_by(
+            func.ts_rank(document, ts_query).desc(), model.id.desc()
+        )
+
+    # No full-text index for this dialect: substring match on the text columns
+    conditions = []
+    for term in terms:
+        conditions.append(or_(*[
+            cast(getattr(model, name), Text).ilike(f"%{term}%")
+            for name in SEARCH_COLUMNS[tablename]
+        ]))
+    return query.filter(*conditions).order_by(model.created_at.desc(), model.id.desc())
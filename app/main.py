@@ -6,11 +6,21 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import time
+from app.core.cache import response_cache
 from app.core.config import settings
-from app.api import auth, users, recipes, bakes, circles, messages, reviews, comments, likes, upload, checkout, webhooks
-from app.db.database import engine
-from app.models import user, recipe, bake, circle, message, review, comment, like, purchase, subscription
+from app.core.http_client import close_http_client
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.security import password_hasher
+from app.core.user_cache import user_cache
+from app.api import auth, users, recipes, bakes, circles, messages, reviews, comments, likes, upload, checkout, webhooks, internal
+from app.db.database import async_engine, replica_engines
+from app.db.migrate import run_migrations
+from app.db.routing import recent_writes, PRIMARY_UNTIL_COOKIE, SAFE_METHODS
+from app.services.counter_service import counter_buffer
+from app.services.image_service import image_pipeline
+from app.models import user, recipe, bake, circle, message, review, comment, like, purchase, subscription, tag, image
 
 
 @asynccontextmanager
@@ -19,17 +29,29 @@ async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Starting xFood Community Baking Platform Backend...")
     
-    # Create database tables
+    # Apply database migrations; the app cannot serve requests without its schema
     try:
-        from app.db.database import Base
-        Base.metadata.create_all(bind=engine)
-        print("✅ Database tables created successfully")
+        await asyncio.to_thread(run_migrations)
+        print("✅ Database migrations applied successfully")
     except Exception as e:
-        print(f"⚠️ Warning: Could not create database tables: {e}")
+        print(f"❌ Could not apply database migrations: {e}")
+        raise
+    
+    # Write buffered view, like and comment counts to the database in the background
+    counter_buffer.start()
     
     yield
     # Shutdown
     print("🛑 Shutting down xFood Backend...")
+    image_pipeline.shutdown()
+    password_hasher.shutdown()
+    await response_cache.close()
+    await user_cache.close()
+    await close_http_client()
+    await counter_buffer.stop()
+    await async_engine.dispose()
+    for replica_engine in replica_engines:
+        await replica_engine.dispose()
 
 
 # Create FastAPI app
@@ -49,6 +71,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.add_middleware(
@@ -67,6 +90,22 @@ async def add_process_time_header(request: Request, call_next):
     return response
 
 
+@app.middleware("http")
+async def track_recent_writes(request: Request, call_next):
+    """Pin clients that just wrote to the primary database, and past the response cache, for a short window"""
+    response = await call_next(request)
+    if (replica_engines or settings.RESPONSE_CACHE_ENABLED) and request.method not in SAFE_METHODS and response.status_code < 400:
+        until = recent_writes.record_write(request)
+        response.set_cookie(
+            PRIMARY_UNTIL_COOKIE,
+            recent_writes.cookie_value(until),
+            max_age=settings.READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite="lax"
+        )
+    return response
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler"""
@@ -92,6 +131,7 @@ app.include_router(likes.router, prefix=f"{settings.API_PREFIX}/likes", tags=["L
 app.include_router(upload.router, prefix=f"{settings.API_PREFIX}/upload", tags=["File Upload"])
 app.include_router(checkout.router, prefix=f"{settings.API_PREFIX}/checkout", tags=["Checkout"])
 app.include_router(webhooks.router, prefix=f"{settings.API_PREFIX}/webhooks", tags=["Webhooks"])
+app.include_router(internal.router, prefix=f"{settings.API_PREFIX}/internal", tags=["Internal"])
 
 
 @app.get("/")
@@ -2,22 +2,32 @@
 Models package for the xFood platform
 """
 from app.models.user import User
-from app.models.recipe import Recipe
+from app.models.recipe import Recipe, RecipeIngredient
 from app.models.bake import Bake
 from app.models.circle import Circle, CircleMember
 from app.models.message import Message
 from app.models.review import Review
 from app.models.comment import Comment
 from app.models.like import Like
+from app.models.tag import ItemTag, TagCount
+from app.models.image import ImageBlob, ImageReference, ImageSource
+from app.models.upload import DirectUpload
 
 __all__ = [
     "User",
     "Recipe", 
+    "RecipeIngredient",
     "Bake",
     "Circle",
     "CircleMember",
     "Message",
     "Review",
     "Comment",
-    "Like"
+    "Like",
+    "ItemTag",
+    "TagCount",
+    "ImageBlob",
+    "ImageReference",
+    "ImageSource",
+    "DirectUpload"
 ]
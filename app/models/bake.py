@@ -1,7 +1,7 @@
 """
 Bake model for products that are for sale
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, JSON, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -10,11 +10,17 @@ from app.db.database import Base
 class Bake(Base):
     """Bake model for products for sale"""
     __tablename__ = "bakes"
+    __table_args__ = (
+        Index("idx_bakes_created_at_id", "created_at", "id"),
+        Index("idx_bakes_created_by_created_at", "created_by", "created_at"),
+        Index("idx_bakes_trending", "trending_score", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False, index=True)
     description = Column(Text, nullable=False)
     image_url = Column(String(500), nullable=True)
+    image_variants = Column(JSON, nullable=True)  # {"thumb": {"jpeg": url, "webp": url}, "card": ..., "full": ...}
     category = Column(String(100), nullable=False)
     tags = Column(JSON, default=[])
     allergens = Column(JSON, default=[])
@@ -24,10 +30,19 @@ class Bake(Base):
     full_address = Column(Text, nullable=True)
     phone_number = Column(String(20), nullable=True)
     circle_id = Column(Integer, ForeignKey("circles.id"), nullable=True)
-    rating = Column(Float, default=0.0)
+    rating = Column(Float, default=0.0)  # rating_sum / review_count; see app.services.rating_service
     review_count = Column(Integer, default=0)
+    rating_sum = Column(Integer, default=0, server_default="0")
+    # Reviews by star rating, for the rating distribution
+    rating_1_count = Column(Integer, default=0, server_default="0")
+    rating_2_count = Column(Integer, default=0, server_default="0")
+    rating_3_count = Column(Integer, default=0, server_default="0")
+    rating_4_count = Column(Integer, default=0, server_default="0")
+    rating_5_count = Column(Integer, default=0, server_default="0")
     like_count = Column(Integer, default=0)
     comment_count = Column(Integer, default=0)
+    view_count = Column(Integer, default=0, server_default="0")  # written behind; see app.services.counter_service
+    trending_score = Column(Float, default=0.0, server_default="0")  # see app.services.trending_service
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -39,6 +54,20 @@ class Bake(Base):
     comments = relationship("Comment", back_populates="bake")
     likes = relationship("Like", back_populates="bake")
 
+    @property
+    def thumbnail_url(self):
+        """Smallest stored image variant, for list views"""
+        variants = self.image_variants or {}
+        return variants.get("thumb", {}).get("webp") or self.image_url
+
+    @property
+    def rating_histogram(self):
+        """Review counts for one to five stars"""
+        return [
+            self.rating_1_count or 0, self.rating_2_count or 0, self.rating_3_count or 0,
+            self.rating_4_count or 0, self.rating_5_count or 0
+        ]
+
     @property
     def price(self):
         """Convert price_cents to dollars"""
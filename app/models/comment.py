@@ -1,7 +1,7 @@
 """
 Comment model for commenting on recipes and bakes
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -10,6 +10,10 @@ from app.db.database import Base
 class Comment(Base):
     """Comment model for recipes and bakes"""
     __tablename__ = "comments"
+    __table_args__ = (
+        Index("idx_comments_bake_created_at_id", "bake_id", "created_at", "id"),
+        Index("idx_comments_recipe_created_at_id", "recipe_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
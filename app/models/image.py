@@ -0,0 +1,49 @@
+"""
+Content-addressed image storage models
+"""
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class ImageBlob(Base):
+    """A stored image (with all its variants), keyed by the hash of its normalized output"""
+    __tablename__ = "image_blobs"
+
+    folder = Column(String(50), primary_key=True)  # "images" or "avatars"
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 of the full-size JPEG
+    ref_count = Column(Integer, nullable=False, default=0, server_default="0")
+    size_bytes = Column(Integer, nullable=False, default=0, server_default="0")  # all variants
+    cpu_ms = Column(Float, nullable=False, default=0.0, server_default="0")  # cost of producing it
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<ImageBlob(folder='{self.folder}', content_hash='{self.content_hash}', ref_count={self.ref_count})>"
+
+
+class ImageReference(Base):
+    """A user's reference on a blob; ImageBlob.ref_count counts these"""
+    __tablename__ = "image_references"
+
+    folder = Column(String(50), primary_key=True)
+    content_hash = Column(String(64), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<ImageReference(folder='{self.folder}', content_hash='{self.content_hash}', user_id={self.user_id})>"
+
+
+class ImageSource(Base):
+    """Raw upload hash already processed into a blob, so repeats skip processing"""
+    __tablename__ = "image_sources"
+    __table_args__ = (
+        Index("idx_image_sources_blob", "folder", "content_hash"),
+    )
+
+    folder = Column(String(50), primary_key=True)
+    source_hash = Column(String(64), primary_key=True)  # SHA-256 of the uploaded bytes
+    content_hash = Column(String(64), nullable=False)
+
+    def __repr__(self):
+        return f"<ImageSource(folder='{self.folder}', source_hash='{self.source_hash}', content_hash='{self.content_hash}')>"
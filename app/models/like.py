@@ -1,7 +1,7 @@
 """
 Like model for liking recipes and bakes
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -10,6 +10,21 @@ from app.db.database import Base
 class Like(Base):
     """Like model for recipes and bakes"""
     __tablename__ = "likes"
+    __table_args__ = (
+        Index("idx_likes_bake_created_at_id", "bake_id", "created_at", "id"),
+        Index("idx_likes_recipe_created_at_id", "recipe_id", "created_at", "id"),
+        # One like per user and item; like_service inserts with ON CONFLICT against these
+        Index(
+            "idx_likes_user_bake", "user_id", "bake_id", unique=True,
+            postgresql_where=text("bake_id IS NOT NULL"),
+            sqlite_where=text("bake_id IS NOT NULL"),
+        ),
+        Index(
+            "idx_likes_user_recipe", "user_id", "recipe_id", unique=True,
+            postgresql_where=text("recipe_id IS NOT NULL"),
+            sqlite_where=text("recipe_id IS NOT NULL"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
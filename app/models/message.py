@@ -1,7 +1,7 @@
 """
 Message model for direct messaging between users
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -10,6 +10,12 @@ from app.db.database import Base
 class Message(Base):
     """Message model for direct messaging"""
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("idx_messages_receiver_created_at_id", "receiver_id", "created_at", "id"),
+        Index("idx_messages_sender_created_at_id", "sender_id", "created_at", "id"),
+        Index("idx_messages_conversation_created_at_id", "sender_id", "receiver_id", "created_at", "id"),
+        Index("idx_messages_receiver_is_read", "receiver_id", "is_read"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,7 +1,7 @@
 """
 Recipe model for the xFood platform
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, JSON, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -10,11 +10,16 @@ from app.db.database import Base
 class Recipe(Base):
     """Recipe model"""
     __tablename__ = "recipes"
+    __table_args__ = (
+        Index("idx_recipes_created_at_id", "created_at", "id"),
+        Index("idx_recipes_category_created_at", "category", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False, index=True)
     description = Column(Text, nullable=False)
     image_url = Column(String(500), nullable=True)
+    image_variants = Column(JSON, nullable=True)  # {"thumb": {"jpeg": url, "webp": url}, "card": ..., "full": ...}
     ingredients = Column(JSON, nullable=False)  # Changed from ARRAY to JSON for SQLite compatibility
     instructions = Column(JSON, nullable=False)  # Changed from ARRAY to JSON for SQLite compatibility
     prep_time = Column(Integer, nullable=True)  # in minutes
@@ -25,8 +30,20 @@ class Recipe(Base):
     tags = Column(JSON, default=[])  # Changed from ARRAY to JSON for SQLite compatibility
     is_premium = Column(Boolean, default=False)
     price_cents = Column(Integer, nullable=True)  # Price in cents for premium recipes
-    rating = Column(Float, default=0.0)
+    rating = Column(Float, default=0.0)  # rating_sum / review_count; see app.services.rating_service
     review_count = Column(Integer, default=0)
+    rating_sum = Column(Integer, default=0, server_default="0")
+    # Reviews by star rating, for the rating distribution
+    rating_1_count = Column(Integer, default=0, server_default="0")
+    rating_2_count = Column(Integer, default=0, server_default="0")
+    rating_3_count = Column(Integer, default=0, server_default="0")
+    rating_4_count = Column(Integer, default=0, server_default="0")
+    rating_5_count = Column(Integer, default=0, server_default="0")
+    like_count = Column(Integer, default=0, server_default="0")
+    comment_count = Column(Integer, default=0, server_default="0")
+    favorite_count = Column(Integer, default=0, server_default="0")
+    view_count = Column(Integer, default=0, server_default="0")  # written behind; see app.services.counter_service
+    ingredient_count = Column(Integer, default=0, server_default="0")  # distinct normalized ingredients
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -37,7 +54,36 @@ class Recipe(Base):
     comments = relationship("Comment", back_populates="recipe")
     likes = relationship("Like", back_populates="recipe")
     
+    @property
+    def thumbnail_url(self):
+        """Smallest stored image variant, for list views"""
+        variants = self.image_variants or {}
+        return variants.get("thumb", {}).get("webp") or self.image_url
+    
+    @property
+    def rating_histogram(self):
+        """Review counts for one to five stars"""
+        return [
+            self.rating_1_count or 0, self.rating_2_count or 0, self.rating_3_count or 0,
+            self.rating_4_count or 0, self.rating_5_count or 0
+        ]
+    
     def __repr__(self):
         return f"<Recipe(id={self.id}, title='{self.title}', created_by={self.created_by})>"
 
 
+class RecipeIngredient(Base):
+    """Inverted index entry: one normalized ingredient of one recipe"""
+    __tablename__ = "recipe_ingredients"
+    __table_args__ = (
+        # Posting list per ingredient
+        Index("idx_recipe_ingredients_ingredient_recipe", "ingredient", "recipe_id"),
+    )
+    
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    ingredient = Column(String(100), primary_key=True)
+    
+    def __repr__(self):
+        return f"<RecipeIngredient(recipe_id={self.recipe_id}, ingredient='{self.ingredient}')>"
+
+
@@ -1,7 +1,7 @@
 """
 Review model for rating recipes and bakes
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -10,6 +10,9 @@ from app.db.database import Base
 class Review(Base):
     """Review model for rating recipes and bakes"""
     __tablename__ = "reviews"
+    __table_args__ = (
+        Index("idx_reviews_item", "item_type", "item_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -24,6 +27,16 @@ class Review(Base):
     user = relationship("User")
     # Removed problematic back_populates references
     
+    @property
+    def recipe_id(self):
+        """The reviewed recipe's ID, for the review schemas"""
+        return self.item_id if self.item_type == "recipe" else None
+    
+    @property
+    def bake_id(self):
+        """The reviewed bake's ID, for the review schemas"""
+        return self.item_id if self.item_type == "bake" else None
+    
     def __repr__(self):
         return f"<Review(id={self.id}, user_id={self.user_id}, item_type='{self.item_type}', rating={self.rating})>"
 
@@ -0,0 +1,38 @@
+"""
+Tag and allergen index models for bakes and recipes
+"""
+from sqlalchemy import Column, Integer, String, Index
+from app.db.database import Base
+
+
+class ItemTag(Base):
+    """Inverted index entry: one tag or allergen of one bake or recipe"""
+    __tablename__ = "item_tags"
+    __table_args__ = (
+        # Posting list per tag
+        Index("idx_item_tags_posting", "item_type", "tag", "kind", "item_id"),
+    )
+
+    item_type = Column(String(50), primary_key=True)  # "recipe" or "bake"
+    item_id = Column(Integer, primary_key=True)
+    kind = Column(String(20), primary_key=True)  # "tag" or "allergen"
+    tag = Column(String(100), primary_key=True)
+
+    def __repr__(self):
+        return f"<ItemTag(item_type='{self.item_type}', item_id={self.item_id}, kind='{self.kind}', tag='{self.tag}')>"
+
+
+class TagCount(Base):
+    """Number of bakes or recipes using a tag, maintained incrementally"""
+    __tablename__ = "tag_counts"
+    __table_args__ = (
+        Index("idx_tag_counts_popular", "item_type", "kind", "usage_count"),
+    )
+
+    item_type = Column(String(50), primary_key=True)
+    kind = Column(String(20), primary_key=True)
+    tag = Column(String(100), primary_key=True)
+    usage_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    def __repr__(self):
+        return f"<TagCount(item_type='{self.item_type}', kind='{self.kind}', tag='{self.tag}', usage_count={self.usage_count})>"
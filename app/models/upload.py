@@ -0,0 +1,26 @@
+"""
+Direct-to-storage upload model
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class DirectUpload(Base):
+    """An upload the client sends straight to object storage, processed once it reports completion"""
+    __tablename__ = "direct_uploads"
+
+    id = Column(String(36), primary_key=True)  # UUID, also the incoming object's name
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    target = Column(String(20), nullable=False)  # 'image', 'avatar', 'bake', 'recipe'
+    target_id = Column(Integer, nullable=True)  # bake or recipe the image is attached to
+    object_key = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, processing, completed, failed
+    result = Column(JSON, nullable=True)  # same shape as the /upload/image and /upload/avatar responses
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<DirectUpload(id='{self.id}', target='{self.target}', status='{self.status}')>"
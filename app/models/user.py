@@ -1,7 +1,7 @@
 """
 User model for the xFood platform
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -10,6 +10,9 @@ from app.db.database import Base
 class User(Base):
     """User model"""
     __tablename__ = "users"
+    __table_args__ = (
+        Index("idx_users_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
@@ -1,9 +1,10 @@
 """
 Bake schemas for request/response validation
 """
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field
+from app.schemas.tag import TagFacets
 
 
 class BakeBase(BaseModel):
@@ -58,6 +59,7 @@ class BakeInDB(BaseModel):
     title: str
     description: str
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, Dict[str, str]]] = None
     category: str
     tags: List[str]
     allergens: List[str]
@@ -69,8 +71,10 @@ class BakeInDB(BaseModel):
     circle_id: Optional[int] = None
     rating: float = 0.0
     review_count: int = 0
+    rating_histogram: List[int] = [0, 0, 0, 0, 0]  # review counts for one to five stars
     like_count: int = 0
     comment_count: int = 0
+    view_count: int = 0
     created_by: int
     created_at: datetime
     updated_at: Optional[datetime] = None
@@ -93,7 +97,8 @@ class BakeList(BaseModel):
     """Schema for bake list response"""
     id: int
     title: str
-    image_url: Optional[str] = None
+    # The thumbnail variant when the image has one
+    image_url: Optional[str] = Field(None, validation_alias=AliasChoices("thumbnail_url", "image_url"))
     category: str
     price_cents: int
     rating: float
@@ -127,3 +132,9 @@ class BakeSearch(BaseModel):
     radius: Optional[float] = Field(None, ge=0)  # in kilometers
     page: int = Field(1, ge=1)
     limit: int = Field(20, ge=1, le=100)
+
+
+class BakeSearchResults(BaseModel):
+    """Schema for a page of bakes with facet counts for the whole result set"""
+    items: List[BakeList]
+    facets: TagFacets
@@ -1,7 +1,7 @@
 """
 Like schemas for request/response validation
 """
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field
 
@@ -44,6 +44,12 @@ class LikeList(BaseModel):
         from_attributes = True
 
 
+class LikeCheck(BaseModel):
+    """Schema for batch like check response: the given ids the user has liked"""
+    bake_ids: List[int] = []
+    recipe_ids: List[int] = []
+
+
 class LikeSearch(BaseModel):
     """Schema for like search parameters"""
     recipe_id: Optional[int] = None
@@ -1,9 +1,10 @@
 """
 Recipe schemas for request/response validation
 """
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field
+from app.schemas.tag import TagFacets
 
 
 class RecipeBase(BaseModel):
@@ -48,8 +49,14 @@ class RecipeInDB(RecipeBase):
     """Schema for recipe in database"""
     id: int
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, Dict[str, str]]] = None
     rating: float = 0.0
     review_count: int = 0
+    rating_histogram: List[int] = [0, 0, 0, 0, 0]  # review counts for one to five stars
+    like_count: int = 0
+    comment_count: int = 0
+    favorite_count: int = 0
+    view_count: int = 0
     created_by: int
     created_at: datetime
     updated_at: Optional[datetime] = None
@@ -67,7 +74,8 @@ class RecipeList(BaseModel):
     """Schema for recipe list response"""
     id: int
     title: str
-    image_url: Optional[str] = None
+    # The thumbnail variant when the image has one
+    image_url: Optional[str] = Field(None, validation_alias=AliasChoices("thumbnail_url", "image_url"))
     category: str
     difficulty: str
     rating: float
@@ -90,3 +98,18 @@ class RecipeSearch(BaseModel):
     max_cook_time: Optional[int] = Field(None, ge=0)
     page: int = Field(1, ge=1)
     limit: int = Field(20, ge=1, le=100)
+
+
+class PantryMatch(BaseModel):
+    """Schema for a recipe matched against a pantry"""
+    recipe: RecipeList
+    matched_count: int
+    ingredient_count: int
+    coverage: float  # matched_count / ingredient_count
+    missing_ingredients: List[str] = []
+
+
+class RecipeSearchResults(BaseModel):
+    """Schema for a page of recipes with facet counts for the whole result set"""
+    items: List[RecipeList]
+    facets: TagFacets
@@ -0,0 +1,17 @@
+"""
+Tag schemas for facet and popularity responses
+"""
+from typing import List
+from pydantic import BaseModel
+
+
+class TagCount(BaseModel):
+    """Schema for a tag with its number of uses"""
+    value: str
+    count: int
+
+
+class TagFacets(BaseModel):
+    """Schema for tag and allergen counts over a result set"""
+    tags: List[TagCount] = []
+    allergens: List[TagCount] = []
@@ -0,0 +1,38 @@
+"""
+Upload schemas for direct-to-storage uploads
+"""
+from typing import Any, Dict, Literal, Optional
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+
+class DirectUploadCreate(BaseModel):
+    """Schema for requesting a presigned upload"""
+    target: Literal["image", "avatar", "bake", "recipe"] = "image"
+    target_id: Optional[int] = None  # required for 'bake' and 'recipe'
+    content_type: str
+    size: Optional[int] = Field(None, ge=1)  # checked up front when given; always checked on completion
+
+
+class DirectUploadTicket(BaseModel):
+    """Schema for a presigned upload: PUT the file to url with these headers, then call complete"""
+    upload_id: str
+    method: str = "PUT"
+    url: str
+    headers: Dict[str, str]
+    expires_in: int
+
+
+class DirectUpload(BaseModel):
+    """Schema for direct upload status"""
+    upload_id: str = Field(validation_alias="id")
+    target: str
+    target_id: Optional[int] = None
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
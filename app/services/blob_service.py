@@ -0,0 +1,198 @@
+"""
+Reference-counted, content-addressed image blobs and deduplication metrics
+"""
+from typing import Any, Dict, Optional
+from sqlalchemy import and_, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.image import ImageBlob, ImageReference, ImageSource
+
+
+class DedupeMetrics:
+    """Upload deduplication counters for this process"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Reset all counters"""
+        self.uploads = 0
+        self.source_hits = 0  # identical upload seen before: not processed at all
+        self.content_hits = 0  # processed, but the output was already stored
+        self.misses = 0
+        self.cpu_ms_saved = 0.0
+        self.bytes_saved = 0
+
+    def record_source_hit(self, blob: ImageBlob):
+        self.uploads += 1
+        self.source_hits += 1
+        self.cpu_ms_saved += blob.cpu_ms or 0.0
+        self.bytes_saved += blob.size_bytes or 0
+
+    def record_content_hit(self, size_bytes: int):
+        self.uploads += 1
+        self.content_hits += 1
+        self.bytes_saved += size_bytes
+
+    def record_miss(self):
+        self.uploads += 1
+        self.misses += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        deduplicated = self.source_hits + self.content_hits
+        return {
+            "uploads": self.uploads,
+            "source_hits": self.source_hits,
+            "content_hits": self.content_hits,
+            "misses": self.misses,
+            "dedupe_ratio": round(deduplicated / self.uploads, 4) if self.uploads else 0.0,
+            "cpu_ms_saved": round(self.cpu_ms_saved, 3),
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+dedupe_metrics = DedupeMetrics()
+
+
+def _blob_key(folder: str, content_hash: str):
+    return and_(ImageBlob.folder == folder, ImageBlob.content_hash == content_hash)
+
+
+async def find_source_blob(db: AsyncSession, folder: str, source_hash: str) -> Optional[ImageBlob]:
+    """Blob an identical upload was already processed into, if any"""
+    return await db.scalar(
+        select(ImageBlob)
+        .join(ImageSource, and_(ImageSource.folder == ImageBlob.folder, ImageSource.content_hash == ImageBlob.content_hash))
+        .where(ImageSource.folder == folder, ImageSource.source_hash == source_hash)
+    )
+
+
+def _reference_key(folder: str, content_hash: str, user_id: int):
+    return and_(ImageReference.folder == folder, ImageReference.content_hash == content_hash, ImageReference.user_id == user_id)
+
+
+async def _add_holder(db: AsyncSession, folder: str, content_hash: str, user_id: int) -> bool:
+    """Record a user's reference on a blob; False if they already hold one"""
+    holder = {"folder": folder, "content_hash": content_hash, "user_id": user_id}
+    dialect = db.bind.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        result = await db.execute(dialect_insert(ImageReference).values(**holder).on_conflict_do_nothing())
+        return result.rowcount > 0
+
+    if await db.scalar(select(ImageReference.user_id).where(_reference_key(folder, content_hash, user_id))) is not None:
+        return False
+    await db.execute(insert(ImageReference), [holder])
+    return True
+
+
+async def reuse_blob(db: AsyncSession, folder: str, content_hash: str, user_id: int) -> bool:
+    """Take a user's reference on a blob that is still stored; False if it has been released"""
+    if not await _add_holder(db, folder, content_hash, user_id):
+        # A held reference keeps the blob stored
+        return True
+    result = await db.execute(
+        update(ImageBlob)
+        .where(_blob_key(folder, content_hash), ImageBlob.ref_count > 0)
+        .values(ref_count=ImageBlob.ref_count + 1)
+    )
+    if result.rowcount == 0:
+        await db.execute(delete(ImageReference).where(_reference_key(folder, content_hash, user_id)))
+        return False
+    return True
+
+
+async def add_blob_reference(
+    db: AsyncSession,
+    folder: str,
+    content_hash: str,
+    source_hash: str,
+    user_id: int,
+    size_bytes: int = 0,
+    cpu_ms: float = 0.0
+) -> bool:
+    """Take a user's reference on a blob, creating it if needed
+
+    Returns True if the blob is new and its files must be stored. A user
+    holds at most one reference per blob, however often they upload it.
+    """
+    blob = {"folder": folder, "content_hash": content_hash, "ref_count": 1, "size_bytes": size_bytes, "cpu_ms": cpu_ms}
+    source = {"folder": folder, "source_hash": source_hash, "content_hash": content_hash}
+    holding = await _add_holder(db, folder, content_hash, user_id)
+    dialect = db.bind.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        await db.execute(dialect_insert(ImageSource).values(**source).on_conflict_do_nothing())
+        if not holding:
+            return False
+        ref_count = await db.scalar(
+            dialect_insert(ImageBlob).values(**blob)
+            .on_conflict_do_update(
+                index_elements=["folder", "content_hash"],
+                set_={"ref_count": ImageBlob.ref_count + 1}
+            )
+            .returning(ImageBlob.ref_count)
+        )
+        return ref_count == 1
+
+    # No portable upsert: update first, insert what was missing
+    if not await db.scalar(select(ImageSource.source_hash).where(ImageSource.folder == folder, ImageSource.source_hash == source_hash)):
+        await db.execute(insert(ImageSource), [source])
+    if not holding:
+        return False
+    result = await db.execute(update(ImageBlob).where(_blob_key(folder, content_hash)).values(ref_count=ImageBlob.ref_count + 1))
+    if result.rowcount == 0:
+        await db.execute(insert(ImageBlob), [blob])
+        return True
+    return False
+
+
+async def release_blob_reference(db: AsyncSession, folder: str, content_hash: str, user_id: int) -> Optional[bool]:
+    """Drop a user's reference on a blob
+
+    Returns None if the user holds no reference on it, so releasing twice
+    changes nothing; False while others still reference it; and True once
+    the last reference is gone and its rows have been deleted. The caller
+    then removes the files before committing so a concurrent upload of the
+    same image waits on the row lock.
+    """
+    removed = await db.execute(delete(ImageReference).where(_reference_key(folder, content_hash, user_id)))
+    if removed.rowcount == 0:
+        return None
+    await db.execute(
+        update(ImageBlob)
+        .where(_blob_key(folder, content_hash), ImageBlob.ref_count > 0)
+        .values(ref_count=ImageBlob.ref_count - 1)
+    )
+    if (await db.scalar(select(ImageBlob.ref_count).where(_blob_key(folder, content_hash))) or 0) > 0:
+        return False
+
+    await db.execute(delete(ImageSource).where(ImageSource.folder == folder, ImageSource.content_hash == content_hash))
+    await db.execute(delete(ImageBlob).where(_blob_key(folder, content_hash)))
+    return True
+
+
+async def get_blob_stats(db: AsyncSession) -> Dict[str, Any]:
+    """Stored versus referenced images per folder, plus this process's dedupe counters"""
+    rows = (await db.execute(
+        select(
+            ImageBlob.folder,
+            func.count(),
+            func.coalesce(func.sum(ImageBlob.ref_count), 0),
+            func.coalesce(func.sum(ImageBlob.size_bytes), 0),
+            func.coalesce(func.sum(ImageBlob.size_bytes * ImageBlob.ref_count), 0)
+        )
+        .group_by(ImageBlob.folder)
+    )).all()
+
+    storage = {}
+    for folder, blobs, references, stored_bytes, referenced_bytes in rows:
+        storage[folder] = {
+            "blobs": blobs,
+            "references": references,
+            "stored_bytes": stored_bytes,
+            "referenced_bytes": referenced_bytes,
+            # How many references each stored blob serves on average
+            "dedupe_factor": round(references / blobs, 4) if blobs else 0.0,
+        }
+    return {"storage": storage, "uploads": dedupe_metrics.snapshot()}
@@ -0,0 +1,322 @@
+"""
+Like, comment, favorite and view counters on bakes and recipes
+"""
+import asyncio
+import time
+import zlib
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+from fastapi import Request
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import case, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from app.core.cache import REDIS_RETRY_SECONDS, connect_redis
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.models.bake import Bake
+from app.models.recipe import Recipe
+from app.services.trending_service import rescore_bake
+
+COUNTED_MODELS = {"bake": Bake, "recipe": Recipe}
+
+# Every counter column of each item type
+COUNTERS = {
+    "bake": ("like_count", "comment_count", "view_count"),
+    "recipe": ("like_count", "comment_count", "favorite_count", "view_count"),
+}
+
+# Counters that feed a bake's trending score
+TRENDING_COUNTERS = ("like_count", "comment_count")
+
+# Buffered deltas by item type and id, then by counter column
+ItemKey = Tuple[str, int]
+Deltas = Dict[ItemKey, Dict[str, int]]
+
+
+def _deltas() -> Deltas:
+    return defaultdict(lambda: defaultdict(int))
+
+
+def _field(item_type: str, item_id: int, counter: str) -> str:
+    return f"{item_type}:{item_id}:{counter}"
+
+
+def _parse_field(field: bytes) -> Tuple[ItemKey, str]:
+    item_type, item_id, counter = field.decode().split(":")
+    return (item_type, int(item_id)), counter
+
+
+def _shard_key(item_type: str, item_id: int) -> str:
+    shard = zlib.crc32(f"{item_type}:{item_id}".encode()) % settings.COUNTER_REDIS_SHARDS
+    return f"counter:pending:{shard}"
+
+
+class CounterBuffer:
+    """Write-behind counts, summed in memory or Redis and flushed in batches
+
+    A like on a popular bake would otherwise be an UPDATE of the same row
+    as every other like on it, each waiting for the last one's row lock.
+    Here an event only adds to a pending delta, and every
+    COUNTER_FLUSH_INTERVAL seconds the deltas are written with one UPDATE
+    per item. Views are always counted this way; likes, comments and
+    favorites too when COUNTER_WRITE_BEHIND is set.
+
+    Deltas are kept in this process, or with COUNTER_REDIS_URL in Redis
+    hashes spread over COUNTER_REDIS_SHARDS keys, where every process adds
+    to and flushes the same counts. Reads add the pending deltas to the
+    stored value with overlay(). Deltas buffered in memory, or taken from
+    Redis by a flush that dies before committing, are lost with the
+    process; a Redis failure falls back to the in-process buffer.
+    """
+
+    def __init__(self):
+        self._pending: Deltas = _deltas()
+        # Deltas taken by a flush that has not committed yet; still added to reads
+        self._flushing: Deltas = {}
+        self._client: Optional[Redis] = None
+        self._redis_retry_at = 0.0
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.reset()
+
+    def reset(self):
+        """Reset all counters"""
+        self.events = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.errors = 0
+        self.last_flush_ms = 0.0
+
+    def _redis(self) -> Optional[Redis]:
+        if not settings.COUNTER_REDIS_URL or time.monotonic() < self._redis_retry_at:
+            return None
+        if self._client is None:
+            self._client = connect_redis(settings.COUNTER_REDIS_URL)
+        return self._client
+
+    def _redis_failed(self, error: RedisError):
+        self.errors += 1
+        if time.monotonic() >= self._redis_retry_at:
+            print(f"⚠️ Counter Redis unavailable, buffering in process: {error}")
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+
+    async def add(self, item_type: str, item_id: int, counter: str, delta: int = 1) -> None:
+        """Buffer a change to an item's counter"""
+        self.events += 1
+        client = self._redis()
+        if client is not None:
+            try:
+                await client.hincrby(_shard_key(item_type, item_id), _field(item_type, item_id, counter), delta)
+                return
+            except RedisError as e:
+                self._redis_failed(e)
+        self._pending[(item_type, item_id)][counter] += delta
+
+    async def pending(self, item_type: str, item_ids: Sequence[int]) -> Dict[int, Dict[str, int]]:
+        """Deltas not yet written for these items, by item id and counter"""
+        deltas: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        wanted = set(item_ids)
+        for buffered in (self._pending, self._flushing):
+            for item_id in wanted:
+                for counter, delta in buffered.get((item_type, item_id), {}).items():
+                    deltas[item_id][counter] += delta
+
+        client = self._redis()
+        if client is not None and wanted:
+            counters = COUNTERS[item_type]
+            ordered = list(wanted)
+            try:
+                async with client.pipeline(transaction=False) as pipe:
+                    for item_id in ordered:
+                        pipe.hmget(_shard_key(item_type, item_id), [_field(item_type, item_id, counter) for counter in counters])
+                    results = await pipe.execute()
+            except RedisError as e:
+                self._redis_failed(e)
+            else:
+                for item_id, values in zip(ordered, results):
+                    for counter, delta in zip(counters, values):
+                        if delta is not None:
+                            deltas[item_id][counter] += int(delta)
+        return deltas
+
+    async def overlay(self, item_type: str, items: Sequence[Any]) -> None:
+        """Add pending deltas to loaded items, without marking them as changed"""
+        if not items:
+            return
+        deltas = await self.pending(item_type, [item.id for item in items])
+        for item in items:
+            for counter, delta in deltas.get(item.id, {}).items():
+                set_committed_value(item, counter, max((getattr(item, counter) or 0) + delta, 0))
+
+    async def _take(self) -> Deltas:
+        """Remove every buffered delta, from this process and Redis"""
+        taken, self._pending = self._pending, _deltas()
+
+        client = self._redis()
+        if client is not None:
+            try:
+                # Read and delete each shard in one transaction, so an increment lands either in this flush or the next
+                async with client.pipeline(transaction=True) as pipe:
+                    for shard in range(settings.COUNTER_REDIS_SHARDS):
+                        pipe.hgetall(f"counter:pending:{shard}")
+                        pipe.delete(f"counter:pending:{shard}")
+                    results = await pipe.execute()
+            except RedisError as e:
+                self._redis_failed(e)
+            else:
+                for shard in results[::2]:
+                    for field, delta in shard.items():
+                        key, counter = _parse_field(field)
+                        taken[key][counter] += int(delta)
+        return {
+            key: {counter: delta for counter, delta in counters.items() if delta}
+            for key, counters in taken.items()
+            if any(counters.values())
+        }
+
+    async def flush(self) -> int:
+        """Write buffered deltas to the database; returns the number of rows updated"""
+        async with self._flush_lock:
+            self._flushing = await self._take()
+            if not self._flushing:
+                return 0
+
+            started = time.perf_counter()
+            rows = 0
+            try:
+                async with AsyncSessionLocal() as db:
+                    for (item_type, item_id), deltas in self._flushing.items():
+                        model = COUNTED_MODELS[item_type]
+                        values = {}
+                        for counter, delta in deltas.items():
+                            column = getattr(model, counter)
+                            # Flushed unlikes can outnumber the stored likes; counts stop at zero
+                            values[counter] = case((column + delta < 0, 0), else_=column + delta)
+                        statement = update(model).where(model.id == item_id).values(values).execution_options(synchronize_session=False)
+                        if model is Bake and any(counter in TRENDING_COUNTERS for counter in deltas):
+                            row = (await db.execute(statement.returning(
+                                Bake.id, Bake.like_count, Bake.comment_count, Bake.review_count, Bake.created_at
+                            ))).one_or_none()
+                            if row is not None:
+                                await rescore_bake(db, row)
+                                rows += 1
+                        else:
+                            rows += (await db.execute(statement)).rowcount
+                    await db.commit()
+            except Exception as e:
+                # Put the deltas back for the next flush rather than drop them
+                self.errors += 1
+                print(f"⚠️ Counter flush failed, will retry: {e}")
+                for key, deltas in self._flushing.items():
+                    for counter, delta in deltas.items():
+                        self._pending[key][counter] += delta
+                return 0
+            finally:
+                self._flushing = {}
+
+            self.flushes += 1
+            self.rows_flushed += rows
+            self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+            return rows
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.COUNTER_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ Counter flush failed: {e}")
+
+    def start(self):
+        """Start flushing in the background on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background flush, write what is left and close Redis"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return flush counters and the number of items with buffered deltas in this process"""
+        return {
+            "write_behind": settings.COUNTER_WRITE_BEHIND,
+            "redis_tier": bool(settings.COUNTER_REDIS_URL),
+            "flush_interval": settings.COUNTER_FLUSH_INTERVAL,
+            "pending_items_in_process": len(self._pending),
+            "events": self.events,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "last_flush_ms": self.last_flush_ms,
+            "errors": self.errors,
+        }
+
+
+# Global counter buffer instance
+counter_buffer = CounterBuffer()
+
+
+async def adjust_counter(db: AsyncSession, item_type: str, item_id: int, counter: str, delta: int) -> Optional[int]:
+    """Add delta to an item's counter and return the new value; the caller commits
+
+    Returns None when nothing changed: the item does not exist, or the
+    counter was already zero. A decrement never takes a counter below zero.
+    With COUNTER_WRITE_BEHIND the change is buffered in counter_buffer;
+    otherwise it is made by one UPDATE, where the arithmetic happens in the
+    database so concurrent requests cannot overwrite each other's counts.
+    """
+    model = COUNTED_MODELS[item_type]
+    column = getattr(model, counter)
+
+    if settings.COUNTER_WRITE_BEHIND:
+        row = (await db.execute(select(model.id, column).where(model.id == item_id))).one_or_none()
+        if row is None:
+            return None
+        pending = (await counter_buffer.pending(item_type, [item_id])).get(item_id, {}).get(counter, 0)
+        value = (row[1] or 0) + pending + delta
+        if value < 0:
+            return None
+        await counter_buffer.add(item_type, item_id, counter, delta)
+        return value
+
+    statement = update(model).where(model.id == item_id).values({counter: column + delta})
+    if delta < 0:
+        statement = statement.where(column >= -delta)
+
+    if model is not Bake:
+        return await db.scalar(statement.returning(column))
+
+    # A bake's trending score follows its counters; rescore it from the values just written
+    row = (await db.execute(
+        statement.returning(Bake.id, Bake.like_count, Bake.comment_count, Bake.review_count, Bake.created_at)
+    )).one_or_none()
+    if row is None:
+        return None
+    await rescore_bake(db, row)
+    return getattr(row, counter)
+
+
+def count_view(item_type: str, path_param: str) -> Callable[[Request], Awaitable[None]]:
+    """Hook for cache_response(on_success=...) counting a view of the item named by a path parameter
+
+    Only runs once the item has been served, so requests for ids that do
+    not exist never reach the buffer.
+    """
+    async def record(request: Request) -> None:
+        try:
+            item_id = int(request.path_params[path_param])
+        except (KeyError, ValueError):
+            return
+        await counter_buffer.add(item_type, item_id, "view_count", 1)
+    return record
@@ -0,0 +1,131 @@
+"""
+Processing for presigned direct-to-storage uploads
+"""
+import asyncio
+from typing import Any, Dict, Optional
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
+from PIL import UnidentifiedImageError
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import item_tags, response_cache
+from app.core.config import settings
+from app.core.user_cache import user_cache
+from app.db.database import AsyncSessionLocal
+from app.models.bake import Bake
+from app.models.recipe import Recipe
+from app.models.upload import DirectUpload
+from app.models.user import User
+from app.services.image_service import (
+    AVATAR_MAX_FILE_SIZE, avatar_filename, image_variants, remove_file, square_image,
+    variant_filename, variant_urls
+)
+from app.services.storage_service import base_url, delete_object, set_user_avatar, spool_object, store_image
+
+# Models an uploaded image can be attached to
+ATTACHABLE_MODELS = {"bake": Bake, "recipe": Recipe}
+
+
+def max_upload_size(target: str) -> int:
+    """Largest file accepted for an upload target"""
+    return AVATAR_MAX_FILE_SIZE if target == "avatar" else settings.MAX_FILE_SIZE
+
+
+def image_upload_result(content_hash: str, size: int) -> Dict[str, Any]:
+    """Response body describing a stored image and its variants"""
+    images_url = base_url("images")
+    filename = variant_filename(content_hash, "full", "jpeg")
+    return {
+        "filename": filename,
+        "url": f"{images_url}{filename}",
+        "size": size,
+        "content_type": "image/jpeg",
+        "variants": variant_urls(images_url, content_hash)
+    }
+
+
+async def _load_target(db: AsyncSession, upload: DirectUpload) -> Optional[Any]:
+    """The user or item the upload will be attached to"""
+    if upload.target == "avatar":
+        return await db.get(User, upload.user_id)
+    model = ATTACHABLE_MODELS.get(upload.target)
+    if model is None:
+        return None
+    return await db.scalar(select(model).where(model.id == upload.target_id))
+
+
+async def _store_and_attach(db: AsyncSession, upload: DirectUpload) -> Dict[str, Any]:
+    """Run the resize pipeline on an uploaded object and attach the result to its target"""
+    target = await _load_target(db, upload)
+    if upload.target != "image" and target is None:
+        raise ValueError(f"{upload.target.capitalize()} not found")
+
+    folder, transform = ("avatars", square_image) if upload.target == "avatar" else ("images", image_variants)
+    source_path, source_hash = await asyncio.to_thread(spool_object, upload.object_key, max_upload_size(upload.target))
+    try:
+        content_hash, size = await store_image(db, transform, source_path, source_hash, folder, upload.user_id)
+    finally:
+        remove_file(source_path)
+
+    if upload.target == "avatar":
+        file_url = await set_user_avatar(db, target, content_hash)
+        return {"filename": avatar_filename(content_hash), "url": file_url, "size": size, "content_type": "image/jpeg"}
+
+    result = image_upload_result(content_hash, size)
+    if target is not None:
+        target.image_url = result["url"]
+        target.image_variants = result["variants"]
+    return result
+
+
+async def process_direct_upload(upload_id: str) -> None:
+    """Process an upload the client reported complete
+
+    Runs outside the request with its own session. The pending -> processing
+    transition is a conditional UPDATE, so a repeated completion call cannot
+    process the same upload twice. The incoming object is always deleted:
+    the stored variants replace it, and a failed upload must be retried
+    with a new presigned URL.
+    """
+    async with AsyncSessionLocal() as db:
+        claimed = await db.execute(
+            update(DirectUpload)
+            .where(DirectUpload.id == upload_id, DirectUpload.status == "pending")
+            .values(status="processing")
+        )
+        await db.commit()
+        if claimed.rowcount == 0:
+            return
+
+        upload = await db.get(DirectUpload, upload_id)
+        object_key = upload.object_key
+        try:
+            upload.result = await _store_and_attach(db, upload)
+            upload.status = "completed"
+            await db.commit()
+            if upload.target in ATTACHABLE_MODELS:
+                await response_cache.invalidate(*item_tags(upload.target, upload.target_id))
+            elif upload.target == "avatar":
+                await user_cache.invalidate(upload.user_id)
+        except Exception as e:
+            await db.rollback()
+            if isinstance(e, HTTPException):
+                error = e.detail
+            elif isinstance(e, ClientError):
+                error = "Uploaded file not found"
+            elif isinstance(e, UnidentifiedImageError):
+                error = "Invalid image file"
+            else:
+                error = str(e) or type(e).__name__
+            await db.execute(
+                update(DirectUpload)
+                .where(DirectUpload.id == upload_id)
+                .values(status="failed", error=error)
+            )
+            await db.commit()
+        finally:
+            try:
+                await delete_object(object_key)
+            except ClientError as e:
+                # A bucket lifecycle rule on DIRECT_UPLOAD_PREFIX expires it eventually
+                print(f"Could not delete incoming upload {object_key}: {e}")
@@ -0,0 +1,375 @@
+"""
+Image processing for uploads, run in a bounded process pool
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, List, NamedTuple, Optional, Tuple
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image
+from app.core.config import settings
+
+AVATAR_SIZE = (400, 400)
+AVATAR_MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+# Bounding boxes of the variants generated for each uploaded image, largest first
+IMAGE_VARIANTS = {
+    "full": (1920, 1080),
+    "card": (800, 800),
+    "thumb": (320, 320),
+}
+IMAGE_FORMATS = {"jpeg": "jpg", "webp": "webp"}
+CONTENT_TYPES = {"jpg": "image/jpeg", "webp": "image/webp"}
+
+_VARIANT_URL = re.compile(
+    rf"^(?P<base>.*/)(?P<stem>[\w-]+)_(?:{'|'.join(IMAGE_VARIANTS)})\.(?:{'|'.join(IMAGE_FORMATS.values())})$"
+)
+_CONTENT_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+# Placeholder name for transform output until its content hash is known
+PENDING_STEM = "pending"
+
+# Read size when spooling an upload to disk
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# Upper bounds (in milliseconds) of the transform time histogram buckets
+TRANSFORM_TIME_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+def variant_filename(stem: str, variant: str, image_format: str) -> str:
+    """File name of one stored variant: "<stem>_thumb.webp" """
+    return f"{stem}_{variant}.{IMAGE_FORMATS[image_format]}"
+
+
+def variant_urls(base_url: str, stem: str) -> Dict[str, Dict[str, str]]:
+    """URLs of every variant of an image, as stored in image_variants columns"""
+    return {
+        variant: {image_format: f"{base_url}{variant_filename(stem, variant, image_format)}" for image_format in IMAGE_FORMATS}
+        for variant in IMAGE_VARIANTS
+    }
+
+
+def variants_for_url(image_url: Optional[str]) -> Optional[Dict[str, Dict[str, str]]]:
+    """Variant URLs for an image_url returned by /upload/image, else None"""
+    match = _VARIANT_URL.match(image_url or "")
+    if not match:
+        return None
+    return variant_urls(match.group("base"), match.group("stem"))
+
+
+def avatar_filename(content_hash: str) -> str:
+    """File name of a stored avatar"""
+    return f"{content_hash}.jpg"
+
+
+def blob_filenames(folder: str, content_hash: str) -> List[str]:
+    """Every stored file of a content-addressed image"""
+    if folder == "avatars":
+        return [avatar_filename(content_hash)]
+    return [variant_filename(content_hash, variant, image_format) for variant in IMAGE_VARIANTS for image_format in IMAGE_FORMATS]
+
+
+def content_hash_for_filename(folder: str, filename: str) -> Optional[str]:
+    """Content hash of a stored file name, or None for files that predate content addressing"""
+    if folder == "avatars":
+        stem = filename[:-len(".jpg")] if filename.endswith(".jpg") else ""
+    else:
+        match = _VARIANT_URL.match(f"/{filename}")
+        stem = match.group("stem") if match else ""
+    return stem if _CONTENT_HASH.match(stem) else None
+
+
+def variant_filenames(filename: str) -> List[str]:
+    """Every stored file of the image that filename belongs to"""
+    variants = variants_for_url(f"/{filename}")
+    if not variants:
+        return [filename]
+    return [url[1:] for formats in variants.values() for url in formats.values()]
+
+
+class TransformResult(NamedTuple):
+    """Output of an image transform, named by the hash of its normalized output"""
+    content_hash: str
+    files: Dict[str, int]  # file name -> size in bytes
+    cpu_ms: float
+
+
+def _rgb(image: Image.Image) -> Image.Image:
+    return image if image.mode in ("RGB", "L") else image.convert("RGB")
+
+
+def _save(image: Image.Image, dest_dir: str, filename: str, image_format: str) -> Tuple[str, int]:
+    """Encode an image into dest_dir and return (filename, size in bytes)"""
+    path = os.path.join(dest_dir, filename)
+    if image_format == "webp":
+        image.save(path, format="WEBP", quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(path, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return filename, os.path.getsize(path)
+
+
+def _content_addressed(dest_dir: str, written: Dict[str, int], key_filename: str, started: float) -> TransformResult:
+    """Rename transform output after the SHA-256 of its key file"""
+    content_hash = hashlib.sha256()
+    with open(os.path.join(dest_dir, key_filename), "rb") as key_file:
+        while chunk := key_file.read(SPOOL_CHUNK_SIZE):
+            content_hash.update(chunk)
+    content_hash = content_hash.hexdigest()
+
+    files = {}
+    for filename, size in written.items():
+        final = filename.replace(PENDING_STEM, content_hash, 1)
+        os.replace(os.path.join(dest_dir, filename), os.path.join(dest_dir, final))
+        files[final] = size
+    return TransformResult(content_hash, files, (time.process_time() - started) * 1000)
+
+
+def image_variants(source_path: str, dest_dir: str) -> TransformResult:
+    """Write every size and format of an uploaded image to dest_dir
+
+    Files are named after the hash of the full-size JPEG, so identical
+    pictures map to the same stored files.
+    """
+    started = time.process_time()
+    written = {}
+    with Image.open(source_path) as image:
+        # For JPEGs, decode straight at the smallest DCT scale that still
+        # covers the largest variant instead of decoding full resolution
+        image.draft("RGB", IMAGE_VARIANTS["full"])
+        image = _rgb(image)
+        # Each variant is downscaled from the previous, larger one
+        for variant, size in IMAGE_VARIANTS.items():
+            image.thumbnail(size, Image.Resampling.LANCZOS)
+            for image_format in IMAGE_FORMATS:
+                filename, file_size = _save(image, dest_dir, variant_filename(PENDING_STEM, variant, image_format), image_format)
+                written[filename] = file_size
+    return _content_addressed(dest_dir, written, variant_filename(PENDING_STEM, "full", "jpeg"), started)
+
+
+def square_image(source_path: str, dest_dir: str) -> TransformResult:
+    """Resize an image to a fixed square JPEG in dest_dir, named by its hash"""
+    started = time.process_time()
+    with Image.open(source_path) as image:
+        image.draft("RGB", AVATAR_SIZE)
+        image = _rgb(image.resize(AVATAR_SIZE, Image.Resampling.LANCZOS, reducing_gap=3.0))
+        filename, file_size = _save(image, dest_dir, avatar_filename(PENDING_STEM), "jpeg")
+    return _content_addressed(dest_dir, {filename: file_size}, filename, started)
+
+
+def _copy_limited(source: BinaryIO, destination: BinaryIO, max_size: int) -> str:
+    """Copy source to destination in chunks, stopping once max_size is exceeded
+
+    Returns the SHA-256 of the copied bytes.
+    """
+    size = 0
+    source_hash = hashlib.sha256()
+    while chunk := source.read(SPOOL_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_size:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File too large. Maximum size is {max_size // 1024 // 1024}MB"
+            )
+        source_hash.update(chunk)
+        destination.write(chunk)
+    return source_hash.hexdigest()
+
+
+def spool_stream(source: BinaryIO, max_size: int) -> Tuple[str, str]:
+    """Copy a readable stream to a named temporary file, enforcing max_size as it streams
+
+    Returns the path and the SHA-256 of the copied bytes; the caller removes
+    the file when done. Blocking, so run it in a thread.
+    """
+    fd, path = tempfile.mkstemp(prefix="upload_", dir=settings.UPLOAD_TMP_DIR or None)
+    try:
+        with os.fdopen(fd, "wb") as destination:
+            source_hash = _copy_limited(source, destination, max_size)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, source_hash
+
+
+async def spool_upload(file: UploadFile, max_size: int) -> Tuple[str, str]:
+    """Copy an upload to a named temporary file, enforcing max_size as it streams
+
+    file.size is not always known up front, so the limit is checked per
+    chunk. Returns the path and the SHA-256 of the raw upload; the caller
+    removes the file when done.
+    """
+    await file.seek(0)
+    return await asyncio.to_thread(spool_stream, file.file, max_size)
+
+
+def temporary_dir() -> str:
+    """Create a temporary directory for transform output"""
+    return tempfile.mkdtemp(prefix="image_", dir=settings.UPLOAD_TMP_DIR or None)
+
+
+def remove_file(path: Optional[str]) -> None:
+    """Delete a file if it exists"""
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+class ImagePipeline:
+    """Runs CPU-bound image transforms in worker processes
+
+    Pillow holds the event loop for hundreds of milliseconds on a large photo,
+    so transforms are handed to a process pool and awaited. At most
+    ``workers * max_pending`` transforms are admitted at once; further uploads
+    wait for a slot and are turned away with a 503 after ``queue_timeout``
+    seconds, so a burst cannot queue unbounded work and memory.
+    """
+
+    def __init__(self, workers: int, max_pending: int, queue_timeout: float):
+        self.workers = workers
+        self.capacity = workers * max_pending
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_process = False
+        self._slots = asyncio.Semaphore(self.capacity)
+        self.waiting = 0
+        self.in_flight = 0
+        self.reset()
+
+    def reset(self):
+        """Reset all counters (live queue depth is kept)"""
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.peak_depth = 0
+        self.queue_wait_sum_ms = 0.0
+        self.queue_wait_max_ms = 0.0
+        self.transform_sum_ms = 0.0
+        self.transform_max_ms = 0.0
+        self.transform_histogram = [0] * (len(TRANSFORM_TIME_BUCKETS_MS) + 1)
+
+    @property
+    def depth(self) -> int:
+        """Transforms admitted or waiting for admission"""
+        return self.waiting + self.in_flight
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Forking a process that already runs an event loop and threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def run_in_process(self):
+        """Run transforms on threads of this process instead of a pool of worker processes
+
+        For processes that are already workers, such as Celery's prefork
+        children, which may not start processes of their own.
+        """
+        self.shutdown()
+        self._in_process = True
+
+    def _record_transform(self, transform_ms: float):
+        self.completed += 1
+        self.transform_sum_ms += transform_ms
+        self.transform_max_ms = max(self.transform_max_ms, transform_ms)
+        for index, bound in enumerate(TRANSFORM_TIME_BUCKETS_MS):
+            if transform_ms <= bound:
+                self.transform_histogram[index] += 1
+                break
+        else:
+            self.transform_histogram[-1] += 1
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run func(*args) in a worker process without blocking the event loop"""
+        self.waiting += 1
+        self.peak_depth = max(self.peak_depth, self.depth)
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await self._slots.acquire()
+        except TimeoutError:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Image processing is busy, please retry shortly",
+                headers={"Retry-After": "5"}
+            )
+        finally:
+            self.waiting -= 1
+
+        admitted = time.perf_counter()
+        wait_ms = (admitted - started) * 1000
+        self.queue_wait_sum_ms += wait_ms
+        self.queue_wait_max_ms = max(self.queue_wait_max_ms, wait_ms)
+        self.in_flight += 1
+        try:
+            executor = None if self._in_process else self._get_executor()
+            result = await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+        self._record_transform((time.perf_counter() - admitted) * 1000)
+        return result
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def snapshot(self) -> Dict:
+        """Return the live queue depth together with the collected metrics"""
+        labels: List[str] = [f"le_{bound}ms" for bound in TRANSFORM_TIME_BUCKETS_MS] + ["le_inf"]
+        cumulative = 0
+        histogram = {}
+        for label, count in zip(labels, self.transform_histogram):
+            cumulative += count
+            histogram[label] = cumulative
+
+        admitted = self.completed + self.failed
+        return {
+            "queue": {
+                "depth": self.depth,
+                "waiting": self.waiting,
+                "in_flight": self.in_flight,
+                "capacity": self.capacity,
+                "workers": self.workers,
+                "in_process": self._in_process,
+                "peak_depth": self.peak_depth,
+            },
+            "events": {
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            },
+            "queue_wait_ms": {
+                "avg": round(self.queue_wait_sum_ms / admitted, 3) if admitted else 0.0,
+                "max": round(self.queue_wait_max_ms, 3),
+            },
+            "transform_time_ms": {
+                "count": self.completed,
+                "sum": round(self.transform_sum_ms, 3),
+                "avg": round(self.transform_sum_ms / self.completed, 3) if self.completed else 0.0,
+                "max": round(self.transform_max_ms, 3),
+                "histogram": histogram,
+            },
+        }
+
+
+image_pipeline = ImagePipeline(
+    workers=settings.IMAGE_WORKERS,
+    max_pending=settings.IMAGE_MAX_PENDING,
+    queue_timeout=settings.IMAGE_QUEUE_TIMEOUT
+)
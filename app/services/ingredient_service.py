@@ -0,0 +1,200 @@
+"""
+Ingredient normalization and the recipe ingredient index
+"""
+import re
+import unicodedata
+from typing import Iterable, List, Optional
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.recipe import Recipe, RecipeIngredient
+
+# Longest normalized ingredient name stored in the index
+MAX_INGREDIENT_LENGTH = 100
+
+# Ingredients every kitchen is assumed to have. They are left out of the
+# index (they would be its longest posting lists) and out of coverage.
+PANTRY_STAPLES = frozenset({"water", "salt"})
+
+UNITS = frozenset({
+    "cup", "c", "tablespoon", "tbsp", "tbs", "tbl", "teaspoon", "tsp",
+    "gram", "g", "kilogram", "kg", "milligram", "mg", "ounce", "oz", "pound", "lb",
+    "milliliter", "millilitre", "ml", "liter", "litre", "l", "deciliter", "dl",
+    "pint", "pt", "quart", "qt", "gallon", "gal", "fluid", "fl",
+    "pinch", "dash", "handful", "sprinkle", "drop", "splash",
+    "stick", "can", "tin", "jar", "packet", "package", "pkg", "bag", "box", "bottle",
+    "slice", "piece", "clove", "sprig", "bunch", "head", "knob", "sheet", "envelope",
+})
+
+QUANTITY_WORDS = frozenset({
+    "a", "an", "one", "two", "three", "four", "five", "six", "seven", "eight",
+    "nine", "ten", "dozen", "half", "quarter", "couple", "few", "several", "some",
+    "x", "about", "approximately", "approx", "roughly", "heaped", "heaping",
+    "level", "scant", "generous", "rounded",
+})
+
+# Words describing size, state or preparation rather than the ingredient
+DESCRIPTORS = frozenset({
+    "fresh", "freshly", "ripe", "overripe", "large", "medium", "small", "big", "extra",
+    "chopped", "diced", "minced", "sliced", "grated", "shredded", "crushed", "ground",
+    "melted", "softened", "cold", "warm", "hot", "chilled", "frozen", "thawed",
+    "room", "temperature", "beaten", "whisked", "sifted", "packed", "lightly", "firmly",
+    "finely", "roughly", "coarsely", "thinly", "peeled", "pitted", "halved", "cubed",
+    "unsalted", "salted", "organic", "optional", "divided", "plus", "more",
+    "and", "of", "the", "good", "quality", "pure", "whole",
+})
+
+# Canonical names, applied after singularization
+SYNONYMS = {
+    "all purpose flour": "flour",
+    "allpurpose flour": "flour",
+    "ap flour": "flour",
+    "plain flour": "flour",
+    "white flour": "flour",
+    "wheat flour": "flour",
+    "caster sugar": "sugar",
+    "castor sugar": "sugar",
+    "granulated sugar": "sugar",
+    "white sugar": "sugar",
+    "superfine sugar": "sugar",
+    "icing sugar": "powdered sugar",
+    "confectioner sugar": "powdered sugar",
+    "confectioners sugar": "powdered sugar",
+    "bicarbonate soda": "baking soda",
+    "bicarb soda": "baking soda",
+    "bicarb": "baking soda",
+    "sodium bicarbonate": "baking soda",
+    "egg yolk": "egg",
+    "egg white": "egg",
+    "double cream": "heavy cream",
+    "heavy whipping cream": "heavy cream",
+    "whipping cream": "heavy cream",
+    "single cream": "light cream",
+    "cornflour": "cornstarch",
+    "corn flour": "cornstarch",
+    "corn starch": "cornstarch",
+    "whole milk": "milk",
+    "skim milk": "milk",
+    "semi skimmed milk": "milk",
+    "vanilla extract": "vanilla",
+    "vanilla essence": "vanilla",
+    "vanilla bean": "vanilla",
+    "vanilla pod": "vanilla",
+    "dry yeast": "yeast",
+    "active dry yeast": "yeast",
+    "instant yeast": "yeast",
+    "fast action yeast": "yeast",
+    "kosher salt": "salt",
+    "sea salt": "salt",
+    "table salt": "salt",
+    "black pepper": "pepper",
+    "scallion": "green onion",
+    "spring onion": "green onion",
+    "courgette": "zucchini",
+    "aubergine": "eggplant",
+}
+
+# Words whose trailing "s" is not a plural
+SINGULAR_EXCEPTIONS = frozenset({
+    "molasses", "couscous", "hummus", "asparagus", "citrus", "swiss", "grits",
+    "oats", "brussels", "cress", "bass", "glass", "schnapps", "watercress",
+})
+
+IRREGULAR_PLURALS = {
+    "leaves": "leaf",
+    "loaves": "loaf",
+    "halves": "half",
+    "knives": "knife",
+    "potatoes": "potato",
+    "tomatoes": "tomato",
+    "mangoes": "mango",
+    "cherries": "cherry",
+    "berries": "berry",
+}
+
+_PARENTHETICAL = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+_TRAILING_NOTE = re.compile(r"\b(?:for|or|to taste|such as|if needed)\b")
+_NUMBER = re.compile(r"^[\d./]+$")
+_TOKEN = re.compile(r"[a-z0-9./]+")
+
+
+def singularize(word: str) -> str:
+    """Reduce an English plural to its singular form"""
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if len(word) <= 3 or word in SINGULAR_EXCEPTIONS or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes", "zes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_ingredient(text: str) -> Optional[str]:
+    """Normalize a free-text ingredient line to a canonical ingredient name
+
+    "2 1/2 cups all-purpose flour, sifted" -> "flour"
+    "3 large Eggs (room temperature)"      -> "egg"
+    """
+    # Fold accents and unicode fractions ("½" -> "1⁄2") to plain ASCII
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    text = _PARENTHETICAL.sub(" ", text)
+    # Preparation notes and alternatives follow the ingredient ("butter, softened",
+    # "butter for greasing", "honey or maple syrup")
+    text = _TRAILING_NOTE.split(text.split(",", 1)[0], 1)[0]
+
+    words = []
+    for token in _TOKEN.findall(text.replace("-", " ")):
+        # Split glued quantities such as "200g" or "2tbsp"
+        match = re.match(r"^([\d./]+)([a-z]+)$", token)
+        if match:
+            token = match.group(2)
+        token = token.strip(".")
+        if not token or _NUMBER.match(token):
+            continue
+        word = singularize(token)
+        if word in UNITS or word in QUANTITY_WORDS or word in DESCRIPTORS:
+            continue
+        words.append(word)
+
+    if not words:
+        return None
+
+    name = " ".join(words)
+    name = SYNONYMS.get(name, name)
+    return name[:MAX_INGREDIENT_LENGTH]
+
+
+def normalize_ingredients(lines: Iterable[str]) -> List[str]:
+    """Normalize ingredient lines into a sorted list of unique names"""
+    names = {normalize_ingredient(line) for line in lines if line}
+    names.discard(None)
+    return sorted(names)
+
+
+def indexed_ingredients(lines: Iterable[str]) -> List[str]:
+    """Normalized ingredient names that go into the index (staples excluded)"""
+    return [name for name in normalize_ingredients(lines) if name not in PANTRY_STAPLES]
+
+
+async def index_recipe_ingredients(db: AsyncSession, recipe: Recipe) -> None:
+    """Replace a recipe's entries in the ingredient index
+
+    The recipe must have been flushed so that it has an id. Also updates
+    recipe.ingredient_count, the denominator for pantry coverage.
+    """
+    names = indexed_ingredients(recipe.ingredients or [])
+    await db.execute(delete(RecipeIngredient).where(RecipeIngredient.recipe_id == recipe.id))
+    if names:
+        await db.execute(
+            insert(RecipeIngredient),
+            [{"recipe_id": recipe.id, "ingredient": name} for name in names]
+        )
+    recipe.ingredient_count = len(names)
+
+
+async def unindex_recipe_ingredients(db: AsyncSession, recipe_id: int) -> None:
+    """Remove a recipe from the ingredient index"""
+    await db.execute(delete(RecipeIngredient).where(RecipeIngredient.recipe_id == recipe_id))
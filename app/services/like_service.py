@@ -0,0 +1,86 @@
+"""
+Likes on bakes and recipes, one per user and item
+"""
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.like import Like
+from app.services.counter_service import adjust_counter
+
+LIKE_COLUMNS = {"bake": Like.bake_id, "recipe": Like.recipe_id}
+
+
+def _not_found(item_type: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"{item_type.capitalize()} not found"
+    )
+
+
+async def like_item(db: AsyncSession, user_id: int, item_type: str, item_id: int) -> Optional[Like]:
+    """Like an item and count it; returns the new like, or None if the user had already liked it
+
+    The insert relies on the unique (user_id, item) index rather than a
+    prior SELECT, so concurrent likes by the same user cannot both land.
+    Raises a 404 if the item does not exist. The caller commits.
+    """
+    column = LIKE_COLUMNS[item_type]
+    values = {"user_id": user_id, column.key: item_id}
+    dialect = db.bind.dialect.name
+    try:
+        if dialect in ("sqlite", "postgresql"):
+            dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            like = await db.scalar(
+                dialect_insert(Like).values(**values)
+                .on_conflict_do_nothing(index_elements=["user_id", column.key], index_where=column.isnot(None))
+                .returning(Like)
+            )
+        else:
+            # No portable upsert: a duplicate fails on the unique index inside a savepoint
+            try:
+                async with db.begin_nested():
+                    like = await db.scalar(insert(Like).values(**values).returning(Like))
+            except IntegrityError:
+                like = None
+    except IntegrityError:
+        # Only the item's foreign key is left to violate
+        raise _not_found(item_type)
+
+    if like is None:
+        return None
+    if await adjust_counter(db, item_type, item_id, "like_count", 1) is None:
+        raise _not_found(item_type)
+    return like
+
+
+async def unlike_item(db: AsyncSession, user_id: int, item_type: str, item_id: int) -> bool:
+    """Remove a user's like on an item and uncount it; returns False if there was none. The caller commits."""
+    column = LIKE_COLUMNS[item_type]
+    like_id = await db.scalar(
+        delete(Like).where(Like.user_id == user_id, column == item_id).returning(Like.id)
+        .execution_options(synchronize_session=False)
+    )
+    if like_id is None:
+        return False
+    await adjust_counter(db, item_type, item_id, "like_count", -1)
+    return True
+
+
+async def delete_like(db: AsyncSession, user_id: int, like_id: int) -> Optional[Tuple[str, int]]:
+    """Remove one of a user's likes by id and uncount it
+
+    Returns the item type and id that was liked, or None if the user has
+    no such like. The caller commits.
+    """
+    row = (await db.execute(
+        delete(Like).where(Like.id == like_id, Like.user_id == user_id).returning(Like.bake_id, Like.recipe_id)
+        .execution_options(synchronize_session=False)
+    )).one_or_none()
+    if row is None:
+        return None
+    item = ("bake", row.bake_id) if row.bake_id else ("recipe", row.recipe_id)
+    await adjust_counter(db, *item, "like_count", -1)
+    return item
@@ -0,0 +1,157 @@
+"""
+Verification of Google and Apple Sign-In ID tokens
+"""
+import asyncio
+import re
+import time
+from typing import Any, Dict, Optional, Sequence
+import httpx
+from jose import jwt
+from jose.exceptions import JOSEError
+from app.core.config import settings
+from app.core.http_client import get_http_client
+
+# Key set lifetime when the provider sends no usable Cache-Control max-age
+DEFAULT_JWKS_MAX_AGE = 3600
+
+# Minimum seconds between refreshes forced by a token signed with an unknown key
+JWKS_FORCED_REFRESH_INTERVAL = 60
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class InvalidIDToken(Exception):
+    """An ID token that is malformed, badly signed, expired or not meant for us"""
+
+
+class SigningKeysUnavailable(Exception):
+    """A provider's signing keys could not be fetched and none are cached"""
+
+
+def _max_age(response: httpx.Response) -> int:
+    match = _MAX_AGE.search(response.headers.get("cache-control", ""))
+    if match is None:
+        return DEFAULT_JWKS_MAX_AGE
+    try:
+        age = int(response.headers.get("age", 0))
+    except ValueError:
+        age = 0
+    return max(int(match.group(1)) - age, 0)
+
+
+class JWKSVerifier:
+    """Verifies RS256 ID tokens against a provider's published signing keys
+
+    The key set is fetched through the shared HTTP client and cached for
+    as long as the provider's Cache-Control allows, so a sign-in costs no
+    network call. A token signed with a key we have not seen triggers an
+    early refresh, at most once a minute, to pick up rotated keys. If a
+    refresh fails the previous keys stay in use.
+    """
+
+    def __init__(self, name: str, jwks_url: str, issuers: Sequence[str]):
+        self.name = name
+        self.jwks_url = jwks_url
+        self.issuers = tuple(issuers)
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._expires_at = 0.0
+        self._fetched_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def _refresh(self, force: bool = False):
+        async with self._lock:
+            now = time.monotonic()
+            # Another request may have refreshed while this one waited for the lock
+            if not force and now < self._expires_at:
+                return
+            if force and self._fetched_at is not None and now - self._fetched_at < JWKS_FORCED_REFRESH_INTERVAL:
+                return
+            try:
+                response = await get_http_client().get(self.jwks_url)
+                response.raise_for_status()
+                keys = {key["kid"]: key for key in response.json()["keys"] if "kid" in key}
+            except (httpx.HTTPError, ValueError, KeyError) as e:
+                if not self._keys:
+                    raise SigningKeysUnavailable(f"Could not fetch {self.name} signing keys: {e}") from e
+                print(f"⚠️ Could not refresh {self.name} signing keys, keeping the cached ones: {e}")
+                self._expires_at = now + JWKS_FORCED_REFRESH_INTERVAL
+                return
+            self._keys = keys
+            self._fetched_at = now
+            self._expires_at = now + _max_age(response)
+
+    async def _signing_key(self, kid: str) -> Dict[str, Any]:
+        if time.monotonic() >= self._expires_at:
+            await self._refresh()
+        key = self._keys.get(kid)
+        if key is None:
+            await self._refresh(force=True)
+            key = self._keys.get(kid)
+        if key is None:
+            raise InvalidIDToken(f"Unknown {self.name} signing key")
+        return key
+
+    async def verify(self, token: str, audiences: Sequence[str]) -> Dict[str, Any]:
+        """Return a token's claims once its signature, expiry, issuer and audience check out
+
+        Raises InvalidIDToken for a bad token, or SigningKeysUnavailable if
+        the keys cannot be fetched at all. With no audiences configured every
+        token is rejected, since any other application's would otherwise do.
+        """
+        if not audiences:
+            raise InvalidIDToken(f"{self.name} sign-in is not configured")
+        try:
+            header = jwt.get_unverified_header(token)
+        except JOSEError:
+            raise InvalidIDToken("Malformed token")
+        if header.get("alg") != "RS256" or not header.get("kid"):
+            raise InvalidIDToken("Unsupported token signature")
+
+        key = await self._signing_key(header["kid"])
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=["RS256"],
+                issuer=self.issuers,
+                # The audience may be any of our client ids; checked below
+                options={"verify_aud": False, "verify_at_hash": False, "require_exp": True}
+            )
+        except JOSEError as e:
+            raise InvalidIDToken(str(e))
+
+        token_audiences = claims.get("aud")
+        if isinstance(token_audiences, str):
+            token_audiences = [token_audiences]
+        if not set(token_audiences or ()).intersection(audiences):
+            raise InvalidIDToken("Token was issued for another application")
+        return claims
+
+
+google_verifier = JWKSVerifier(
+    "Google",
+    "https://www.googleapis.com/oauth2/v3/certs",
+    ("accounts.google.com", "https://accounts.google.com")
+)
+
+apple_verifier = JWKSVerifier(
+    "Apple",
+    "https://appleid.apple.com/auth/keys",
+    ("https://appleid.apple.com",)
+)
+
+
+async def verify_google_id_token(token: str) -> Dict[str, Any]:
+    """Verified claims of a Google ID token"""
+    claims = await google_verifier.verify(token, settings.GOOGLE_CLIENT_IDS)
+    if not claims.get("email") or claims.get("email_verified") not in (True, "true"):
+        raise InvalidIDToken("Google account email is not verified")
+    return claims
+
+
+async def verify_apple_id_token(token: str) -> Dict[str, Any]:
+    """Verified claims of an Apple ID token"""
+    claims = await apple_verifier.verify(token, settings.APPLE_CLIENT_IDS)
+    if not claims.get("sub"):
+        raise InvalidIDToken("Apple token has no subject")
+    return claims
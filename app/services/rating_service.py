@@ -0,0 +1,149 @@
+"""
+Rating aggregates for recipes and bakes: review count, rating sum, average and per-star histogram
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import Float, bindparam, case, cast, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.bake import Bake
+from app.models.recipe import Recipe
+from app.models.review import Review
+from app.services.trending_service import calculate_trending_score, rescore_bake, update_trending_score
+
+RATED_MODELS = {"recipe": Recipe, "bake": Bake}
+
+STARS = (1, 2, 3, 4, 5)
+
+
+def _star_column(stars: int) -> str:
+    return f"rating_{stars}_count"
+
+
+def _average(rating_sum: Any, review_count: Any) -> Any:
+    """SQL for the average rating, or 0 with no reviews"""
+    return case((review_count > 0, cast(rating_sum, Float) / review_count), else_=0.0)
+
+
+def _aggregates(review_count: int, rating_sum: int, histogram: Sequence[int]) -> Dict[str, Any]:
+    """Column values for an item with these reviews"""
+    values = {
+        "review_count": review_count,
+        "rating_sum": rating_sum,
+        "rating": rating_sum / review_count if review_count else 0.0,
+    }
+    values.update({_star_column(stars): count for stars, count in zip(STARS, histogram)})
+    return values
+
+
+async def adjust_rating(
+    db: AsyncSession,
+    item_type: str,
+    item_id: int,
+    added: Optional[int] = None,
+    removed: Optional[int] = None
+) -> bool:
+    """Apply a review's star rating being added, removed or changed to an item's aggregates
+
+    One UPDATE adds the deltas to review_count, rating_sum and the star
+    counts, and derives rating from the new totals, so it costs the same
+    however many reviews the item has and concurrent reviews cannot
+    overwrite each other's changes. Returns False if the item does not
+    exist. The caller commits.
+    """
+    model = RATED_MODELS[item_type]
+    count_delta = (added is not None) - (removed is not None)
+    sum_delta = (added or 0) - (removed or 0)
+    new_count = model.review_count + count_delta
+    new_sum = model.rating_sum + sum_delta
+
+    values = {"review_count": new_count, "rating_sum": new_sum, "rating": _average(new_sum, new_count)}
+    if added != removed:
+        if added is not None:
+            values[_star_column(added)] = getattr(model, _star_column(added)) + 1
+        if removed is not None:
+            values[_star_column(removed)] = getattr(model, _star_column(removed)) - 1
+    statement = update(model).where(model.id == item_id).values(values).execution_options(synchronize_session=False)
+
+    if model is not Bake:
+        return (await db.execute(statement)).rowcount > 0
+
+    # review_count feeds a bake's trending score
+    row = (await db.execute(
+        statement.returning(Bake.id, Bake.like_count, Bake.comment_count, Bake.review_count, Bake.created_at)
+    )).one_or_none()
+    if row is None:
+        return False
+    await rescore_bake(db, row)
+    return True
+
+
+async def recompute_rating(db: AsyncSession, item_type: str, item_id: int) -> None:
+    """Set one item's rating aggregates from its reviews; the caller commits"""
+    model = RATED_MODELS[item_type]
+    item = await db.scalar(select(model).where(model.id == item_id))
+    if not item:
+        return
+
+    review_count, rating_sum, *histogram = (await db.execute(
+        select(
+            func.count(Review.id),
+            func.coalesce(func.sum(Review.rating), 0),
+            *[func.count(Review.id).filter(Review.rating == stars) for stars in STARS]
+        ).where(Review.item_type == item_type, Review.item_id == item_id)
+    )).one()
+    for column, value in _aggregates(review_count, rating_sum, histogram).items():
+        setattr(item, column, value)
+    if item_type == "bake":
+        update_trending_score(item)
+
+
+async def rebuild_ratings(db: AsyncSession) -> List[Tuple[str, int]]:
+    """Rebuild every item's rating aggregates from the reviews table; the caller commits
+
+    For repairing aggregates in bulk, e.g. after reviews were changed
+    outside the API. One GROUP BY over all reviews gives the new values;
+    they are compared with the stored ones and only items that differ are
+    written, with one executemany UPDATE per item type. Returns the
+    (item_type, item_id) of each item updated.
+    """
+    rows = (await db.execute(
+        select(
+            Review.item_type,
+            Review.item_id,
+            func.count(Review.id),
+            func.sum(Review.rating),
+            *[func.count(Review.id).filter(Review.rating == stars) for stars in STARS]
+        ).group_by(Review.item_type, Review.item_id)
+    )).all()
+    rebuilt: Dict[str, Dict[int, Dict[str, Any]]] = {item_type: {} for item_type in RATED_MODELS}
+    for item_type, item_id, review_count, rating_sum, *histogram in rows:
+        if item_type in rebuilt:
+            rebuilt[item_type][item_id] = _aggregates(review_count, rating_sum, histogram)
+
+    empty = _aggregates(0, 0, [0] * len(STARS))
+    columns = list(empty)
+    updated = []
+    for item_type, model in RATED_MODELS.items():
+        scored = [model.like_count, model.comment_count, model.created_at] if model is Bake else []
+        changes = []
+        for item in (await db.execute(select(model.id, *[getattr(model, column) for column in columns], *scored))).all():
+            values = rebuilt[item_type].get(item.id, empty)
+            if all(getattr(item, column) == value for column, value in values.items()):
+                continue
+            change = {f"new_{column}": value for column, value in values.items()}
+            if model is Bake:
+                change["new_trending_score"] = calculate_trending_score(
+                    item.like_count, item.comment_count, values["review_count"], item.created_at
+                )
+            changes.append({"item_id": item.id, **change})
+        if not changes:
+            continue
+
+        table = model.__table__
+        written = columns + (["trending_score"] if model is Bake else [])
+        await db.execute(
+            update(table).where(table.c.id == bindparam("item_id"))
+            .values({column: bindparam(f"new_{column}") for column in written}),
+            changes
+        )
+        updated.extend((item_type, change["item_id"]) for change in changes)
+    return updated
@@ -0,0 +1,163 @@
+"""
+Local and S3 storage for uploaded images
+"""
+import asyncio
+import os
+import shutil
+from typing import Callable, List, Optional, Tuple
+import boto3
+from boto3.s3.transfer import TransferConfig
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.user import User
+from app.services.blob_service import (
+    add_blob_reference, dedupe_metrics, find_source_blob, release_blob_reference, reuse_blob
+)
+from app.services.image_service import (
+    CONTENT_TYPES, TransformResult, avatar_filename, blob_filenames, content_hash_for_filename,
+    image_pipeline, remove_file, spool_stream, temporary_dir
+)
+
+# Initialize S3 client if AWS credentials are provided
+s3_client = None
+if settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY:
+    s3_client = boto3.client(
+        's3',
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_REGION,
+        endpoint_url=settings.AWS_S3_ENDPOINT_URL
+    )
+
+# Objects above the threshold are sent as multipart uploads streamed from disk
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4
+)
+
+
+def base_url(folder: str) -> str:
+    """URL prefix stored files in a folder are served from"""
+    if s3_client:
+        return f"https://{settings.AWS_S3_BUCKET}.s3.{settings.AWS_REGION}.amazonaws.com/{folder}/"
+    return f"/uploads/{folder}/"
+
+
+async def publish_files(output_dir: str, folder: str, filenames: List[str]) -> None:
+    """Move transform output into local storage or stream it to S3"""
+    if s3_client:
+        await asyncio.gather(*[
+            asyncio.to_thread(
+                s3_client.upload_file,
+                os.path.join(output_dir, filename),
+                settings.AWS_S3_BUCKET,
+                f"{folder}/{filename}",
+                ExtraArgs={'ContentType': CONTENT_TYPES[filename.rsplit(".", 1)[-1]]},
+                Config=S3_TRANSFER_CONFIG
+            )
+            for filename in filenames
+        ])
+        return
+
+    upload_dir = f"uploads/{folder}"
+    os.makedirs(upload_dir, exist_ok=True)
+    for filename in filenames:
+        shutil.move(os.path.join(output_dir, filename), os.path.join(upload_dir, filename))
+
+
+async def delete_files(folder: str, filenames: List[str]) -> None:
+    """Remove stored files locally or from S3"""
+    if s3_client:
+        await asyncio.to_thread(
+            s3_client.delete_objects,
+            Bucket=settings.AWS_S3_BUCKET,
+            Delete={'Objects': [{'Key': f"{folder}/{filename}"} for filename in filenames]}
+        )
+        return
+
+    for filename in filenames:
+        remove_file(f"uploads/{folder}/{filename}")
+
+
+async def store_image(
+    db: AsyncSession,
+    transform: Callable[[str, str], TransformResult],
+    source_path: str,
+    source_hash: str,
+    folder: str,
+    user_id: int
+) -> Tuple[str, int]:
+    """Store a spooled upload as a content-addressed blob referenced by a user
+
+    Returns the content hash and the stored size of the blob. An upload
+    whose raw bytes were seen before skips processing entirely; one that
+    processes to an already stored image only takes a reference. The
+    caller commits.
+    """
+    blob = await find_source_blob(db, folder, source_hash)
+    if blob and await reuse_blob(db, folder, blob.content_hash, user_id):
+        dedupe_metrics.record_source_hit(blob)
+        return blob.content_hash, blob.size_bytes
+
+    output_dir = temporary_dir()
+    try:
+        result = await image_pipeline.run(transform, source_path, output_dir)
+        size_bytes = sum(result.files.values())
+        if await add_blob_reference(db, folder, result.content_hash, source_hash, user_id, size_bytes, result.cpu_ms):
+            await publish_files(output_dir, folder, list(result.files))
+            dedupe_metrics.record_miss()
+        else:
+            dedupe_metrics.record_content_hit(size_bytes)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return result.content_hash, size_bytes
+
+
+async def release_image(db: AsyncSession, folder: str, content_hash: str, user_id: int) -> Optional[bool]:
+    """Drop a user's reference on a blob and delete its files once unreferenced"""
+    released = await release_blob_reference(db, folder, content_hash, user_id)
+    if released:
+        await delete_files(folder, blob_filenames(folder, content_hash))
+    return released
+
+
+async def set_user_avatar(db: AsyncSession, user: User, content_hash: str) -> str:
+    """Point a user's avatar at a stored blob, releasing the one it replaces; the caller commits"""
+    avatars_url = base_url("avatars")
+    file_url = f"{avatars_url}{avatar_filename(content_hash)}"
+
+    # The user may come from the user cache; the reference released must be the stored one
+    await db.refresh(user, ["avatar_url"])
+    previous_url = user.avatar_url or ""
+    if previous_url.startswith(avatars_url):
+        previous_hash = content_hash_for_filename("avatars", previous_url[len(avatars_url):])
+        # Uploading the same avatar again keeps the one reference the user holds
+        if previous_hash and previous_hash != content_hash:
+            await release_image(db, "avatars", previous_hash, user.id)
+
+    user.avatar_url = file_url
+    return file_url
+
+
+def presigned_put_url(key: str, content_type: str, expires_in: int) -> str:
+    """Signed URL a client can PUT an object to directly"""
+    return s3_client.generate_presigned_url(
+        'put_object',
+        Params={'Bucket': settings.AWS_S3_BUCKET, 'Key': key, 'ContentType': content_type},
+        ExpiresIn=expires_in
+    )
+
+
+def spool_object(key: str, max_size: int) -> Tuple[str, str]:
+    """Download an object to a temporary file; blocking, like spool_stream"""
+    body = s3_client.get_object(Bucket=settings.AWS_S3_BUCKET, Key=key)["Body"]
+    try:
+        return spool_stream(body, max_size)
+    finally:
+        body.close()
+
+
+async def delete_object(key: str) -> None:
+    """Remove a single object from S3"""
+    await asyncio.to_thread(s3_client.delete_object, Bucket=settings.AWS_S3_BUCKET, Key=key)
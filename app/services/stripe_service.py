@@ -1,9 +1,13 @@
 """
 Stripe service for xFood platform monetization
 """
+import asyncio
 import stripe
 from typing import Dict, Any, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
+from app.core.user_cache import user_cache
+from app.models.user import User
 
 # Initialize Stripe
 stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -20,12 +24,13 @@ class StripeService:
         return int((amount_cents * PLATFORM_COMMISSION_BPS) / 10000)
     
     @staticmethod
-    def create_customer(email: str, name: str) -> stripe.Customer:
+    def create_customer(email: str, name: str, idempotency_key: Optional[str] = None) -> stripe.Customer:
         """Create a Stripe customer"""
         return stripe.Customer.create(
             email=email,
             name=name,
-            metadata={"platform": "xfood"}
+            metadata={"platform": "xfood"},
+            idempotency_key=idempotency_key
         )
     
     @staticmethod
@@ -86,3 +91,23 @@ class StripeService:
         if amount_cents:
             refund_data["amount"] = amount_cents
         return stripe.Refund.create(**refund_data)
+
+
+async def ensure_stripe_customer(db: AsyncSession, user: User) -> str:
+    """Return the user's Stripe customer ID, creating the customer first if needed
+
+    Usually done ahead of checkout by app.tasks.payments. The idempotency
+    key makes a checkout that races that task get the same customer back
+    instead of a duplicate.
+    """
+    if not user.stripe_customer_id:
+        customer = await asyncio.to_thread(
+            StripeService.create_customer,
+            email=user.email,
+            name=user.full_name,
+            idempotency_key=f"xfood-customer-{user.id}"
+        )
+        user.stripe_customer_id = customer.id
+        await db.commit()
+        await user_cache.invalidate(user.id)
+    return user.stripe_customer_id
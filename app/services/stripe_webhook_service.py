@@ -0,0 +1,178 @@
+"""
+Side effects of Stripe webhook events, run by app.tasks.webhooks
+"""
+import asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.user_cache import user_cache
+from app.services.stripe_service import StripeService
+from app.models.user import User
+from app.models.subscription import Subscription
+from app.models.purchase import Purchase
+
+async def process_stripe_event(event, db: AsyncSession):
+    """Apply a verified Stripe event"""
+    if event["type"] == "checkout.session.completed":
+        await handle_checkout_session_completed(event, db)
+    elif event["type"] == "invoice.payment_succeeded":
+        await handle_invoice_payment_succeeded(event, db)
+    elif event["type"] == "customer.subscription.updated":
+        await handle_subscription_updated(event, db)
+    elif event["type"] == "customer.subscription.deleted":
+        await handle_subscription_deleted(event, db)
+    elif event["type"] == "payment_intent.succeeded":
+        await handle_payment_intent_succeeded(event, db)
+
+async def handle_checkout_session_completed(event: dict, db: AsyncSession):
+    """Handle subscription checkout completion"""
+    session = event["data"]["object"]
+    
+    if session.mode == "subscription":
+        # Handle subscription creation
+        subscription_id = session.subscription
+        customer_id = session.customer
+        
+        # Get user by Stripe customer ID
+        user = await db.scalar(select(User).filter(User.stripe_customer_id == customer_id))
+        if not user:
+            return
+        
+        # Get subscription details from Stripe
+        stripe_sub = await asyncio.to_thread(StripeService.get_subscription, subscription_id)
+        
+        # Create or update subscription record
+        subscription = await db.scalar(select(Subscription).filter(
+            Subscription.stripe_subscription_id == subscription_id
+        ))
+        
+        if not subscription:
+            subscription = Subscription(
+                user_id=user.id,
+                stripe_subscription_id=subscription_id,
+                status=stripe_sub.status,
+                current_period_start=stripe_sub.current_period_start,
+                current_period_end=stripe_sub.current_period_end
+            )
+            db.add(subscription)
+        else:
+            subscription.status = stripe_sub.status
+            subscription.current_period_start = stripe_sub.current_period_start
+            subscription.current_period_end = stripe_sub.current_period_end
+        
+        # Update user subscription status
+        if stripe_sub.status == "active":
+            user.has_active_subscription = True
+        
+        await db.commit()
+        await user_cache.invalidate(user.id)
+
+async def handle_invoice_payment_succeeded(event: dict, db: AsyncSession):
+    """Handle subscription renewal"""
+    invoice = event["data"]["object"]
+    
+    if invoice.subscription:
+        subscription_id = invoice.subscription
+        subscription = await db.scalar(select(Subscription).filter(
+            Subscription.stripe_subscription_id == subscription_id
+        ))
+        
+        if subscription:
+            # Update subscription period
+            stripe_sub = await asyncio.to_thread(StripeService.get_subscription, subscription_id)
+            subscription.current_period_start = stripe_sub.current_period_start
+            subscription.current_period_end = stripe_sub.current_period_end
+            subscription.status = stripe_sub.status
+            
+            # Ensure user has active subscription
+            user = await db.scalar(select(User).filter(User.id == subscription.user_id))
+            if user and stripe_sub.status == "active":
+                user.has_active_subscription = True
+            
+            await db.commit()
+            await user_cache.invalidate(subscription.user_id)
+
+async def handle_subscription_updated(event: dict, db: AsyncSession):
+    """Handle subscription updates"""
+    stripe_sub = event["data"]["object"]
+    subscription = await db.scalar(select(Subscription).filter(
+        Subscription.stripe_subscription_id == stripe_sub.id
+    ))
+    
+    if subscription:
+        subscription.status = stripe_sub.status
+        subscription.current_period_start = stripe_sub.current_period_start
+        subscription.current_period_end = stripe_sub.current_period_end
+        subscription.cancel_at_period_end = stripe_sub.cancel_at_period_end
+        
+        # Update user subscription status
+        user = await db.scalar(select(User).filter(User.id == subscription.user_id))
+        if user:
+            user.has_active_subscription = stripe_sub.status == "active"
+        
+        await db.commit()
+        await user_cache.invalidate(subscription.user_id)
+
+async def handle_subscription_deleted(event: dict, db: AsyncSession):
+    """Handle subscription deletion"""
+    stripe_sub = event["data"]["object"]
+    subscription = await db.scalar(select(Subscription).filter(
+        Subscription.stripe_subscription_id == stripe_sub.id
+    ))
+    
+    if subscription:
+        subscription.status = "canceled"
+        
+        # Update user subscription status
+        user = await db.scalar(select(User).filter(User.id == subscription.user_id))
+        if user:
+            user.has_active_subscription = False
+        
+        await db.commit()
+        await user_cache.invalidate(subscription.user_id)
+
+async def handle_payment_intent_succeeded(event: dict, db: AsyncSession):
+    """Handle successful item purchases"""
+    payment_intent = event["data"]["object"]
+    metadata = payment_intent.metadata
+    
+    # Check if this is an item purchase
+    if metadata.get("platform") == "xfood" and metadata.get("item_type"):
+        item_type = metadata["item_type"]
+        item_id = int(metadata["item_id"])
+        seller_id = int(metadata["seller_id"])
+        buyer_id = int(metadata["buyer_id"])
+        
+        # Stripe delivers events at least once; record each payment only once
+        existing_purchase = await db.scalar(select(Purchase.id).filter(
+            Purchase.stripe_payment_intent_id == payment_intent.id
+        ))
+        if existing_purchase:
+            return
+        
+        # Get buyer and seller
+        buyer = await db.scalar(select(User).filter(User.id == buyer_id))
+        seller = await db.scalar(select(User).filter(User.id == seller_id))
+        
+        if not buyer or not seller:
+            return
+        
+        # Calculate platform fee and seller earnings
+        amount_cents = payment_intent.amount
+        platform_fee_cents = StripeService.calculate_platform_fee(amount_cents)
+        seller_earnings_cents = amount_cents - platform_fee_cents
+        
+        # Create purchase record
+        purchase = Purchase(
+            buyer_id=buyer_id,
+            seller_id=seller_id,
+            item_type=item_type,
+            item_id=item_id,
+            amount_cents=amount_cents,
+            platform_fee_cents=platform_fee_cents,
+            seller_earnings_cents=seller_earnings_cents,
+            stripe_payment_intent_id=payment_intent.id,
+            status="completed"
+        )
+        
+        db.add(purchase)
+        await db.commit()
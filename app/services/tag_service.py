@@ -0,0 +1,273 @@
+"""
+Tag and allergen index: maintenance, boolean filters and facet counts
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import Select, and_, delete, func, insert, not_, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.tag import ItemTag, TagCount
+
+TAG_KINDS = ("tag", "allergen")
+
+# Longest normalized tag stored in the index
+MAX_TAG_LENGTH = 100
+
+# Most tag terms, and tokens overall, accepted in one filter expression
+MAX_FILTER_TERMS = 20
+MAX_FILTER_TOKENS = 200
+
+_FILTER_TOKEN = re.compile(r"\s*(\(|\)|,|[^\s(),]+)")
+_OPERATORS = {"AND", "OR", "NOT"}
+
+
+def normalize_tag(tag: str) -> Optional[str]:
+    """Normalize a tag for indexing: "Gluten Free" -> "gluten-free" """
+    tag = re.sub(r"[\s_]+", "-", tag.strip().lower()).strip("-")
+    return tag[:MAX_TAG_LENGTH] or None
+
+
+def _tag_set(kind: str, tags: Optional[Iterable[str]]) -> Set[Tuple[str, str]]:
+    """Normalized (kind, tag) pairs for a list of raw tags"""
+    pairs = {(kind, normalize_tag(tag)) for tag in tags or [] if isinstance(tag, str)}
+    return {pair for pair in pairs if pair[1]}
+
+
+async def _adjust_counts(db: AsyncSession, item_type: str, pairs: Set[Tuple[str, str]], delta: int) -> None:
+    """Add delta to the usage count of each (kind, tag) pair"""
+    if not pairs:
+        return
+
+    if delta < 0:
+        for kind, tag in pairs:
+            await db.execute(
+                update(TagCount)
+                .where(TagCount.item_type == item_type, TagCount.kind == kind, TagCount.tag == tag)
+                .values(usage_count=TagCount.usage_count + delta)
+            )
+        return
+
+    rows = [{"item_type": item_type, "kind": kind, "tag": tag, "usage_count": delta} for kind, tag in pairs]
+    dialect = db.bind.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        statement = dialect_insert(TagCount)
+        await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["item_type", "kind", "tag"],
+                set_={"usage_count": TagCount.usage_count + statement.excluded.usage_count}
+            ),
+            rows
+        )
+        return
+
+    # No portable upsert: update first, insert what was missing
+    for row in rows:
+        result = await db.execute(
+            update(TagCount)
+            .where(TagCount.item_type == item_type, TagCount.kind == row["kind"], TagCount.tag == row["tag"])
+            .values(usage_count=TagCount.usage_count + delta)
+        )
+        if result.rowcount == 0:
+            await db.execute(insert(TagCount), [row])
+
+
+async def index_item_tags(
+    db: AsyncSession,
+    item_type: str,
+    item_id: int,
+    tags: Optional[Iterable[str]] = None,
+    allergens: Optional[Iterable[str]] = None
+) -> None:
+    """Bring an item's index entries and the usage counts in line with its tags"""
+    new = _tag_set("tag", tags) | _tag_set("allergen", allergens)
+    current = set((await db.execute(
+        select(ItemTag.kind, ItemTag.tag)
+        .where(ItemTag.item_type == item_type, ItemTag.item_id == item_id)
+    )).all())
+
+    removed = current - new
+    added = new - current
+    for kind, tag in removed:
+        await db.execute(
+            delete(ItemTag).where(
+                ItemTag.item_type == item_type, ItemTag.item_id == item_id,
+                ItemTag.kind == kind, ItemTag.tag == tag
+            )
+        )
+    if added:
+        await db.execute(
+            insert(ItemTag),
+            [{"item_type": item_type, "item_id": item_id, "kind": kind, "tag": tag} for kind, tag in added]
+        )
+    await _adjust_counts(db, item_type, removed, -1)
+    await _adjust_counts(db, item_type, added, 1)
+
+
+async def unindex_item_tags(db: AsyncSession, item_type: str, item_id: int) -> None:
+    """Remove an item from the index and release its usage counts"""
+    await index_item_tags(db, item_type, item_id)
+
+
+class _FilterParser:
+    """Recursive-descent parser for tag filter expressions
+
+    Grammar (operators are case-insensitive, commas mean AND):
+        expr    := and_expr (OR and_expr)*
+        and_expr:= not_expr ((AND | ",") not_expr)*
+        not_expr:= NOT not_expr | "(" expr ")" | term
+        term    := [tag: | allergen:] word+
+    """
+
+    def __init__(self, expression: str):
+        self.tokens = _FILTER_TOKEN.findall(expression)
+        self.position = 0
+        self.terms = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def peek_operator(self) -> Optional[str]:
+        token = self.peek()
+        if token is None:
+            return None
+        if token.upper() in _OPERATORS:
+            return token.upper()
+        return token if token in ("(", ")", ",") else None
+
+    def take(self) -> str:
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self) -> Any:
+        if not self.tokens:
+            raise ValueError("empty expression")
+        # Bounds recursion depth as well as query size
+        if len(self.tokens) > MAX_FILTER_TOKENS:
+            raise ValueError("expression too long")
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(f"unexpected '{self.peek()}'")
+        return node
+
+    def parse_or(self) -> Any:
+        nodes = [self.parse_and()]
+        while self.peek_operator() == "OR":
+            self.take()
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def parse_and(self) -> Any:
+        nodes = [self.parse_not()]
+        while self.peek_operator() in ("AND", ","):
+            self.take()
+            nodes.append(self.parse_not())
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def parse_not(self) -> Any:
+        operator = self.peek_operator()
+        if operator == "NOT":
+            self.take()
+            return ("not", self.parse_not())
+        if operator == "(":
+            self.take()
+            node = self.parse_or()
+            if self.take() != ")":
+                raise ValueError("missing ')'")
+            return node
+        return self.parse_term()
+
+    def parse_term(self) -> Any:
+        words = []
+        while self.peek() is not None and self.peek_operator() is None:
+            words.append(self.take())
+        if not words:
+            raise ValueError(f"expected a tag, got '{self.peek() or 'end of input'}'")
+
+        kind = None
+        prefix, _, rest = words[0].partition(":")
+        if rest and prefix.lower() in TAG_KINDS:
+            kind, words[0] = prefix.lower(), rest
+
+        tag = normalize_tag(" ".join(words))
+        if not tag:
+            raise ValueError("empty tag")
+        self.terms += 1
+        if self.terms > MAX_FILTER_TERMS:
+            raise ValueError(f"more than {MAX_FILTER_TERMS} tags")
+        return ("term", kind, tag)
+
+
+def parse_tag_filter(expression: str) -> Any:
+    """Parse a tag filter such as "gluten-free AND NOT allergen:nuts"
+
+    Bare tags match either tags or allergens; prefix with ``tag:`` or
+    ``allergen:`` to restrict. Raises a 400 on malformed input.
+    """
+    try:
+        return _FilterParser(expression).parse()
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid tag filter: {e}"
+        )
+
+
+def _filter_clause(node: Any, model: Any, item_type: str):
+    """Compile a parsed filter into a WHERE clause over the posting lists"""
+    if node[0] == "term":
+        _, kind, tag = node
+        postings = select(ItemTag.item_id).where(ItemTag.item_type == item_type, ItemTag.tag == tag)
+        if kind:
+            postings = postings.where(ItemTag.kind == kind)
+        return model.id.in_(postings)
+    if node[0] == "not":
+        return not_(_filter_clause(node[1], model, item_type))
+    clauses = [_filter_clause(child, model, item_type) for child in node[1]]
+    return and_(*clauses) if node[0] == "and" else or_(*clauses)
+
+
+def apply_tag_filter(query: Select, model: Any, item_type: str, expression: str) -> Select:
+    """Filter a query by a boolean tag/allergen expression"""
+    return query.filter(_filter_clause(parse_tag_filter(expression), model, item_type))
+
+
+async def get_tag_facets(
+    db: AsyncSession,
+    query: Select,
+    model: Any,
+    item_type: str,
+    limit: int = 20
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Count tags and allergens across every row matched by ``query``
+
+    Pagination on the query is ignored; the counts cover the whole result set.
+    """
+    matched_ids = query.with_only_columns(model.id).order_by(None).limit(None).offset(None)
+    count = func.count().label("count")
+    rows = (await db.execute(
+        select(ItemTag.kind, ItemTag.tag, count)
+        .where(ItemTag.item_type == item_type, ItemTag.item_id.in_(matched_ids))
+        .group_by(ItemTag.kind, ItemTag.tag)
+        .order_by(count.desc(), ItemTag.tag)
+    )).all()
+
+    facets = {f"{kind}s": [] for kind in TAG_KINDS}
+    for kind, tag, tag_count in rows:
+        bucket = facets[f"{kind}s"]
+        if len(bucket) < limit:
+            bucket.append({"value": tag, "count": tag_count})
+    return facets
+
+
+async def get_popular_tags(db: AsyncSession, item_type: str, kind: str = "tag", limit: int = 20) -> List[Dict[str, Any]]:
+    """Most used tags by their maintained usage counts"""
+    rows = (await db.execute(
+        select(TagCount.tag, TagCount.usage_count)
+        .where(TagCount.item_type == item_type, TagCount.kind == kind, TagCount.usage_count > 0)
+        .order_by(TagCount.usage_count.desc(), TagCount.tag)
+        .limit(limit)
+    )).all()
+    return [{"value": tag, "count": usage_count} for tag, usage_count in rows]
@@ -0,0 +1,63 @@
+"""
+Time-decayed trending score for bakes
+"""
+import math
+from datetime import datetime, timezone
+from typing import Any, Optional
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.bake import Bake
+
+# Fixed reference point for the time term; any date works, it only shifts every score equally
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# Engagement weights: a comment or review takes more effort than a like
+LIKE_WEIGHT = 1.0
+COMMENT_WEIGHT = 2.0
+REVIEW_WEIGHT = 3.0
+
+
+def calculate_trending_score(
+    like_count: int = 0,
+    comment_count: int = 0,
+    review_count: int = 0,
+    created_at: Optional[datetime] = None
+) -> float:
+    """Score a bake so that higher means hotter right now
+
+    Engagement decays exponentially with age, which in log form is
+    log10(engagement) - age / TRENDING_DECAY_SECONDS. The "now" part of age is
+    the same for every bake, so it is dropped and the age is measured from
+    TRENDING_EPOCH instead: the ordering is unchanged, but a score only
+    changes when the bake gets new engagement. That lets it live in an
+    indexed column rather than being recomputed on every read.
+
+    With the default decay a bake needs ten times the engagement to outrank
+    one posted 12.5 hours later.
+    """
+    engagement = LIKE_WEIGHT * (like_count or 0) + COMMENT_WEIGHT * (comment_count or 0) + REVIEW_WEIGHT * (review_count or 0)
+    if created_at is None:
+        created_at = datetime.now(timezone.utc)
+    elif created_at.tzinfo is None:
+        # SQLite hands back naive datetimes; they are stored in UTC
+        created_at = created_at.replace(tzinfo=timezone.utc)
+
+    age_term = (created_at - TRENDING_EPOCH).total_seconds() / settings.TRENDING_DECAY_SECONDS
+    return round(math.log10(max(engagement, 1.0)) + age_term, 6)
+
+
+def update_trending_score(bake: Bake) -> None:
+    """Recompute a bake's trending score after its counters changed"""
+    bake.trending_score = calculate_trending_score(
+        bake.like_count, bake.comment_count, bake.review_count, bake.created_at
+    )
+
+
+async def rescore_bake(db: AsyncSession, row: Any) -> None:
+    """Set a bake's trending score from an UPDATE ... RETURNING of its counters"""
+    await db.execute(
+        update(Bake).where(Bake.id == row.id).values(
+            trending_score=calculate_trending_score(row.like_count, row.comment_count, row.review_count, row.created_at)
+        ).execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,8 @@
+"""
+Background tasks for the xFood platform
+
+Run a worker with ``celery -A app.tasks worker -Q default,images``.
+"""
+from app.tasks.celery_app import celery_app, enqueue
+
+__all__ = ["celery_app", "enqueue"]
@@ -0,0 +1,106 @@
+"""
+Celery application and helpers for running async code as tasks
+"""
+import asyncio
+from typing import Any, Callable, Coroutine, Dict, Optional
+from celery import Celery, Task
+from celery.signals import worker_process_init
+from app.core.config import settings
+# Register every model so relationships resolve in worker processes, as in app.main
+from app.models import user, recipe, bake, circle, message, review, comment, like, purchase, subscription, tag, image, upload
+
+celery_app = Celery(
+    "xfood",
+    broker=settings.CELERY_BROKER_URL or settings.REDIS_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=["app.tasks.images", "app.tasks.payments", "app.tasks.ratings", "app.tasks.webhooks"]
+)
+celery_app.conf.update(
+    broker_password=settings.REDIS_PASSWORD,
+    redis_password=settings.REDIS_PASSWORD,
+    broker_connection_retry_on_startup=True,
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_ignore_result=settings.CELERY_RESULT_BACKEND is None,
+    # Acknowledge once a task has run, so one lost with its worker is redelivered; tasks are idempotent
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    task_default_queue="default",
+    # Image processing is slow and CPU-bound; a separate queue keeps it from delaying the rest
+    task_routes={"app.tasks.images.*": {"queue": "images"}},
+    task_always_eager=settings.CELERY_TASK_ALWAYS_EAGER
+)
+
+# The coroutine function behind each task, so eager mode can await it directly
+_coroutines: Dict[str, Callable[..., Coroutine[Any, Any, Any]]] = {}
+
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def run_coroutine(coroutine: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine to completion in a worker process
+
+    The event loop is kept for the life of the process because pooled
+    database connections belong to the loop that opened them.
+    """
+    global _worker_loop
+    if _worker_loop is None:
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop.run_until_complete(coroutine)
+
+
+def coroutine_task(**options: Any) -> Callable[[Callable[..., Coroutine[Any, Any, Any]]], Task]:
+    """Register an async function as a Celery task"""
+    def decorator(func: Callable[..., Coroutine[Any, Any, Any]]) -> Task:
+        name = f"{func.__module__}.{func.__name__}"
+        _coroutines[name] = func
+
+        def run(*args: Any, **kwargs: Any) -> Any:
+            return run_coroutine(func(*args, **kwargs))
+
+        run.__doc__ = func.__doc__
+        return celery_app.task(name=name, **options)(run)
+    return decorator
+
+
+async def enqueue(task: Task, *args: Any, required: bool = False) -> None:
+    """Queue a task for a worker, or run it right here in eager mode
+
+    Eager mode awaits the task's coroutine on the running event loop rather
+    than using Celery's own eager execution, which would block the loop
+    with a nested one. By default the caller does not see the task fail:
+    eager failures and broker errors are printed, as a worker would log
+    them, so a broker outage cannot fail a request that has already
+    committed. With required=True both are raised instead, for callers
+    that must only succeed once the task has run or been queued.
+    """
+    if settings.CELERY_TASK_ALWAYS_EAGER:
+        try:
+            await _coroutines[task.name](*args)
+        except Exception as e:
+            if required:
+                raise
+            print(f"⚠️ Task {task.name} failed: {e}")
+        return
+
+    # Publishing talks to the broker; keep that off the event loop too
+    try:
+        await asyncio.to_thread(task.apply_async, args)
+    except Exception as e:
+        if required:
+            raise
+        print(f"⚠️ Could not queue task {task.name}: {e}")
+
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    """Per-process setup for prefork worker children"""
+    from app.db.database import async_engine
+    from app.services.image_service import image_pipeline
+
+    # Drop connections inherited from the parent rather than share them
+    async_engine.sync_engine.dispose(close=False)
+    # The child is already a worker process and may not start a pool of its own
+    image_pipeline.run_in_process()
@@ -0,0 +1,11 @@
+"""
+Image processing tasks
+"""
+from app.services import direct_upload_service
+from app.tasks.celery_app import coroutine_task
+
+
+@coroutine_task()
+async def process_direct_upload(upload_id: str) -> None:
+    """Resize a completed direct upload and attach it to its target"""
+    await direct_upload_service.process_direct_upload(upload_id)
@@ -0,0 +1,32 @@
+"""
+Stripe customer tasks
+"""
+import stripe
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.models.user import User
+from app.services.stripe_service import ensure_stripe_customer
+from app.tasks.celery_app import coroutine_task, enqueue
+
+
+@coroutine_task(
+    autoretry_for=(stripe.error.APIConnectionError, stripe.error.RateLimitError),
+    retry_backoff=True,
+    max_retries=5
+)
+async def create_stripe_customer(user_id: int) -> None:
+    """Create the Stripe customer for a user ahead of their first checkout"""
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        if user:
+            await ensure_stripe_customer(db, user)
+
+
+async def provision_stripe_customer(user: User) -> None:
+    """Queue Stripe customer creation for a new user when Stripe is configured
+
+    Best effort: if the task cannot be queued, checkout creates the
+    customer instead.
+    """
+    if settings.STRIPE_SECRET_KEY and not user.stripe_customer_id:
+        await enqueue(create_stripe_customer, user.id)
@@ -0,0 +1,32 @@
+"""
+Rating aggregate tasks
+"""
+from app.core.cache import item_tags, response_cache
+from app.db.database import AsyncSessionLocal
+from app.services import rating_service
+from app.tasks.celery_app import coroutine_task
+
+
+@coroutine_task()
+async def recompute_rating(item_type: str, item_id: int) -> None:
+    """Recompute one item's rating aggregates from its reviews"""
+    async with AsyncSessionLocal() as db:
+        await rating_service.recompute_rating(db, item_type, item_id)
+        await db.commit()
+    await response_cache.invalidate(*item_tags(item_type, item_id))
+
+
+@coroutine_task()
+async def rebuild_ratings() -> int:
+    """Rebuild every recipe's and bake's rating aggregates from the reviews table
+
+    Run offline to repair drift, e.g. with
+    ``celery -A app.tasks call app.tasks.ratings.rebuild_ratings``.
+    """
+    async with AsyncSessionLocal() as db:
+        updated = await rating_service.rebuild_ratings(db)
+        await db.commit()
+    tags = {tag for item in updated for tag in item_tags(*item)}
+    if tags:
+        await response_cache.invalidate(*tags)
+    return len(updated)
@@ -0,0 +1,20 @@
+"""
+Webhook side-effect tasks
+"""
+from typing import Any, Dict
+import stripe
+from app.db.database import AsyncSessionLocal
+from app.services.stripe_webhook_service import process_stripe_event
+from app.tasks.celery_app import coroutine_task
+
+
+@coroutine_task(
+    autoretry_for=(stripe.error.APIConnectionError, stripe.error.RateLimitError),
+    retry_backoff=True,
+    max_retries=5
+)
+async def handle_stripe_event(event_data: Dict[str, Any]) -> None:
+    """Apply a Stripe event whose signature the webhook endpoint already verified"""
+    event = stripe.Event.construct_from(event_data, stripe.api_key)
+    async with AsyncSessionLocal() as db:
+        await process_stripe_event(event, db)
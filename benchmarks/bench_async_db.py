@@ -0,0 +1,77 @@
+"""
+p99 latency of database-backed endpoints under concurrent load
+
+Before the API moved to AsyncSession, each query ran on the event loop and
+stalled every other request on the worker. Compare a checkout from before
+that change with this one:
+
+    git worktree add /tmp/xfood-before <commit before the change>
+    python benchmarks/bench_async_db.py --root /tmp/xfood-before
+    python benchmarks/bench_async_db.py
+"""
+import asyncio
+import json
+import time
+import httpx
+from common import parser, register, running_server, sample_latency, summary
+
+LIST_PATHS = ["/api/v1/bakes/?limit=50", "/api/v1/recipes/?limit=50"]
+
+
+def seed(server, rows: int) -> None:
+    """Bakes and recipes owned by user 1, inserted straight into the database"""
+    server.sql(
+        "INSERT INTO bakes (title, description, category, price_cents, created_by, tags, allergens, available_for_order, "
+        "rating, review_count, like_count, comment_count) VALUES (?, ?, 'bread', 500, 1, '[]', '[]', 1, 0, 0, 0, 0)",
+        [(f"Bake {n}", "A loaf " * 20) for n in range(rows)]
+    )
+    server.sql(
+        "INSERT INTO recipes (title, description, ingredients, instructions, category, created_by, tags, difficulty, "
+        "is_premium, rating, review_count) VALUES (?, ?, ?, '[\"Bake it\"]', 'bread', 1, '[]', 'medium', 0, 0, 0)",
+        [(f"Recipe {n}", "A recipe " * 20, json.dumps(["500g flour", "10g salt", "350ml water"])) for n in range(rows)]
+    )
+
+
+async def run(args) -> None:
+    async with running_server(args.root, args.port) as server:
+        limits = httpx.Limits(max_connections=args.concurrency + 10)
+        async with httpx.AsyncClient(base_url=server.base_url, timeout=60, limits=limits, trust_env=False) as client:
+            await register(client)
+            seed(server, args.rows)
+
+            latencies = []
+            failures = 0
+            deadline = time.perf_counter() + args.seconds
+
+            async def worker(n: int):
+                nonlocal failures
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        response = await client.get(LIST_PATHS[n % len(LIST_PATHS)])
+                    except httpx.HTTPError:
+                        failures += 1
+                        continue
+                    if response.status_code != 200:
+                        failures += 1
+                        continue
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+            stop = asyncio.Event()
+            probe = asyncio.create_task(sample_latency(client, ["/health"], stop))
+            await asyncio.gather(*[worker(n) for n in range(args.concurrency)])
+            stop.set()
+            health = (await probe)["/health"]
+
+    print(f"root: {args.root}")
+    print(f"{args.concurrency} clients for {args.seconds}s, {len(latencies) / args.seconds:.0f} list requests/s, {failures} failed")
+    print(f"list endpoints: {summary(latencies)}")
+    print(f"/health:        {summary(health)}")
+
+
+if __name__ == "__main__":
+    cli = parser(__doc__)
+    cli.add_argument("--concurrency", type=int, default=20, help="clients requesting list pages at once")
+    cli.add_argument("--seconds", type=float, default=20.0, help="how long to keep the load up")
+    cli.add_argument("--rows", type=int, default=5000, help="bakes and recipes to seed")
+    asyncio.run(run(cli.parse_args()))
@@ -0,0 +1,77 @@
+"""
+Deep page latency of /api/v1/bakes/ with skip/limit versus a cursor
+
+OFFSET makes the database walk and discard every row before the page, so
+page 5000 costs far more than page 1. The X-Next-Cursor token seeks
+straight to the page through idx_bakes_created_at_id instead.
+
+    python benchmarks/bench_keyset.py --rows 1000000 --page 5000
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+import httpx
+from common import parser, register, running_server, summary
+
+PAGE_SIZE = 100
+
+
+def seed(server, rows: int) -> None:
+    """Bakes with distinct creation times, one second apart"""
+    start = datetime(2024, 1, 1)
+    batch = 100_000
+    for first in range(0, rows, batch):
+        server.sql(
+            "INSERT INTO bakes (title, description, category, price_cents, created_by, tags, allergens, available_for_order, "
+            "rating, review_count, like_count, comment_count, created_at) "
+            "VALUES (?, 'A loaf', 'bread', 500, 1, '[]', '[]', 1, 0, 0, 0, 0, ?)",
+            [(f"Bake {n}", str(start + timedelta(seconds=n))) for n in range(first, min(rows, first + batch))]
+        )
+    server.sql("ANALYZE")
+
+
+async def timed(client: httpx.AsyncClient, path: str, repeat: int) -> list:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def run(args) -> None:
+    async with running_server(args.root, args.port) as server:
+        async with httpx.AsyncClient(base_url=server.base_url, timeout=300, trust_env=False) as client:
+            await register(client)
+            seed(server, args.rows)
+
+            skip = (args.page - 1) * PAGE_SIZE
+            # The page before the target hands out the cursor for the target page
+            previous = await client.get(f"/api/v1/bakes/?skip={skip - PAGE_SIZE}&limit={PAGE_SIZE}")
+            previous.raise_for_status()
+            cursor = previous.headers["X-Next-Cursor"]
+
+            by_offset = await client.get(f"/api/v1/bakes/?skip={skip}&limit={PAGE_SIZE}")
+            by_cursor = await client.get(f"/api/v1/bakes/?cursor={cursor}&limit={PAGE_SIZE}")
+            assert by_offset.json() == by_cursor.json(), "cursor and offset pages differ"
+
+            first_page = await timed(client, f"/api/v1/bakes/?limit={PAGE_SIZE}", args.repeat)
+            deep_offset = await timed(client, f"/api/v1/bakes/?skip={skip}&limit={PAGE_SIZE}", args.repeat)
+            deep_cursor = await timed(client, f"/api/v1/bakes/?cursor={cursor}&limit={PAGE_SIZE}", args.repeat)
+
+    print(f"{args.rows} bakes, {PAGE_SIZE} per page")
+    for label, latencies in [("page 1", first_page), (f"page {args.page} by skip", deep_offset),
+                             (f"page {args.page} by cursor", deep_cursor)]:
+        print(f"{label + ':':<22} {summary(latencies)}")
+
+
+if __name__ == "__main__":
+    cli = parser(__doc__)
+    cli.add_argument("--rows", type=int, default=1_000_000, help="bakes to seed")
+    cli.add_argument("--page", type=int, default=5000, help="page number to fetch")
+    cli.add_argument("--repeat", type=int, default=20, help="requests timed per page")
+    args = cli.parse_args()
+    if args.page < 2 or args.page * PAGE_SIZE > args.rows:
+        cli.error("--page must be at least 2 and within --rows")
+    asyncio.run(run(args))
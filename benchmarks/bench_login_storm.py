@@ -0,0 +1,60 @@
+"""
+/health latency while a burst of logins is being checked
+
+Each bcrypt check costs a few hundred milliseconds of CPU. Run inside the
+async handler, a burst of logins holds the event loop and every other
+request waits behind it. /health is polled idle first, then through the
+storm. Compare with a checkout from before password hashing moved to its
+own thread pool:
+
+    git worktree add /tmp/xfood-inline-bcrypt 1e7b3ec7~1
+    python benchmarks/bench_login_storm.py --root /tmp/xfood-inline-bcrypt --port 8767
+    python benchmarks/bench_login_storm.py
+"""
+import asyncio
+import time
+import httpx
+from common import parser, register, running_server, sample_latency, summary
+
+EMAIL = "storm@example.com"
+PASSWORD = "password123"
+
+
+async def run(args) -> None:
+    async with running_server(args.root, args.port) as server:
+        async with httpx.AsyncClient(base_url=server.base_url, timeout=120, trust_env=False) as client:
+            await register(client, EMAIL, PASSWORD)
+
+            stop = asyncio.Event()
+            probe = asyncio.create_task(sample_latency(client, ["/health"], stop))
+            await asyncio.sleep(args.idle_seconds)
+            stop.set()
+            idle = (await probe)["/health"]
+
+            async def login():
+                try:
+                    response = await client.post("/api/v1/auth/login", json={"email": EMAIL, "password": PASSWORD})
+                except httpx.HTTPError as e:
+                    return type(e).__name__
+                return response.status_code
+
+            stop = asyncio.Event()
+            probe = asyncio.create_task(sample_latency(client, ["/health"], stop))
+            start = time.perf_counter()
+            results = await asyncio.gather(*[login() for _ in range(args.logins)])
+            elapsed = time.perf_counter() - start
+            stop.set()
+            storm = (await probe)["/health"]
+
+    outcomes = {result: results.count(result) for result in set(results)}
+    print(f"root: {args.root}")
+    print(f"{args.logins} concurrent logins in {elapsed:.1f}s: {outcomes}")
+    print(f"/health idle:         {summary(idle)}")
+    print(f"/health during storm: {summary(storm)}")
+
+
+if __name__ == "__main__":
+    cli = parser(__doc__)
+    cli.add_argument("--logins", type=int, default=20, help="logins sent at once")
+    cli.add_argument("--idle-seconds", type=float, default=2.0, help="how long to sample /health before the storm")
+    asyncio.run(run(cli.parse_args()))
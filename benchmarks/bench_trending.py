@@ -0,0 +1,98 @@
+"""
+Trending bakes query on a large bakes table, old ranking versus trending_score
+
+The old endpoint sorted every bake by like_count + comment_count, an
+expression no index covers, so each request read the whole table. The
+trending_score column is kept up to date as engagement is counted and read
+back through idx_bakes_trending. Both queries are timed against the same
+seeded database, followed by the endpoint itself. (Before the change the
+route was declared after /{bake_id}, which shadowed it with a 422, so
+there is no old endpoint to time over HTTP.)
+
+    python benchmarks/bench_trending.py --rows 1000000
+"""
+import asyncio
+import math
+import random
+import time
+from datetime import datetime, timedelta
+import httpx
+from common import parser, register, running_server, summary
+
+# calculate_trending_score with the default TRENDING_DECAY_SECONDS
+TRENDING_EPOCH = datetime(2024, 1, 1)
+DECAY_SECONDS = 45000
+
+OLD_QUERY = "SELECT * FROM bakes ORDER BY like_count + comment_count DESC LIMIT 20"
+NEW_QUERY = "SELECT * FROM bakes ORDER BY trending_score DESC, id DESC LIMIT 20"
+
+
+def trending_score(like_count: int, comment_count: int, created_at: datetime) -> float:
+    engagement = like_count + 2.0 * comment_count
+    return round(math.log10(max(engagement, 1.0)) + (created_at - TRENDING_EPOCH).total_seconds() / DECAY_SECONDS, 6)
+
+
+def seed(server, rows: int) -> None:
+    """A year of bakes with long-tailed like and comment counts"""
+    statement = (
+        "INSERT INTO bakes (title, description, category, price_cents, created_by, tags, allergens, available_for_order, "
+        "rating, review_count, like_count, comment_count, created_at, trending_score) "
+        "VALUES (?, 'A loaf', 'bread', 500, 1, '[]', '[]', 1, 0, 0, ?, ?, ?, ?)"
+    )
+
+    rng = random.Random(9)
+    now = datetime(2026, 1, 1)
+    batch = 100_000
+    for first in range(0, rows, batch):
+        values = []
+        for n in range(first, min(rows, first + batch)):
+            created_at = now - timedelta(seconds=rng.randint(0, 365 * 86400))
+            like_count = int(rng.paretovariate(1.2)) - 1
+            comment_count = int(rng.paretovariate(1.5)) - 1
+            values.append((
+                f"Bake {n}", like_count, comment_count, str(created_at),
+                trending_score(like_count, comment_count, created_at)
+            ))
+        server.sql(statement, values)
+    server.sql("ANALYZE")
+
+
+def time_query(server, statement: str, repeat: int) -> list:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        server.query(statement)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def run(args) -> None:
+    async with running_server(args.root, args.port) as server:
+        async with httpx.AsyncClient(base_url=server.base_url, timeout=300, trust_env=False) as client:
+            await register(client)
+            seed(server, args.rows)
+            plan = server.query("EXPLAIN QUERY PLAN " + NEW_QUERY)
+
+            old_query = time_query(server, OLD_QUERY, args.repeat)
+            new_query = time_query(server, NEW_QUERY, args.repeat)
+
+            (await client.get("/api/v1/bakes/trending?limit=20")).raise_for_status()  # warm up
+            endpoint = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                response = await client.get("/api/v1/bakes/trending?limit=20")
+                response.raise_for_status()
+                endpoint.append((time.perf_counter() - start) * 1000)
+
+    print(f"{args.rows} bakes, top 20")
+    print(f"like_count + comment_count sort: {summary(old_query)}")
+    print(f"trending_score index:            {summary(new_query)}")
+    print(f"  plan: {'; '.join(step[-1] for step in plan)}")
+    print(f"/api/v1/bakes/trending:          {summary(endpoint)}")
+
+
+if __name__ == "__main__":
+    cli = parser(__doc__)
+    cli.add_argument("--rows", type=int, default=1_000_000, help="bakes to seed")
+    cli.add_argument("--repeat", type=int, default=20, help="requests to time")
+    asyncio.run(run(cli.parse_args()))
@@ -0,0 +1,55 @@
+"""
+Latency of cheap endpoints while large image uploads are being processed
+
+Decoding and resizing a photo takes hundreds of milliseconds of CPU. Done
+inside the request handler it holds the event loop, and every other
+request on the worker waits behind it. The uploads below run concurrently
+while /health and /api/v1/bakes/ are probed in a loop. Compare with a
+checkout from before the image process pool:
+
+    python benchmarks/bench_upload_concurrency.py --root /tmp/xfood-before --port 8767
+    python benchmarks/bench_upload_concurrency.py
+"""
+import asyncio
+import time
+import httpx
+from common import make_jpeg, parser, register, running_server, sample_latency, summary
+
+PROBE_PATHS = ["/health", "/api/v1/bakes/"]
+
+
+async def run(args) -> None:
+    async with running_server(args.root, args.port) as server:
+        photo = make_jpeg(server.database.parent / "photo.jpg", args.megabytes)
+        async with httpx.AsyncClient(base_url=server.base_url, timeout=600, trust_env=False) as client:
+            headers = await register(client)
+
+            async def upload(n: int):
+                try:
+                    response = await client.post(
+                        "/api/v1/upload/image", headers=headers, files={"file": (f"{n}.jpg", photo, "image/jpeg")}
+                    )
+                except httpx.HTTPError as e:
+                    return type(e).__name__
+                return response.status_code
+
+            stop = asyncio.Event()
+            probe = asyncio.create_task(sample_latency(client, PROBE_PATHS, stop, interval=0.05))
+            start = time.perf_counter()
+            results = await asyncio.gather(*[upload(n) for n in range(args.uploads)])
+            elapsed = time.perf_counter() - start
+            stop.set()
+            latencies = await probe
+
+    outcomes = {result: results.count(result) for result in set(results)}
+    print(f"root: {args.root}")
+    print(f"{args.uploads} uploads of {len(photo) / 1_000_000:.1f}MB in {elapsed:.1f}s: {outcomes}")
+    for path in PROBE_PATHS:
+        print(f"{path + ':':<16} {summary(latencies[path])}")
+
+
+if __name__ == "__main__":
+    cli = parser(__doc__)
+    cli.add_argument("--uploads", type=int, default=50, help="uploads sent at once")
+    cli.add_argument("--megabytes", type=float, default=8.0, help="approximate size of each upload")
+    asyncio.run(run(cli.parse_args()))
@@ -0,0 +1,114 @@
+"""
+Peak memory of the API server while it takes many large uploads at once
+
+When each upload is read into a buffer, handed to the image worker and
+re-encoded into another buffer, memory grows with every upload in flight.
+Streamed to disk, it stays near the idle footprint. RSS of the server and
+its image worker processes is sampled from /proc, so this runs on Linux
+only. Compare with a checkout from before uploads were streamed:
+
+    git worktree add /tmp/xfood-buffered 9100b546~1
+    python benchmarks/bench_upload_memory.py --root /tmp/xfood-buffered --port 8767
+    python benchmarks/bench_upload_memory.py
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, List
+import httpx
+from common import make_jpeg, parser, register, running_server
+
+
+def descendants(pid: int) -> List[int]:
+    """pid and every process below it"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as stat:
+                    # The command name may contain spaces; the parent pid is the second field after it
+                    parent = int(stat.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(parent, []).append(int(entry))
+    found, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        found.append(current)
+        pending.extend(children.get(current, []))
+    return found
+
+
+def rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+class PeakRSS(threading.Thread):
+    """Track the peak RSS of a server process and of its children, sampled every 20ms"""
+
+    def __init__(self, pid: int):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.server = self.workers = self.total = 0.0
+        self.stopped = threading.Event()
+
+    def sample(self):
+        server = rss_mb(self.pid)
+        workers = sum(rss_mb(child) for child in descendants(self.pid) if child != self.pid)
+        return server, workers
+
+    def run(self):
+        while not self.stopped.is_set():
+            server, workers = self.sample()
+            self.server = max(self.server, server)
+            self.workers = max(self.workers, workers)
+            self.total = max(self.total, server + workers)
+            time.sleep(0.02)
+
+
+async def run(args) -> None:
+    # A long queue timeout, so every upload is processed instead of shed with a 503
+    async with running_server(args.root, args.port, IMAGE_QUEUE_TIMEOUT="600") as server:
+        photo = make_jpeg(server.database.parent / "photo.jpg", args.megabytes)
+        limits = httpx.Limits(max_connections=args.uploads + 10)
+        async with httpx.AsyncClient(base_url=server.base_url, timeout=1200, limits=limits, trust_env=False) as client:
+            headers = await register(client)
+            peak = PeakRSS(server.process.pid)
+            idle_server, idle_workers = peak.sample()
+
+            async def upload(n: int):
+                try:
+                    response = await client.post(
+                        "/api/v1/upload/image", headers=headers, files={"file": (f"{n}.jpg", photo, "image/jpeg")}
+                    )
+                except httpx.HTTPError as e:
+                    return type(e).__name__
+                return response.status_code
+
+            peak.start()
+            start = time.perf_counter()
+            results = await asyncio.gather(*[upload(n) for n in range(args.uploads)])
+            elapsed = time.perf_counter() - start
+            peak.stopped.set()
+            peak.join()
+
+    outcomes = {result: results.count(result) for result in set(results)}
+    print(f"root: {args.root}")
+    print(f"{args.uploads} uploads of {len(photo) / 1_000_000:.1f}MB in {elapsed:.1f}s: {outcomes}")
+    print(f"idle RSS: server {idle_server:.0f}MB, workers {idle_workers:.0f}MB")
+    print(f"peak RSS: server {peak.server:.0f}MB, workers {peak.workers:.0f}MB, total {peak.total:.0f}MB")
+
+
+if __name__ == "__main__":
+    cli = parser(__doc__)
+    cli.add_argument("--uploads", type=int, default=100, help="uploads sent at once")
+    cli.add_argument("--megabytes", type=float, default=8.0, help="approximate size of each upload")
+    asyncio.run(run(cli.parse_args()))
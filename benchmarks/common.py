@@ -0,0 +1,160 @@
+"""
+Shared helpers for the benchmark scripts
+
+Each benchmark starts the API with uvicorn from a source tree (this
+checkout by default) against a throwaway SQLite database, drives it over
+HTTP and prints latency percentiles. Point --root at a second checkout, e.g.
+one made with `git worktree add`, to compare against an older commit.
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+import httpx
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def parser(description: str) -> argparse.ArgumentParser:
+    """Command line options every benchmark accepts"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--root", type=Path, default=REPO_ROOT, help="source tree to benchmark (default: this checkout)")
+    parser.add_argument("--port", type=int, default=8765, help="port for the API server")
+    return parser
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summary(samples: Sequence[float]) -> str:
+    """One-line latency summary in milliseconds"""
+    if not samples:
+        return "n=0"
+    return (
+        f"n={len(samples)} p50={percentile(samples, 0.5):.1f}ms p95={percentile(samples, 0.95):.1f}ms "
+        f"p99={percentile(samples, 0.99):.1f}ms max={max(samples):.1f}ms"
+    )
+
+
+def status_counts(responses: Sequence[httpx.Response]) -> Dict[int, int]:
+    counts: Dict[int, int] = {}
+    for response in responses:
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+    return counts
+
+
+class Server:
+    """A running API server and its database file"""
+
+    def __init__(self, process: subprocess.Popen, base_url: str, database: Path):
+        self.process = process
+        self.base_url = base_url
+        self.database = database
+
+    def sql(self, statement: str, rows: Optional[Sequence[Sequence]] = None) -> None:
+        """Run a statement directly against the server's SQLite database"""
+        connection = sqlite3.connect(self.database, timeout=60)
+        try:
+            if rows is None:
+                connection.execute(statement)
+            else:
+                connection.executemany(statement, rows)
+            connection.commit()
+        finally:
+            connection.close()
+
+    def query(self, statement: str) -> List[tuple]:
+        """Read rows directly from the server's SQLite database"""
+        connection = sqlite3.connect(self.database, timeout=60)
+        try:
+            return connection.execute(statement).fetchall()
+        finally:
+            connection.close()
+
+
+@asynccontextmanager
+async def running_server(root: Path, port: int, **env: str) -> AsyncIterator[Server]:
+    """Start uvicorn for the tree at root and stop it on exit
+
+    Extra keyword arguments become environment variables of the server.
+    """
+    workdir = Path(tempfile.mkdtemp(prefix="xfood-bench-"))
+    database = workdir / "bench.db"
+    server_env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{database}",
+        SECRET_KEY="benchmark-secret-key",
+        CELERY_TASK_ALWAYS_EAGER="true",
+        AWS_ACCESS_KEY_ID="",
+        AWS_SECRET_ACCESS_KEY="",
+        STRIPE_SECRET_KEY="",
+        PYTHONPATH=str(root),
+        **env,
+    )
+    log = open(workdir / "server.log", "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=server_env, stdout=log, stderr=subprocess.STDOUT
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, trust_env=False) as client:
+            for _ in range(300):
+                if process.poll() is not None:
+                    raise RuntimeError(f"Server exited; see {workdir / 'server.log'}")
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError(f"Server did not start; see {workdir / 'server.log'}")
+        yield Server(process, base_url, database)
+    finally:
+        process.terminate()
+        process.wait()
+        log.close()
+
+
+def make_jpeg(path: Path, megabytes: float) -> bytes:
+    """Write a noise JPEG of roughly the given size, which compresses about as badly as a phone photo"""
+    from PIL import Image
+
+    side = int((megabytes * 1_000_000 / 0.9) ** 0.5)  # quality 90 noise takes ~0.9 bytes per pixel
+    Image.frombytes("RGB", (side, side), os.urandom(side * side * 3)).save(path, "JPEG", quality=90)
+    return path.read_bytes()
+
+
+async def register(client: httpx.AsyncClient, email: Optional[str] = None, password: str = "password123") -> Dict[str, str]:
+    """Register a user and return headers that authenticate as them"""
+    email = email or f"bench-{time.time_ns()}@example.com"
+    response = await client.post("/api/v1/auth/register", json={"email": email, "full_name": "Bench", "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def sample_latency(client: httpx.AsyncClient, paths: Sequence[str], stop: asyncio.Event,
+                         interval: float = 0.02) -> Dict[str, List[float]]:
+    """Request each path in turn until stop is set, recording latencies in milliseconds"""
+    latencies: Dict[str, List[float]] = {path: [] for path in paths}
+    while not stop.is_set():
+        for path in paths:
+            start = time.perf_counter()
+            try:
+                await client.get(path)
+            except httpx.HTTPError:
+                pass  # a dropped or timed out probe still counts at its full latency
+            latencies[path].append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
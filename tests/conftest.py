@@ -0,0 +1,87 @@
+"""
+Shared test fixtures
+
+Settings and the database engines are built when app.core.config and
+app.db.database are imported, so the environment is pointed at a
+throwaway SQLite database before any app module is loaded.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+TEST_DIR = Path(tempfile.mkdtemp(prefix="xfood-tests-"))
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DIR / 'test.db'}"
+os.environ["SECRET_KEY"] = "test-secret-key"
+os.environ["DATABASE_REPLICA_URLS"] = "[]"
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+os.environ["COUNTER_WRITE_BEHIND"] = "false"
+os.environ["CELERY_TASK_ALWAYS_EAGER"] = "true"
+os.environ["AWS_ACCESS_KEY_ID"] = ""
+os.environ["AWS_SECRET_ACCESS_KEY"] = ""
+os.environ["AWS_S3_ENDPOINT_URL"] = ""
+os.environ["UPLOAD_TMP_DIR"] = str(TEST_DIR)
+
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.core.security import create_access_token
+from app.db.database import engine, get_async_database_url
+from app.db.migrate import run_migrations
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    """Bring the test database to the latest revision once per run"""
+    run_migrations()
+    return os.environ["DATABASE_URL"]
+
+
+@pytest.fixture
+async def session_factory(migrated_database):
+    """Sessions on their own engine, bound to the running test's event loop
+
+    Like the API's Postgres engines it queues sessions on a bounded pool.
+    SQLite connections wait up to 30 seconds for the write lock instead of
+    failing at once with "database is locked" when tests write concurrently.
+    """
+    engine = create_async_engine(
+        get_async_database_url(migrated_database),
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=10,
+        max_overflow=0,
+        pool_timeout=60,
+        connect_args={"timeout": 30},
+    )
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def client(migrated_database):
+    """The API, with its startup and shutdown hooks run around the session"""
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(migrated_database):
+    """Create a user and return its id and the headers that authenticate as it"""
+    from app.models.user import User
+
+    def make_user(role: str = "user"):
+        email = f"{role}-{uuid.uuid4().hex}@example.com"
+        with engine.begin() as connection:
+            user_id = connection.scalar(
+                insert(User).values(email=email, full_name="Test Baker", hashed_password="x", role=role, is_active=True)
+                .returning(User.id)
+            )
+        token = create_access_token(subject=email, user_id=user_id, role=role)
+        return user_id, {"Authorization": f"Bearer {token}"}
+
+    return make_user
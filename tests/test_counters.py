@@ -0,0 +1,119 @@
+"""
+Like counters stay exact under concurrent likes and unlikes
+"""
+import asyncio
+import uuid
+import pytest
+from sqlalchemy import func, insert, select
+from app.models import Bake, Like, User
+from app.services.like_service import like_item, unlike_item
+
+LIKERS = 1000
+
+
+async def _create_users(session_factory, count: int):
+    """Insert count users and return their ids"""
+    batch = uuid.uuid4().hex
+    async with session_factory() as db:
+        ids = (await db.scalars(
+            insert(User).returning(User.id),
+            [
+                {"email": f"liker-{batch}-{n}@example.com", "full_name": f"Liker {n}", "hashed_password": "x"}
+                for n in range(count)
+            ],
+        )).all()
+        await db.commit()
+    return list(ids)
+
+
+async def _create_bake(session_factory, owner_id: int) -> int:
+    async with session_factory() as db:
+        bake = Bake(
+            title="Sourdough", description="Crusty", category="bread",
+            price_cents=500, created_by=owner_id, like_count=0,
+        )
+        db.add(bake)
+        await db.commit()
+        return bake.id
+
+
+async def _counts(session_factory, bake_id: int):
+    """The bake's like_count and the number of like rows pointing at it"""
+    async with session_factory() as db:
+        like_count = await db.scalar(select(Bake.like_count).where(Bake.id == bake_id))
+        rows = await db.scalar(select(func.count()).select_from(Like).where(Like.bake_id == bake_id))
+    return like_count, rows
+
+
+async def _like(session_factory, user_id: int, bake_id: int):
+    async with session_factory() as db:
+        like = await like_item(db, user_id, "bake", bake_id)
+        await db.commit()
+        return like
+
+
+async def _unlike(session_factory, user_id: int, bake_id: int) -> bool:
+    async with session_factory() as db:
+        removed = await unlike_item(db, user_id, "bake", bake_id)
+        await db.commit()
+        return removed
+
+
+async def test_parallel_likes_are_all_counted(session_factory):
+    user_ids = await _create_users(session_factory, LIKERS)
+    bake_id = await _create_bake(session_factory, user_ids[0])
+
+    likes = await asyncio.gather(*(_like(session_factory, user_id, bake_id) for user_id in user_ids))
+
+    assert all(like is not None for like in likes)
+    assert await _counts(session_factory, bake_id) == (LIKERS, LIKERS)
+
+
+async def test_parallel_repeat_likes_count_once(session_factory):
+    user_ids = await _create_users(session_factory, 1)
+    bake_id = await _create_bake(session_factory, user_ids[0])
+
+    likes = await asyncio.gather(*(_like(session_factory, user_ids[0], bake_id) for _ in range(50)))
+
+    assert sum(like is not None for like in likes) == 1
+    assert await _counts(session_factory, bake_id) == (1, 1)
+
+
+async def test_unlikes_never_take_the_count_below_zero(session_factory):
+    user_ids = await _create_users(session_factory, 10)
+    bake_id = await _create_bake(session_factory, user_ids[0])
+    for user_id in user_ids:
+        await _like(session_factory, user_id, bake_id)
+
+    # Every liker unlikes several times at once; only one removal each can count
+    removed = await asyncio.gather(*(
+        _unlike(session_factory, user_id, bake_id) for user_id in user_ids for _ in range(5)
+    ))
+
+    assert sum(removed) == len(user_ids)
+    assert await _counts(session_factory, bake_id) == (0, 0)
+    assert await _unlike(session_factory, user_ids[0], bake_id) is False
+    assert await _counts(session_factory, bake_id) == (0, 0)
+
+
+async def test_unlike_leaves_a_drifted_zero_count_alone(session_factory):
+    user_ids = await _create_users(session_factory, 1)
+    bake_id = await _create_bake(session_factory, user_ids[0])
+    await _like(session_factory, user_ids[0], bake_id)
+    async with session_factory() as db:
+        # A count that has drifted below its like rows, e.g. from a manual edit
+        bake = await db.get(Bake, bake_id)
+        bake.like_count = 0
+        await db.commit()
+
+    assert await _unlike(session_factory, user_ids[0], bake_id) is True
+    assert await _counts(session_factory, bake_id) == (0, 0)
+
+
+async def test_liking_a_missing_bake_is_a_404(session_factory):
+    user_ids = await _create_users(session_factory, 1)
+
+    with pytest.raises(Exception) as raised:
+        await _like(session_factory, user_ids[0], 10 ** 9)
+
+    assert getattr(raised.value, "status_code", None) == 404
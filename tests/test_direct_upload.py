@@ -0,0 +1,155 @@
+"""
+Presigned direct uploads against an in-process S3 stand-in (moto)
+"""
+import importlib
+import io
+import boto3
+import pytest
+import requests
+from PIL import Image
+from sqlalchemy import insert, select
+from app.core.config import settings
+from app.db.database import engine
+from app.models import Bake
+from app.services import storage_service
+
+moto = pytest.importorskip("moto")
+upload_api = importlib.import_module("app.api.upload.upload")
+
+DIRECT = f"{settings.API_PREFIX}/upload/direct"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    """Point the storage layer at a mocked bucket
+
+    The S3 client is built from settings at import, so the test swaps it
+    for one inside moto's mock; against MinIO or another stand-in, set
+    AWS_S3_ENDPOINT_URL and credentials instead.
+    """
+    with moto.mock_aws():
+        client = boto3.client(
+            "s3",
+            region_name=settings.AWS_REGION,
+            aws_access_key_id="testing",
+            aws_secret_access_key="testing",
+        )
+        client.create_bucket(Bucket=settings.AWS_S3_BUCKET)
+        monkeypatch.setattr(storage_service, "s3_client", client)
+        monkeypatch.setattr(upload_api, "s3_client", client)
+        yield client
+
+
+def _keys(s3, prefix: str):
+    response = s3.list_objects_v2(Bucket=settings.AWS_S3_BUCKET, Prefix=prefix)
+    return sorted(item["Key"] for item in response.get("Contents", []))
+
+
+def _jpeg(width: int = 1600, height: int = 1200) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 120, 40)).save(output, "JPEG")
+    return output.getvalue()
+
+
+def _create_bake(owner_id: int) -> int:
+    with engine.begin() as connection:
+        return connection.scalar(
+            insert(Bake).values(
+                title="Croissant", description="Flaky", category="pastry", price_cents=350, created_by=owner_id
+            ).returning(Bake.id)
+        )
+
+
+def _upload(client, headers, body: bytes, **ticket):
+    """Request a presigned URL and PUT the body straight to storage"""
+    response = client.post(DIRECT, json={"content_type": "image/jpeg", "size": len(body), **ticket}, headers=headers)
+    assert response.status_code == 201, response.text
+    ticket = response.json()
+    assert ticket["method"] == "PUT"
+    put = requests.put(ticket["url"], data=body, headers=ticket["headers"])
+    assert put.status_code == 200, put.text
+    return ticket["upload_id"]
+
+
+def test_direct_upload_is_processed_and_attached(client, make_user, s3):
+    user_id, headers = make_user()
+    bake_id = _create_bake(user_id)
+
+    upload_id = _upload(client, headers, _jpeg(), target="bake", target_id=bake_id)
+    assert _keys(s3, settings.DIRECT_UPLOAD_PREFIX) == [f"{settings.DIRECT_UPLOAD_PREFIX}{upload_id}"]
+
+    response = client.post(f"{DIRECT}/{upload_id}/complete", headers=headers)
+
+    assert response.status_code == 202, response.text
+    upload = response.json()
+    assert upload["status"] == "completed"
+    variants = upload["result"]["variants"]
+    assert set(variants) == {"thumb", "card", "full"}
+    stored = _keys(s3, "images/")
+    for formats in variants.values():
+        for url in formats.values():
+            assert url.split(".amazonaws.com/", 1)[1] in stored
+    # The incoming object is gone once its variants are stored
+    assert _keys(s3, settings.DIRECT_UPLOAD_PREFIX) == []
+
+    with engine.connect() as connection:
+        bake = connection.execute(select(Bake.image_url, Bake.image_variants).where(Bake.id == bake_id)).one()
+    assert bake.image_url == upload["result"]["url"]
+    assert bake.image_variants == variants
+
+    # Completing again changes nothing
+    again = client.post(f"{DIRECT}/{upload_id}/complete", headers=headers)
+    assert again.status_code == 202
+    assert again.json()["status"] == "completed"
+    assert again.json()["result"] == upload["result"]
+    assert again.json()["updated_at"] == upload["updated_at"]
+    assert _keys(s3, "images/") == stored
+
+    status = client.get(f"{DIRECT}/{upload_id}", headers=headers)
+    assert status.json()["status"] == "completed"
+
+
+def test_non_image_upload_fails(client, make_user, s3):
+    _user_id, headers = make_user()
+
+    upload_id = _upload(client, headers, b"%PDF-1.4 definitely not a jpeg")
+    response = client.post(f"{DIRECT}/{upload_id}/complete", headers=headers)
+
+    assert response.status_code == 202
+    assert response.json()["status"] == "failed"
+    assert response.json()["error"] == "Invalid image file"
+    assert _keys(s3, settings.DIRECT_UPLOAD_PREFIX) == []
+    assert client.post(f"{DIRECT}/{upload_id}/complete", headers=headers).json()["status"] == "failed"
+
+
+def test_completion_before_the_upload_is_refused(client, make_user, s3):
+    _user_id, headers = make_user()
+
+    response = client.post(DIRECT, json={"content_type": "image/jpeg"}, headers=headers)
+    upload_id = response.json()["upload_id"]
+
+    response = client.post(f"{DIRECT}/{upload_id}/complete", headers=headers)
+    assert response.status_code == 400
+    assert client.get(f"{DIRECT}/{upload_id}", headers=headers).json()["status"] == "pending"
+
+
+def test_uploads_belong_to_their_user(client, make_user, s3):
+    _owner_id, owner_headers = make_user()
+    _other_id, other_headers = make_user()
+
+    upload_id = _upload(client, owner_headers, _jpeg(64, 64))
+
+    assert client.post(f"{DIRECT}/{upload_id}/complete", headers=other_headers).status_code == 404
+    assert client.get(f"{DIRECT}/{upload_id}", headers=other_headers).status_code == 404
+
+
+def test_only_the_creator_can_target_a_bake(client, make_user, s3):
+    owner_id, _owner_headers = make_user()
+    _other_id, other_headers = make_user()
+    bake_id = _create_bake(owner_id)
+
+    response = client.post(
+        DIRECT, json={"content_type": "image/jpeg", "target": "bake", "target_id": bake_id}, headers=other_headers
+    )
+
+    assert response.status_code == 403
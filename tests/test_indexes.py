@@ -0,0 +1,153 @@
+"""
+Hot query shapes from migration 0002 are served by its indexes
+
+Each query is built the way the routers build it and run through the
+database's EXPLAIN. SQLite is always checked; PostgreSQL is checked too
+when DATABASE_TEST_URL points at one (the tables are migrated there first).
+"""
+from datetime import datetime
+import pytest
+from alembic import command
+from sqlalchemy import create_engine, func, select, text
+from app.core.config import settings
+from app.core.pagination import encode_cursor, paginate_keyset
+from app.db.database import engine
+from app.db.migrate import get_alembic_config
+from app.models import Bake, Comment, Like, Message, Recipe, Review, User
+
+CURSOR = encode_cursor(datetime(2026, 1, 1), 10)
+
+
+def _page(query, model, cursor=None):
+    return paginate_keyset(query, model, cursor).limit(20)
+
+
+def _conversation():
+    return select(Message).filter(
+        ((Message.sender_id == 1) & (Message.receiver_id == 2)) |
+        ((Message.sender_id == 2) & (Message.receiver_id == 1))
+    )
+
+
+# (query, table, index the plan must use)
+HOT_QUERIES = {
+    "like-by-user-on-bake": (
+        select(Like.id).filter(Like.user_id == 1, Like.bake_id == 2),
+        "likes", "idx_likes_user_bake",
+    ),
+    "like-by-user-on-recipe": (
+        select(Like.id).filter(Like.user_id == 1, Like.recipe_id == 2),
+        "likes", "idx_likes_user_recipe",
+    ),
+    "bake-comments": (
+        _page(select(Comment).filter(Comment.bake_id == 1), Comment),
+        "comments", "idx_comments_bake_created_at_id",
+    ),
+    "bake-comments-next-page": (
+        _page(select(Comment).filter(Comment.bake_id == 1), Comment, CURSOR),
+        "comments", "idx_comments_bake_created_at_id",
+    ),
+    "recipe-comments": (
+        _page(select(Comment).filter(Comment.recipe_id == 1), Comment),
+        "comments", "idx_comments_recipe_created_at_id",
+    ),
+    "unread-count": (
+        select(func.count()).select_from(Message).filter(Message.receiver_id == 1, Message.is_read == False),
+        "messages", "idx_messages_receiver_is_read",
+    ),
+    "inbox": (
+        _page(select(Message).filter(Message.receiver_id == 1), Message, CURSOR),
+        "messages", "idx_messages_receiver_created_at_id",
+    ),
+    "sent": (
+        _page(select(Message).filter(Message.sender_id == 1), Message, CURSOR),
+        "messages", "idx_messages_sender_created_at_id",
+    ),
+    "conversation": (
+        _page(_conversation(), Message, CURSOR),
+        "messages", "idx_messages_conversation_created_at_id",
+    ),
+    "bakes-by-creator": (
+        _page(select(Bake).filter(Bake.created_by == 1), Bake),
+        "bakes", "idx_bakes_created_by_created_at",
+    ),
+    "recipes-by-category": (
+        _page(select(Recipe).filter(Recipe.category == "bread"), Recipe),
+        "recipes", "idx_recipes_category_created_at",
+    ),
+    "reviews-of-item": (
+        select(Review).filter(Review.item_type == "recipe", Review.item_id == 1),
+        "reviews", "idx_reviews_item",
+    ),
+    "bake-likes": (
+        _page(select(Like).filter(Like.bake_id == 1), Like, CURSOR),
+        "likes", "idx_likes_bake_created_at_id",
+    ),
+    "recipe-likes": (
+        _page(select(Like).filter(Like.recipe_id == 1), Like, CURSOR),
+        "likes", "idx_likes_recipe_created_at_id",
+    ),
+    "bakes-feed": (_page(select(Bake), Bake), "bakes", "idx_bakes_created_at_id"),
+    "bakes-feed-next-page": (_page(select(Bake), Bake, CURSOR), "bakes", "idx_bakes_created_at_id"),
+    "recipes-feed-next-page": (_page(select(Recipe), Recipe, CURSOR), "recipes", "idx_recipes_created_at_id"),
+    "users-next-page": (_page(select(User), User, CURSOR), "users", "idx_users_created_at_id"),
+}
+
+
+def _sql(connection, query) -> str:
+    return str(query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_sqlite_plan_uses_index(name):
+    query, table, index = HOT_QUERIES[name]
+    with engine.connect() as connection:
+        plan = [row.detail for row in connection.execute(text("EXPLAIN QUERY PLAN " + _sql(connection, query)))]
+
+    assert any(index in step for step in plan), plan
+    # "SCAN <table> USING INDEX" walks an index in order and stops at the LIMIT;
+    # a bare "SCAN <table>" reads every row
+    assert not {f"SCAN {table}", f"SCAN TABLE {table}"}.intersection(plan), plan
+
+
+@pytest.fixture(scope="module")
+def postgres():
+    url = settings.DATABASE_TEST_URL
+    if not url or not url.startswith(("postgres://", "postgresql")):
+        pytest.skip("DATABASE_TEST_URL is not a PostgreSQL database")
+    pg_engine = create_engine(url.replace("postgres://", "postgresql://", 1))
+    config = get_alembic_config()
+    with pg_engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+    yield pg_engine
+    pg_engine.dispose()
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_postgres_plan_uses_index(postgres, name):
+    query, table, index = HOT_QUERIES[name]
+    with postgres.connect() as connection:
+        # The test tables are nearly empty, where a sequential scan is always cheapest
+        connection.execute(text("SET enable_seqscan = off"))
+        plan = [row[0] for row in connection.execute(text("EXPLAIN " + _sql(connection, query)))]
+
+    assert any(index in step for step in plan), plan
+    assert not any(f"Seq Scan on {table}" in step for step in plan), plan
+
+
+# Pages after the first must seek into the index at the cursor, not walk it from the top.
+# The conversation query is a MULTI-INDEX OR of the two directions, so it is left out.
+NEXT_PAGES = [
+    "bake-comments-next-page", "inbox", "sent", "bake-likes", "recipe-likes",
+    "bakes-feed-next-page", "recipes-feed-next-page", "users-next-page",
+]
+
+
+@pytest.mark.parametrize("name", NEXT_PAGES)
+def test_sqlite_cursor_seeks_into_index(name):
+    query, table, index = HOT_QUERIES[name]
+    with engine.connect() as connection:
+        plan = [row.detail for row in connection.execute(text("EXPLAIN QUERY PLAN " + _sql(connection, query)))]
+
+    assert any(index in step and "created_at<" in step for step in plan), plan
@@ -0,0 +1,228 @@
+"""
+Google/Apple ID token verification against a locally served key set
+"""
+import time
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+from app.core import http_client
+from app.core.config import settings
+from app.services import oauth_service
+from app.services.oauth_service import (
+    JWKSVerifier,
+    InvalidIDToken,
+    SigningKeysUnavailable,
+    JWKS_FORCED_REFRESH_INTERVAL,
+    verify_apple_id_token,
+    verify_google_id_token,
+)
+
+JWKS_URL = "https://keys.example.com/certs"
+ISSUER = "https://accounts.example.com"
+CLIENT_ID = "our-client-id.apps.example.com"
+
+
+class SigningKey:
+    """A local RSA key pair that signs ID tokens and publishes itself as a JWK"""
+
+    def __init__(self, kid: str):
+        self.kid = kid
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ).decode()
+        public_pem = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        ).decode()
+        self.public_jwk = {**jwk.construct(public_pem, "RS256").to_dict(), "kid": kid, "use": "sig"}
+
+    def sign(self, algorithm: str = "RS256", kid: str = None, **overrides) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": ISSUER,
+            "aud": CLIENT_ID,
+            "sub": "1234567890",
+            "email": "baker@example.com",
+            "email_verified": True,
+            "iat": now,
+            "exp": now + 600,
+            **overrides,
+        }
+        return jwt.encode(claims, self.private_pem, algorithm=algorithm, headers={"kid": kid or self.kid})
+
+
+class KeyServer:
+    """Serves a JWKS document through httpx.MockTransport and counts the fetches"""
+
+    def __init__(self, *keys: SigningKey):
+        self.keys = list(keys)
+        self.fetches = 0
+        self.failing = False
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        assert str(request.url) == JWKS_URL
+        self.fetches += 1
+        if self.failing:
+            return httpx.Response(503)
+        return httpx.Response(
+            200,
+            json={"keys": [key.public_jwk for key in self.keys]},
+            headers={"cache-control": "public, max-age=3600"},
+        )
+
+
+@pytest.fixture
+def key():
+    return SigningKey("key-1")
+
+
+@pytest.fixture
+def server(key, monkeypatch):
+    """A key server behind the shared HTTP client"""
+    server = KeyServer(key)
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(server.handler)))
+    return server
+
+
+@pytest.fixture
+def verifier(server):
+    return JWKSVerifier("Test", JWKS_URL, (ISSUER,))
+
+
+async def test_valid_token(verifier, key):
+    claims = await verifier.verify(key.sign(), [CLIENT_ID])
+
+    assert claims["sub"] == "1234567890"
+    assert claims["aud"] == CLIENT_ID
+
+
+async def test_any_configured_audience_is_accepted(verifier, key):
+    claims = await verifier.verify(key.sign(aud=["someone-else", CLIENT_ID]), ["ios-client", CLIENT_ID])
+
+    assert claims["sub"] == "1234567890"
+
+
+async def test_keys_are_cached_between_sign_ins(verifier, key, server):
+    for _ in range(5):
+        await verifier.verify(key.sign(), [CLIENT_ID])
+
+    assert server.fetches == 1
+
+
+@pytest.mark.parametrize("overrides", [
+    {"exp": int(time.time()) - 60},
+    {"iss": "https://accounts.evil.example.com"},
+    {"aud": "another-app.apps.example.com"},
+    {"aud": ["another-app.apps.example.com"]},
+], ids=["expired", "wrong-iss", "wrong-aud", "wrong-aud-list"])
+async def test_rejected_claims(verifier, key, overrides):
+    with pytest.raises(InvalidIDToken):
+        await verifier.verify(key.sign(**overrides), [CLIENT_ID])
+
+
+async def test_token_signed_by_another_key_with_a_known_kid(verifier, key):
+    impostor = SigningKey(key.kid)
+
+    with pytest.raises(InvalidIDToken):
+        await verifier.verify(impostor.sign(), [CLIENT_ID])
+
+
+async def test_algorithms_other_than_rs256_are_refused(verifier, key, server):
+    with pytest.raises(InvalidIDToken, match="Unsupported"):
+        await verifier.verify(key.sign(algorithm="RS512"), [CLIENT_ID])
+    hs256 = jwt.encode({"iss": ISSUER, "aud": CLIENT_ID, "exp": int(time.time()) + 600}, "secret", headers={"kid": key.kid})
+    with pytest.raises(InvalidIDToken, match="Unsupported"):
+        await verifier.verify(hs256, [CLIENT_ID])
+
+    # Refused from the header alone, before any key is fetched
+    assert server.fetches == 0
+
+
+async def test_malformed_token(verifier):
+    with pytest.raises(InvalidIDToken):
+        await verifier.verify("not-a-jwt", [CLIENT_ID])
+
+
+async def test_no_configured_audiences_rejects_every_token(verifier, key, server, monkeypatch):
+    with pytest.raises(InvalidIDToken):
+        await verifier.verify(key.sign(), [])
+
+    monkeypatch.setattr(settings, "GOOGLE_CLIENT_IDS", [])
+    monkeypatch.setattr(settings, "APPLE_CLIENT_IDS", [])
+    with pytest.raises(InvalidIDToken):
+        await verify_google_id_token(key.sign())
+    with pytest.raises(InvalidIDToken):
+        await verify_apple_id_token(key.sign())
+
+    assert server.fetches == 0
+
+
+async def test_unknown_kid_forces_at_most_one_refresh_per_interval(verifier, key, server):
+    await verifier.verify(key.sign(), [CLIENT_ID])
+    rotated = SigningKey("key-2")
+    server.keys.append(rotated)
+
+    # Keys were fetched moments ago: unknown kids cannot force another fetch yet
+    for _ in range(3):
+        with pytest.raises(InvalidIDToken, match="Unknown"):
+            await verifier.verify(rotated.sign(), [CLIENT_ID])
+    assert server.fetches == 1
+
+    verifier._fetched_at -= JWKS_FORCED_REFRESH_INTERVAL
+    claims = await verifier.verify(rotated.sign(), [CLIENT_ID])
+    assert claims["sub"] == "1234567890"
+    assert server.fetches == 2
+
+    # A kid the provider has never published is refused without a further fetch
+    stranger = SigningKey("key-3")
+    for _ in range(3):
+        with pytest.raises(InvalidIDToken, match="Unknown"):
+            await verifier.verify(stranger.sign(), [CLIENT_ID])
+    assert server.fetches == 2
+
+
+async def test_failed_refresh_keeps_the_cached_keys(verifier, key, server):
+    await verifier.verify(key.sign(), [CLIENT_ID])
+    server.failing = True
+    verifier._expires_at = 0.0
+
+    claims = await verifier.verify(key.sign(), [CLIENT_ID])
+
+    assert claims["sub"] == "1234567890"
+    assert server.fetches == 2
+    # The failure is not retried on every sign-in
+    await verifier.verify(key.sign(), [CLIENT_ID])
+    assert server.fetches == 2
+
+
+async def test_failed_fetch_without_cached_keys(verifier, key, server):
+    server.failing = True
+
+    with pytest.raises(SigningKeysUnavailable):
+        await verifier.verify(key.sign(), [CLIENT_ID])
+
+
+async def test_unreachable_key_server(verifier, key, monkeypatch):
+    def unreachable(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused", request=request)
+
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(unreachable)))
+
+    with pytest.raises(SigningKeysUnavailable):
+        await verifier.verify(key.sign(), [CLIENT_ID])
+
+
+async def test_google_requires_a_verified_email(key, server, monkeypatch):
+    monkeypatch.setattr(settings, "GOOGLE_CLIENT_IDS", [CLIENT_ID])
+    monkeypatch.setattr(
+        oauth_service, "google_verifier", JWKSVerifier("Google", JWKS_URL, (ISSUER,))
+    )
+
+    assert (await verify_google_id_token(key.sign()))["email"] == "baker@example.com"
+    with pytest.raises(InvalidIDToken, match="not verified"):
+        await verify_google_id_token(key.sign(email_verified=False))
@@ -0,0 +1,62 @@
+"""
+Role checks use both the token's role claim and the stored role
+"""
+from sqlalchemy import update
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.database import engine
+from app.models import User
+
+ADMIN_ONLY = f"{settings.API_PREFIX}/internal/db-pool"
+
+
+def _set_role(user_id: int, role: str):
+    with engine.begin() as connection:
+        connection.execute(update(User).where(User.id == user_id).values(role=role))
+
+
+def test_admin_token_for_an_admin(client, make_user):
+    _admin_id, headers = make_user("admin")
+
+    assert client.get(ADMIN_ONLY, headers=headers).status_code == 200
+
+
+def test_non_admins_are_refused(client, make_user):
+    for role in ("user", "baker"):
+        _user_id, headers = make_user(role)
+        assert client.get(ADMIN_ONLY, headers=headers).status_code == 403
+
+
+def test_promotion_waits_for_a_new_token(client, make_user):
+    user_id, headers = make_user("user")
+    _set_role(user_id, "admin")
+
+    # The token still claims the old role
+    assert client.get(ADMIN_ONLY, headers=headers).status_code == 403
+
+
+def test_demotion_takes_effect_immediately(client, make_user):
+    admin_id, admin_headers = make_user("admin")
+    _other_admin_id, other_admin_headers = make_user("admin")
+    assert client.get(ADMIN_ONLY, headers=admin_headers).status_code == 200
+
+    response = client.patch(
+        f"{settings.API_PREFIX}/users/{admin_id}/role", params={"role": "user"}, headers=other_admin_headers
+    )
+    assert response.status_code == 200, response.text
+
+    # The token still claims admin, but the stored role no longer agrees
+    assert client.get(ADMIN_ONLY, headers=admin_headers).status_code == 403
+
+
+def test_tokens_without_a_role_claim_use_the_stored_role(client, make_user):
+    user_id, _headers = make_user("admin")
+    _other_admin_id, other_admin_headers = make_user("admin")
+    email = f"legacy-{user_id}@example.com"
+    with engine.begin() as connection:
+        connection.execute(update(User).where(User.id == user_id).values(email=email))
+    legacy_headers = {"Authorization": f"Bearer {create_access_token(subject=email, user_id=user_id)}"}
+
+    assert client.get(ADMIN_ONLY, headers=legacy_headers).status_code == 200
+    client.patch(f"{settings.API_PREFIX}/users/{user_id}/role", params={"role": "baker"}, headers=other_admin_headers)
+    assert client.get(ADMIN_ONLY, headers=legacy_headers).status_code == 403
@@ -0,0 +1,52 @@
+"""
+Read-your-writes window: who is kept on the primary database
+"""
+import time
+from fastapi import Request
+from app.db.routing import PRIMARY_UNTIL_COOKIE, ReadYourWritesTracker
+
+WINDOW = 5
+
+
+def _request(cookie: str = None, authorization: str = "Bearer reader") -> Request:
+    headers = [(b"authorization", authorization.encode())]
+    if cookie is not None:
+        headers.append((b"cookie", f"{PRIMARY_UNTIL_COOKIE}={cookie}".encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "client": ("10.0.0.1", 4321)})
+
+
+def test_writer_is_pinned_for_the_window():
+    tracker = ReadYourWritesTracker(WINDOW, "secret")
+
+    tracker.record_write(_request(authorization="Bearer writer"))
+
+    assert tracker.wrote_recently(_request(authorization="Bearer writer"))
+    assert not tracker.wrote_recently(_request(authorization="Bearer someone-else"))
+
+
+def test_signed_cookie_pins_the_client_in_other_processes():
+    writer = ReadYourWritesTracker(WINDOW, "secret")
+    other_process = ReadYourWritesTracker(WINDOW, "secret")
+
+    cookie = writer.cookie_value(writer.record_write(_request()))
+
+    assert other_process.wrote_recently(_request(cookie))
+    assert not other_process.wrote_recently(_request(writer.cookie_value(time.time() - 1)))
+
+
+def test_unsigned_or_forged_cookies_are_ignored():
+    tracker = ReadYourWritesTracker(WINDOW, "secret")
+    forever = time.time() + 10 ** 9
+    signed = tracker.cookie_value(time.time() + WINDOW)
+
+    assert not tracker.wrote_recently(_request(str(forever)))
+    assert not tracker.wrote_recently(_request(f"{forever:.3f}:{signed.split(':', 1)[1]}"))
+    assert not tracker.wrote_recently(_request(ReadYourWritesTracker(WINDOW, "other-secret").cookie_value(forever)))
+    assert not tracker.wrote_recently(_request("not-a-number:deadbeef"))
+    assert not tracker.wrote_recently(_request("1e99:caf\u00e9"))
+
+
+def test_signed_cookie_cannot_reach_past_one_window():
+    tracker = ReadYourWritesTracker(WINDOW, "secret")
+
+    assert not tracker.wrote_recently(_request(tracker.cookie_value(time.time() + WINDOW * 100)))
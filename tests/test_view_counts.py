@@ -0,0 +1,36 @@
+"""
+Views are buffered only for items that were actually served
+"""
+from sqlalchemy import insert
+from app.core.config import settings
+from app.db.database import engine
+from app.models import Bake
+from app.services.counter_service import counter_buffer
+
+BAKES = f"{settings.API_PREFIX}/bakes"
+
+
+def _create_bake(owner_id: int) -> int:
+    with engine.begin() as connection:
+        return connection.execute(insert(Bake).values(
+            title="Sourdough", description="Crusty", category="bread", price_cents=500, created_by=owner_id
+        ).returning(Bake.id)).scalar_one()
+
+
+def test_viewing_a_bake_counts_a_view(client, make_user):
+    owner_id, _headers = make_user()
+    bake_id = _create_bake(owner_id)
+
+    assert client.get(f"{BAKES}/{bake_id}").json()["view_count"] == 0
+    # The first view is counted once it has been served, so the next read sees it
+    assert client.get(f"{BAKES}/{bake_id}").json()["view_count"] == 1
+
+
+async def test_missing_bakes_are_not_buffered(client):
+    missing = [10 ** 9 + n for n in range(100)]
+
+    for bake_id in missing:
+        assert client.get(f"{BAKES}/{bake_id}").status_code == 404
+    assert client.get(f"{BAKES}/not-a-number").status_code == 422
+
+    assert await counter_buffer.pending("bake", missing) == {}
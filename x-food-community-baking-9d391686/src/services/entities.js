@@ -179,6 +179,14 @@ export const Like = {
 
   toggle: async (targetType, targetId) => {
     return apiService.post('/likes/toggle', { target_type: targetType, target_id: targetId });
+  },
+
+  // Which of these bakes and recipes the current user has liked, in one request
+  check: async ({ bakeIds = [], recipeIds = [] } = {}) => {
+    const params = new URLSearchParams();
+    bakeIds.forEach((id) => params.append('bake_ids', id));
+    recipeIds.forEach((id) => params.append('recipe_ids', id));
+    return apiService.get(`/likes/check?${params.toString()}`);
   }
 };
 